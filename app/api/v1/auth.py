@@ -1,20 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from ...database import get_db
+from ...database import DbSession, get_db, get_read_db, run_db
 from ...schemas.user import UserCreate, UserResponse
 from ...schemas.token import Token
 from ...crud import user as user_crud
-from ...utils.security import verify_password, create_access_token
+from ...utils.security import create_access_token
+from ...services.password_hasher import password_hasher
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: DbSession = Depends(get_db)):
     """Register a new user."""
     # Check if username already exists
-    db_user = user_crud.get_user_by_username(db, username=user.username)
+    db_user = await run_db(db, user_crud.get_user_by_username, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,28 +22,29 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    db_user = user_crud.get_user_by_email(db, email=user.email)
+    db_user = await run_db(db, user_crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    return user_crud.create_user(db=db, user=user)
+    # Create new user (bcrypt runs on the dedicated hashing pool)
+    hashed_password = await password_hasher.hash(user.password)
+    return await run_db(db, user_crud.create_user, user=user, hashed_password=hashed_password)
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_read_db)
 ):
     """Login and receive JWT token."""
     # Get user by username
-    user = user_crud.get_user_by_username(db, username=form_data.username)
+    user = await run_db(db, user_crud.get_user_by_username, username=form_data.username)
     
     # Verify user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -1,52 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from ...database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse, ORJSONResponse
+from typing import List, Optional
+from datetime import datetime
+from ...database import DbSession, get_db, get_read_db, run_db
 from ...dependencies import get_current_user
 from ...schemas.like import LikeResponse
-from ...schemas.post import PostResponse
+from ...schemas.post import PostResponse, VIEWER_FIELDS
 from ...crud import like as like_crud
 from ...crud import post as post_crud
-from ...models.user import User
+from ...services.auth_cache import UserPrincipal
+from ...utils.pagination import parse_cursor, next_cursor_headers
+from ...utils.serialization import fields_of, rows_response, rows_to_dicts
+from ...services.like_buffer import like_buffer
 
 router = APIRouter()
 
+# Buffered likes only read on the request path, so they don't need the write pool.
+get_like_db = get_read_db if like_buffer.enabled else get_db
 
-@router.post("/posts/{post_id}/like", response_model=LikeResponse, status_code=status.HTTP_201_CREATED)
-def like_post(
+LIKE_FIELDS = fields_of(LikeResponse)
+POST_FIELDS = fields_of(PostResponse, exclude=VIEWER_FIELDS)
+
+
+@router.post(
+    "/posts/{post_id}/like",
+    response_model=LikeResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": LikeResponse, "description": "Like buffered for a bulk write"}},
+)
+async def like_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_like_db)
 ):
-    """Like a post."""
+    """Like a post (202 Accepted when likes are write-behind buffered)."""
     # Check if post exists
-    post = post_crud.get_post(db, post_id=post_id)
+    post = await run_db(db, post_crud.get_post, post_id=post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
     
+    already_liked = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="You have already liked this post"
+    )
+    
+    if like_buffer.enabled:
+        if not await like_buffer.like(db, user_id=current_user.id, post_id=post_id):
+            raise already_liked
+        accepted = LikeResponse(user_id=current_user.id, post_id=post_id, created_at=datetime.utcnow())
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=accepted.model_dump(mode="json"))
+    
     # Create like
-    like = like_crud.create_like(db, user_id=current_user.id, post_id=post_id)
+    like = await run_db(db, like_crud.create_like, user_id=current_user.id, post_id=post_id)
     if not like:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have already liked this post"
-        )
+        raise already_liked
     
     return like
 
 
 @router.delete("/posts/{post_id}/like", status_code=status.HTTP_204_NO_CONTENT)
-def unlike_post(
+async def unlike_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_like_db)
 ):
     """Unlike a post."""
     # Check if post exists
-    post = post_crud.get_post(db, post_id=post_id)
+    post = await run_db(db, post_crud.get_post, post_id=post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,7 +77,10 @@ def unlike_post(
         )
     
     # Delete like
-    deleted = like_crud.delete_like(db, user_id=current_user.id, post_id=post_id)
+    if like_buffer.enabled:
+        deleted = await like_buffer.unlike(db, user_id=current_user.id, post_id=post_id)
+    else:
+        deleted = await run_db(db, like_crud.delete_like, user_id=current_user.id, post_id=post_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -63,31 +89,32 @@ def unlike_post(
 
 
 @router.get("/posts/{post_id}/likes", response_model=List[LikeResponse])
-def get_post_likes(post_id: int, db: Session = Depends(get_db)):
+async def get_post_likes(post_id: int, db: DbSession = Depends(get_read_db)):
     """Get all likes for a post."""
     # Check if post exists
-    post = post_crud.get_post(db, post_id=post_id)
+    post = await run_db(db, post_crud.get_post, post_id=post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
     
-    likes = like_crud.get_likes_by_post(db, post_id=post_id)
-    return likes
+    likes = await run_db(db, like_crud.get_likes_by_post, post_id=post_id)
+    return rows_response(likes, LIKE_FIELDS)
 
 
 @router.get("/users/me/likes", response_model=List[PostResponse])
-def get_my_liked_posts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_liked_posts(
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
 ):
-    """Get all posts liked by the current user."""
-    likes = like_crud.get_likes_by_user(db, user_id=current_user.id)
-    
-    # Get the posts from the likes
-    posts = [post_crud.get_post(db, post_id=like.post_id) for like in likes]
-    # Filter out None values in case a post was deleted
-    posts = [post for post in posts if post is not None]
-    
-    return posts
+    """Get posts liked by the current user, most recently liked first."""
+    after = parse_cursor(cursor, "my_likes", datetime, int)
+    rows = await run_db(db, like_crud.get_liked_posts, user_id=current_user.id, limit=limit, after=after)
+    headers = next_cursor_headers(rows, limit, "my_likes", key=lambda row: (row.liked_at, row.like_id))
+    posts = rows_to_dicts(rows, POST_FIELDS)
+    for post in posts:
+        post["liked_by_me"] = True  # by definition; no need to look it up
+    return ORJSONResponse(content=posts, headers=headers)
@@ -1,70 +1,392 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ...database import get_db
-from ...dependencies import get_current_user
-from ...schemas.post import PostCreate, PostUpdate, PostResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import Iterator, List, Optional
+from datetime import datetime
+from ...config import settings
+from ...database import DbSession, ReadSessionLocal, get_db, get_read_db, run_db
+from ...dependencies import get_current_user, get_optional_user
+from ...schemas.post import (
+    PostCreate, PostUpdate, PostResponse, PostSearchResponse, PostSimilarResponse, PostCreatedResponse,
+    PostDuplicateResponse, PostSuggestions, PostBatchResponse, PostImportError, PostImportResult, VIEWER_FIELDS
+)
+from ...schemas.tag import FacetCount, PostFacets
+from ...crud import duplicate as duplicate_crud
 from ...crud import post as post_crud
-from ...models.user import User
+from ...crud import tag as tag_crud
+from ...crud import timeline as timeline_crud
+from ...crud import trending as trending_crud
+from ...services.auth_cache import UserPrincipal
+from ...utils import fts, ndjson, query_stats
+from ...utils.ids import parse_ids
+from ...utils.pagination import parse_cursor, next_cursor_headers
+from ...utils.serialization import batch_response, fields_of, render_lines, render_row, render_rows, rows_to_dicts
+from ...services import liked_flags
+from ...services.jobs import job_runner
+from ...services.response_cache import FACETS_TAG, FEED_TAG, post_tag, serve_cached
+from ...services.recent_posts import recent_posts
+from ...services.similar_posts import similar_posts
+from ...services.suggestions import post_suggestions
 
 router = APIRouter()
 
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+MAX_IMPORT_ERRORS = 100
 
-@router.post("", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
-def create_post(
+POST_FIELDS = fields_of(PostResponse, exclude=VIEWER_FIELDS)
+SEARCH_FIELDS = fields_of(PostSearchResponse, exclude=VIEWER_FIELDS)
+
+
+@router.post(
+    "", response_model=PostCreatedResponse, response_model_exclude_unset=True, status_code=status.HTTP_201_CREATED
+)
+async def create_post(
     post: PostCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    """Create a new post (authenticated users only)."""
-    return post_crud.create_post(db=db, post=post, user_id=current_user.id)
+    """Create a new post (authenticated users only).
+
+    Near-duplicates of existing posts are answered with 409 or marked with
+    ``duplicate_of``, depending on ``DUPLICATE_POLICY``.
+    """
+    try:
+        db_post = await run_db(db, post_crud.create_post, post=post, user_id=current_user.id)
+    except duplicate_crud.DuplicatePostError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Post is a near-duplicate of post {exc.match.post_id}"
+        )
+    await job_runner.submit_db_async("timeline_fan_out", timeline_crud.fan_out, [db_post.id])
+    return db_post
 
 
 @router.get("", response_model=List[PostResponse])
-def get_posts(
+async def get_posts(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    tag: Optional[str] = Query(None, min_length=1, description="Only posts with this tag"),
+    llm_model: Optional[str] = Query(None, min_length=1, description="Only posts for this LLM model"),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
 ):
-    """Get all posts with pagination."""
-    posts = post_crud.get_posts(db, skip=skip, limit=limit)
-    return posts
+    """Get all posts with pagination, optionally filtered by tag and/or model.
 
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the
+    next page; ``skip`` still works but gets slower the deeper it goes.
+    Responses carry an ETag and are answered with 304 on ``If-None-Match``.
+    Authenticated callers also get ``liked_by_me`` on every post. Unfiltered
+    pages among the newest posts come from the in-memory ``recent_posts``.
+    """
+    after = parse_cursor(cursor, "posts", datetime, int)
 
-@router.get("/search", response_model=List[PostResponse])
-def search_posts(
+    async def load():
+        posts = None
+        if tag is None and llm_model is None:
+            posts = recent_posts.page(skip=skip, limit=limit, after=after)
+        if posts is None:
+            posts = await run_db(
+                db, post_crud.get_posts, skip=skip, limit=limit, after=after, tag=tag, llm_model=llm_model
+            )
+        body = render_rows(posts, POST_FIELDS)
+        tags = [FEED_TAG, *(post_tag(post.id) for post in posts)]
+        headers = next_cursor_headers(posts, limit, "posts", key=lambda post: (post.created_at, post.id))
+        return body, tags, {**headers, **liked_flags.VARY_HEADERS}
+
+    return await serve_cached(request, load, liked_flags.personalizer(db, viewer))
+
+
+@router.get("/search", response_model=List[PostSearchResponse])
+async def search_posts(
     q: str = Query(..., min_length=1, description="Search query"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Search posts by query (searches in title, content, tags, and llm_model).
+
+    Results are ranked by relevance; each word matches as a prefix and the
+    response includes a highlighted snippet of the best matching field (HTML:
+    the text escaped, the matches in ``<mark>``).
+    """
+    after = parse_cursor(cursor, "search", *post_crud.search_cursor_types())
+    hits = await run_db(db, post_crud.search_posts, query=q, skip=skip, limit=limit, after=after)
+    headers = next_cursor_headers(hits, limit, "search", key=post_crud.search_sort_key)
+    posts = rows_to_dicts(hits, SEARCH_FIELDS)
+    for item in posts:
+        item["snippet"] = fts.highlight(item["snippet"])
+    return await liked_flags.posts_response(db, viewer, posts, headers)
+
+
+@router.get("/trending", response_model=List[PostResponse])
+async def get_trending_posts(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Most liked posts, with recent likes weighing more than old ones.
+
+    Served from the stored, incrementally updated hot score, so a page is
+    one index range read. Scores are decayed every few minutes; a cursor
+    taken before the latest decay is answered with 400.
+    """
+    after = parse_cursor(cursor, "trending", datetime, float, int)
+    try:
+        posts, scores_at = await run_db(db, trending_crud.get_trending, limit=limit, after=after)
+    except trending_crud.StaleCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor expired: trending scores have been updated, start again from the first page"
+        )
+    headers = next_cursor_headers(
+        posts, limit, "trending", key=lambda post: (scores_at, post.hot_score, post.id)
+    )
+    return await liked_flags.posts_response(db, viewer, rows_to_dicts(posts, POST_FIELDS), headers)
+
+
+@router.get("/suggest", response_model=PostSuggestions)
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Text typed so far"),
+    limit: int = Query(10, ge=1, le=20)
+):
+    """Typeahead: the most popular titles, tags and LLM models starting with ``prefix`` (case-insensitive).
+
+    Served from in-memory prefix indexes without touching the database;
+    ``503`` while they are still being built at startup.
+    """
+    if not post_suggestions.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Suggestions are not available yet",
+            headers={"Retry-After": "5"},
+        )
+    
+    suggestions = post_suggestions.suggest(prefix, limit)
+    return ORJSONResponse({
+        kind: [{"text": text, "weight": weight} for text, weight in found]
+        for kind, found in suggestions.items()
+    })
+
+
+@router.get("/batch", response_model=PostBatchResponse)
+async def get_posts_batch(
+    ids: List[str] = Query(..., description="Post ids, comma-separated and/or repeated"),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get many posts by id with one query, in request order; unknown ids are listed in ``missing``."""
+    post_ids = parse_ids(ids, settings.batch_lookup_max_ids)
+    posts = await run_db(db, post_crud.get_posts_by_ids, post_ids=post_ids)
+    items = rows_to_dicts(posts, POST_FIELDS)
+    await liked_flags.add_flags(db, viewer, items)
+    return batch_response("posts", items, post_ids, liked_flags.VARY_HEADERS)
+
+
+@router.get("/facets", response_model=PostFacets)
+async def get_facets(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    db: DbSession = Depends(get_read_db)
+):
+    """Post counts per tag and per LLM model, most used first (ETag/304 like ``GET /posts``)."""
+    async def load():
+        tags, models = await run_db(db, tag_crud.get_facets, limit=limit)
+        facets = PostFacets(
+            tags=[FacetCount(name=name, count=count) for name, count in tags],
+            llm_models=[FacetCount(name=name, count=count) for name, count in models],
+        )
+        return facets.model_dump_json().encode("utf-8"), [FACETS_TAG], {}
+
+    return await serve_cached(request, load)
+
+
+def _describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'line'}: {error['msg']}" for error in exc.errors()
+    )
+
+
+@router.post("/import", response_model=PostImportResult)
+async def import_posts(
+    request: Request,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    """Search posts by query (searches in title, content, tags, and llm_model)."""
-    posts = post_crud.search_posts(db, query=q, skip=skip, limit=limit)
-    return posts
+    """Bulk-create posts from an NDJSON body, one ``PostCreate`` object per line.
+
+    The body is read as a stream and inserted in transactions of
+    ``BULK_IMPORT_CHUNK_SIZE`` rows, all owned by the current user. Invalid
+    lines are skipped and reported by line number; every valid line is imported.
+    With ``DUPLICATE_POLICY=reject``, near-duplicates of existing posts or of
+    earlier lines are skipped and reported too.
+    """
+    query_stats.mark_batched()
+    imported = 0
+    failed = 0
+    errors: List[PostImportError] = []
+    chunk: List[PostCreate] = []
+    chunk_lines: List[int] = []
+
+    def reject(line_number: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_IMPORT_ERRORS:
+            errors.append(PostImportError(line=line_number, error=error))
+
+    async def flush():
+        nonlocal imported
+        if chunk:
+            ids, duplicates = await run_db(
+                db, post_crud.bulk_create_posts, posts=list(chunk), user_id=current_user.id
+            )
+            imported += len(ids)
+            if ids:
+                await job_runner.submit_db_async("timeline_fan_out", timeline_crud.fan_out, ids)
+            for position, match in sorted(duplicates.items()):
+                original = f"post {match.post_id}" if match.post_id is not None else f"line {chunk_lines[match.position]}"
+                reject(chunk_lines[position], f"near-duplicate of {original}")
+            chunk.clear()
+            chunk_lines.clear()
+
+    try:
+        async for line_number, line in ndjson.iter_lines(request.stream(), MAX_IMPORT_LINE_BYTES):
+            try:
+                chunk.append(PostCreate.model_validate_json(line))
+            except ValidationError as exc:
+                reject(line_number, _describe_validation_error(exc))
+                continue
+            chunk_lines.append(line_number)
+            if len(chunk) >= settings.bulk_import_chunk_size:
+                await flush()
+    except ndjson.LineTooLong as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"{exc} (limit {MAX_IMPORT_LINE_BYTES} bytes); {imported} posts were imported before it"
+        )
+    await flush()
+    return PostImportResult(imported=imported, failed=failed, errors=errors)
+
+
+def _export_lines(user_id: Optional[int]) -> Iterator[bytes]:
+    # The stream outlives the request's dependencies, so it owns its session.
+    db = ReadSessionLocal()
+    try:
+        for batch in post_crud.iter_posts(db, user_id=user_id, batch_size=settings.bulk_export_batch_size):
+            yield render_lines(batch, POST_FIELDS)
+    finally:
+        db.close()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {ndjson.MEDIA_TYPE: {}}, "description": "One PostResponse object per line"}},
+)
+async def export_posts(
+    user_id: Optional[int] = Query(None, description="Only export this user's posts"),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """Stream all posts (or one user's) as NDJSON in id order, without loading them into memory."""
+    return StreamingResponse(_export_lines(user_id), media_type=ndjson.MEDIA_TYPE)
 
 
 @router.get("/{post_id}", response_model=PostResponse)
-def get_post(post_id: int, db: Session = Depends(get_db)):
-    """Get a specific post by ID."""
-    post = post_crud.get_post(db, post_id=post_id)
+async def get_post(
+    post_id: int,
+    request: Request,
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get a specific post by ID (ETag/304 and ``liked_by_me`` like ``GET /posts``)."""
+    async def load():
+        post = await run_db(db, post_crud.get_post, post_id=post_id)
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found"
+            )
+        return render_row(post, POST_FIELDS), [post_tag(post.id)], dict(liked_flags.VARY_HEADERS)
+
+    return await serve_cached(request, load, liked_flags.personalizer(db, viewer))
+
+
+@router.get("/{post_id}/similar", response_model=List[PostSimilarResponse])
+async def get_similar_posts(
+    post_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Posts with the most similar title, content and tags (TF-IDF cosine similarity), best first."""
+    post = await run_db(db, post_crud.get_post, post_id=post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
-    return post
+    if not similar_posts.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Similar posts are not available yet",
+            headers={"Retry-After": "5"},
+        )
+    
+    matches = await run_in_threadpool(
+        similar_posts.similar, post.id, post.title, post.content, post.tags, limit
+    )
+    scores = dict(matches)
+    posts = rows_to_dicts(
+        await run_db(db, post_crud.get_posts_by_ids, post_ids=list(scores)), POST_FIELDS
+    )
+    for item in posts:
+        item["score"] = scores[item["id"]]
+    return await liked_flags.posts_response(db, viewer, posts)
+
+
+@router.get("/{post_id}/duplicates", response_model=List[PostDuplicateResponse])
+async def get_duplicate_posts(
+    post_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Posts whose content nearly duplicates this one's, most similar first.
+
+    Looked up in the MinHash LSH index (see ``crud.duplicate``), so only posts
+    sharing a bucket with this one are compared.
+    """
+    matches = await run_db(db, duplicate_crud.get_near_duplicates, post_id=post_id, limit=limit)
+    if matches is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found"
+        )
+    
+    scores = dict(matches)
+    posts = rows_to_dicts(
+        await run_db(db, post_crud.get_posts_by_ids, post_ids=list(scores)), POST_FIELDS
+    )
+    for item in posts:
+        item["similarity"] = scores[item["id"]]
+    return await liked_flags.posts_response(db, viewer, posts)
 
 
-@router.put("/{post_id}", response_model=PostResponse)
-def update_post(
+@router.put("/{post_id}", response_model=PostResponse, response_model_exclude_unset=True)
+async def update_post(
     post_id: int,
     post_update: PostUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
     """Update a post (owner only)."""
     # Get the post
-    post = post_crud.get_post(db, post_id=post_id)
+    post = await run_db(db, post_crud.get_post, post_id=post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -79,19 +401,19 @@ def update_post(
         )
     
     # Update the post
-    updated_post = post_crud.update_post(db, post_id=post_id, post_update=post_update)
+    updated_post = await run_db(db, post_crud.update_post, post_id=post_id, post_update=post_update)
     return updated_post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_post(
+async def delete_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
     """Delete a post (owner only)."""
     # Get the post
-    post = post_crud.get_post(db, post_id=post_id)
+    post = await run_db(db, post_crud.get_post, post_id=post_id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -106,4 +428,4 @@ def delete_post(
         )
     
     # Delete the post
-    post_crud.delete_post(db, post_id=post_id)
+    await run_db(db, post_crud.delete_post, post_id=post_id)
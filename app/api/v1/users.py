@@ -1,27 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from ...database import get_db
-from ...dependencies import get_current_user
-from ...schemas.user import UserResponse
-from ...schemas.post import PostResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from typing import List, Optional
+from datetime import datetime
+from ...config import settings
+from ...database import DbSession, get_db, get_read_db, run_db
+from ...dependencies import get_current_user, get_optional_user
+from ...schemas.user import UserResponse, UserProfileResponse, UserBatchResponse, FollowResponse
+from ...schemas.post import PostResponse, VIEWER_FIELDS
 from ...crud import user as user_crud
 from ...crud import post as post_crud
-from ...models.user import User
+from ...crud import follow as follow_crud
+from ...crud import timeline as timeline_crud
+from ...services.auth_cache import UserPrincipal
+from ...utils.ids import parse_ids
+from ...utils.pagination import parse_cursor, next_cursor_headers
+from ...utils.serialization import batch_response, fields_of, render_rows, rows_response, rows_to_dicts
+from ...services import liked_flags
+from ...services.response_cache import post_tag, serve_cached, user_posts_tag
 
 router = APIRouter()
 
+POST_FIELDS = fields_of(PostResponse, exclude=VIEWER_FIELDS)
+USER_FIELDS = fields_of(UserResponse)
+
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: UserPrincipal = Depends(get_current_user)):
     """Get current user profile."""
     return current_user
 
 
-@router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID."""
-    user = user_crud.get_user_by_id(db, user_id=user_id)
+@router.get("/me/timeline", response_model=List[PostResponse])
+async def get_home_timeline(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get the current user's home timeline: their own posts and those of the users they follow, newest first.
+
+    Served from the timeline materialized when posts are created, so a page
+    costs the same however many users are followed.
+    """
+    after = parse_cursor(cursor, "timeline", datetime, int)
+    posts = await run_db(db, timeline_crud.get_timeline, user_id=current_user.id, limit=limit, after=after)
+    headers = next_cursor_headers(posts, limit, "timeline", key=lambda post: (post.created_at, post.id))
+    return await liked_flags.posts_response(db, current_user, rows_to_dicts(posts, POST_FIELDS), headers)
+
+
+@router.get("/batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    ids: List[str] = Query(..., description="User ids, comma-separated and/or repeated"),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get many users by id with one query, in request order; unknown ids are listed in ``missing``."""
+    user_ids = parse_ids(ids, settings.batch_lookup_max_ids)
+    users = await run_db(db, user_crud.get_users_by_ids, user_ids=user_ids)
+    return batch_response("users", rows_to_dicts(users, USER_FIELDS), user_ids)
+
+
+@router.get("/{user_id}", response_model=UserProfileResponse)
+async def get_user(user_id: int, db: DbSession = Depends(get_read_db)):
+    """Get user by ID, with follower and following counts."""
+    user = await run_db(db, user_crud.get_user_by_id, user_id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -31,19 +71,111 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{user_id}/posts", response_model=List[PostResponse])
-def get_user_posts(
+async def get_user_posts(
+    user_id: int,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    viewer: Optional[UserPrincipal] = Depends(get_optional_user),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get all posts by a specific user (cursor pagination, ETag/304 and ``liked_by_me`` as for ``GET /posts``)."""
+    after = parse_cursor(cursor, "user_posts", datetime, int)
+
+    async def load():
+        user = await run_db(db, user_crud.get_user_by_id, user_id=user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        posts = await run_db(db, post_crud.get_posts_by_user, user_id=user_id, skip=skip, limit=limit, after=after)
+        body = render_rows(posts, POST_FIELDS)
+        tags = [user_posts_tag(user_id), *(post_tag(post.id) for post in posts)]
+        headers = next_cursor_headers(posts, limit, "user_posts", key=lambda post: (post.created_at, post.id))
+        return body, tags, {**headers, **liked_flags.VARY_HEADERS}
+
+    return await serve_cached(request, load, liked_flags.personalizer(db, viewer))
+
+
+@router.post("/{user_id}/follow", response_model=FollowResponse, status_code=status.HTTP_201_CREATED)
+async def follow_user(
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    """Get all posts by a specific user."""
-    user = user_crud.get_user_by_id(db, user_id=user_id)
+    """Follow a user."""
+    if user_id == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You cannot follow yourself"
+        )
+    
+    # Check if user exists
+    user = await run_db(db, user_crud.get_user_by_id, user_id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    posts = post_crud.get_posts_by_user(db, user_id=user_id, skip=skip, limit=limit)
-    return posts
+    follow = await run_db(db, follow_crud.follow_user, follower_id=current_user.id, followee_id=user_id)
+    if not follow:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You are already following this user"
+        )
+    
+    return follow
+
+
+@router.delete("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+async def unfollow_user(
+    user_id: int,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    """Unfollow a user."""
+    deleted = await run_db(db, follow_crud.unfollow_user, follower_id=current_user.id, followee_id=user_id)
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You are not following this user"
+        )
+
+
+async def _follow_list(db: DbSession, crud_fn, kind: str, user_id: int, limit: int, cursor: Optional[str]) -> Response:
+    after = parse_cursor(cursor, kind, datetime, int)
+    user = await run_db(db, user_crud.get_user_by_id, user_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    rows = await run_db(db, crud_fn, user_id=user_id, limit=limit, after=after)
+    return rows_response(rows, USER_FIELDS, next_cursor_headers(rows, limit, kind, key=lambda row: (row.followed_at, row.id)))
+
+
+@router.get("/{user_id}/followers", response_model=List[UserResponse])
+async def get_followers(
+    user_id: int,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get the users following a user, most recent first."""
+    return await _follow_list(db, follow_crud.get_followers, "followers", user_id, limit, cursor)
+
+
+@router.get("/{user_id}/following", response_model=List[UserResponse])
+async def get_following(
+    user_id: int,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    db: DbSession = Depends(get_read_db)
+):
+    """Get the users a user follows, most recently followed first."""
+    return await _follow_list(db, follow_crud.get_following, "following", user_id, limit, cursor)
@@ -0,0 +1,126 @@
+"""Maintenance commands.
+
+Usage::
+
+    python -m app.cli reconcile-likes
+    python -m app.cli rebuild-search-index
+    python -m app.cli rebuild-facets
+    python -m app.cli rebuild-hot-scores
+    python -m app.cli decay-hot-scores
+    python -m app.cli rebuild-timelines
+    python -m app.cli rebuild-similar-index
+    python -m app.cli rebuild-duplicate-index
+"""
+import argparse
+from .database import SessionLocal, engine, init_db
+from .crud import duplicate as duplicate_crud
+from .crud import post as post_crud
+from .crud import tag as tag_crud
+from .crud import timeline as timeline_crud
+from .crud import trending as trending_crud
+from .services.similar_posts import similar_posts
+from .utils import fts
+
+
+def reconcile_likes() -> None:
+    """Backfill/repair the denormalized ``posts.likes_count`` column."""
+    db = SessionLocal()
+    try:
+        fixed = post_crud.reconcile_likes_counts(db)
+    finally:
+        db.close()
+    print(f"Reconciled like counters: {fixed} post(s) updated")
+
+
+def rebuild_search_index() -> None:
+    """Rebuild the FTS5 search index from the posts table."""
+    if not fts.is_enabled():
+        print("Full-text search is not available for this database")
+        return
+    fts.rebuild_search_index(engine)
+    print("Rebuilt search index")
+
+
+def rebuild_facets() -> None:
+    """Rebuild the normalized tag index and the per-tag/per-model post counts."""
+    db = SessionLocal()
+    try:
+        indexed = tag_crud.rebuild_facets(db)
+    finally:
+        db.close()
+    print(f"Rebuilt tag index and facet counts: {indexed} post(s) indexed")
+
+
+def rebuild_hot_scores() -> None:
+    """Recompute the trending hot scores exactly from the likes table."""
+    db = SessionLocal()
+    try:
+        scored = trending_crud.rebuild_hot_scores(db)
+    finally:
+        db.close()
+    print(f"Rebuilt hot scores: {scored} post(s) trending")
+
+
+def decay_hot_scores() -> None:
+    """Run one hot score decay now (what the app does every TRENDING_DECAY_INTERVAL_SECONDS)."""
+    db = SessionLocal()
+    try:
+        updated = trending_crud.decay_scores(db)
+    finally:
+        db.close()
+    print(f"Decayed hot scores: {updated} post(s) updated")
+
+
+def rebuild_timelines() -> None:
+    """Rebuild the materialized home timelines (e.g. after changing TIMELINE_FANOUT_MAX_FOLLOWERS)."""
+    db = SessionLocal()
+    try:
+        entries = timeline_crud.rebuild_timelines(db)
+    finally:
+        db.close()
+    print(f"Rebuilt home timelines: {entries} entries")
+
+
+def rebuild_similar_index() -> None:
+    """Index all posts for similar-post lookups and write SIMILAR_POSTS_SNAPSHOT_PATH."""
+    if not similar_posts.snapshot_path:
+        print("SIMILAR_POSTS_SNAPSHOT_PATH is not set; the index is rebuilt in memory at every start")
+        return
+    indexed = similar_posts.load(use_snapshot=False)
+    similar_posts.save()
+    print(f"Rebuilt similar posts index: {indexed} post(s) indexed, written to {similar_posts.snapshot_path}")
+
+
+def rebuild_duplicate_index() -> None:
+    """Recompute the content signatures and LSH buckets used for near-duplicate detection."""
+    db = SessionLocal()
+    try:
+        indexed = duplicate_crud.rebuild_duplicate_index(db)
+    finally:
+        db.close()
+    print(f"Rebuilt near-duplicate index: {indexed} post(s) indexed")
+
+
+COMMANDS = {
+    "reconcile-likes": reconcile_likes,
+    "rebuild-search-index": rebuild_search_index,
+    "rebuild-facets": rebuild_facets,
+    "rebuild-hot-scores": rebuild_hot_scores,
+    "decay-hot-scores": decay_hot_scores,
+    "rebuild-timelines": rebuild_timelines,
+    "rebuild-similar-index": rebuild_similar_index,
+    "rebuild-duplicate-index": rebuild_duplicate_index,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="AI Prompt Sharing maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+
+    init_db()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -5,9 +6,93 @@ class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
     database_url: str = "sqlite:///./aipromptapp.db"
+    # Serve requests through an asyncio engine (aiosqlite) instead of the threadpool.
+    # async_database_url defaults to database_url with the sqlite+aiosqlite driver.
+    async_database: bool = False
+    async_database_url: Optional[str] = None
+    # SQLite engine profile, applied to every connection of an on-disk database.
+    # Writes go through a small pool, reads through a larger query-only pool.
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size: int = -65536  # negative = KiB, i.e. 64 MiB per connection
+    sqlite_mmap_size: int = 268435456
+    db_write_pool_size: int = 1
+    db_read_pool_size: int = 8
+    db_pool_timeout_seconds: float = 30
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Verified-token cache used by get_current_user (entries never outlive the token's exp)
+    auth_cache_size: int = 10000
+    auth_cache_ttl_seconds: int = 300
+    # Cache of serialized GET responses (feed, post detail, user posts) with ETag/304
+    response_cache_enabled: bool = True
+    response_cache_size: int = 1024
+    # Seconds an entry is served (and revalidated with 304) before it is rendered again.
+    # Invalidation only reaches the process that wrote, so this bounds how stale another
+    # worker's pages get.
+    response_cache_ttl_seconds: float = 30
+    # Server processes sharing the database (WEB_CONCURRENCY, which uvicorn and gunicorn
+    # also read as their worker count). The in-memory read models (recent posts, similar
+    # posts, suggestions) only see their own process's writes and refuse to start with more.
+    web_concurrency: int = 1
+    # Response compression: gzip, or brotli when the brotli package is installed, for
+    # JSON/NDJSON/text bodies of at least compression_min_size bytes
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    # Write-behind like ingestion: buffer like/unlike intents and flush them in bulk,
+    # answering 503 once like_buffer_max_pending intents are waiting (failing flushes)
+    like_buffer_enabled: bool = False
+    like_buffer_flush_interval_ms: int = 200
+    like_buffer_batch_size: int = 500
+    like_buffer_max_pending: int = 50000
+    # bcrypt process pool: worker processes, extra queued jobs before answering 503,
+    # and the Retry-After (seconds) sent with that 503.
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 32
+    password_hash_retry_after: int = 1
+    # NDJSON import/export: rows inserted per transaction, rows fetched per export batch
+    bulk_import_chunk_size: int = 1000
+    bulk_export_batch_size: int = 1000
+    # Most ids accepted by the /posts/batch and /users/batch lookups
+    batch_lookup_max_ids: int = 250
+    # Trending feed: a like's weight halves every trending_half_life_hours; stored
+    # scores are decayed every trending_decay_interval_seconds.
+    trending_half_life_hours: float = 12
+    trending_decay_interval_seconds: int = 300
+    # Home timelines: entries kept per user, and the follower count above which an
+    # author's posts are merged in at read time instead of fanned out on write
+    timeline_max_entries: int = 800
+    timeline_fanout_max_followers: int = 10000
+    # Similar posts: in-process TF-IDF index, loaded at startup and written back to
+    # similar_posts_snapshot_path (if set) on shutdown
+    similar_posts_enabled: bool = True
+    similar_posts_snapshot_path: Optional[str] = None
+    # In-memory read model of the newest posts, serving first pages of GET /posts:
+    # at most recent_posts_max_posts posts and about recent_posts_max_mb of memory
+    recent_posts_enabled: bool = True
+    recent_posts_max_posts: int = 2000
+    recent_posts_max_mb: int = 64
+    # Typeahead for titles, tags and models: in-memory prefix indexes built at startup
+    suggestions_enabled: bool = True
+    # Near-duplicate posts: content at least duplicate_min_similarity alike (estimated
+    # Jaccard similarity of word bigrams) is reported as duplicate_of when creating a
+    # post ("flag"), refused with 409 ("reject") or let through ("off").
+    duplicate_policy: Literal["off", "flag", "reject"] = "flag"
+    duplicate_min_similarity: float = 0.7
+    # Background jobs (derived data updated after the response): queued jobs before
+    # submitters wait for room, attempts per job with a doubling delay between
+    # them, and how long shutdown waits for the queue to drain
+    jobs_enabled: bool = True
+    job_queue_size: int = 10000
+    job_max_attempts: int = 3
+    job_retry_delay_ms: int = 200
+    job_drain_timeout_seconds: float = 30
+    # Prometheus metrics at /metrics; requests repeating one SQL statement more than
+    # n_plus_one_threshold times are logged and counted as suspected N+1 queries.
+    metrics_enabled: bool = True
+    n_plus_one_threshold: int = 10
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,16 @@
+"""Columns selected by list queries: exactly those of the response schemas.
+
+List endpoints render these rows directly (see ``utils.serialization``), so
+they never load full ORM objects.
+"""
+from ..models.like import Like
+from ..models.post import Post
+from ..models.user import User
+from ..schemas.like import LikeResponse
+from ..schemas.post import PostResponse, VIEWER_FIELDS
+from ..schemas.user import UserResponse
+from ..utils.serialization import fields_of
+
+POST_COLUMNS = tuple(getattr(Post, field) for field in fields_of(PostResponse, exclude=VIEWER_FIELDS))
+USER_COLUMNS = tuple(getattr(User, field) for field in fields_of(UserResponse))
+LIKE_COLUMNS = tuple(getattr(Like, field) for field in fields_of(LikeResponse))
@@ -0,0 +1,176 @@
+"""Near-duplicate detection of post content with MinHash LSH (see ``utils.minhash``).
+
+Every post is filed under the ``BANDS`` bucket keys of its content in
+``post_minhash_buckets``, in the same transaction as the post write. Finding
+the near-duplicates of a text reads its buckets (primary key range reads) and
+compares the text exactly with the posts found there, so the cost depends on
+how many posts resemble the text, not on the size of the table.
+
+Because the write pool serializes writers, checking a new post and inserting
+it in one transaction (``find_duplicates`` from ``crud.post``) cannot race
+with another insert of the same text.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, insert, select
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from ..config import settings
+from ..models.duplicate import PostMinhashBucket
+from ..models.post import Post
+from ..utils import minhash
+
+# Bucket keys per SELECT, well under SQLite's bound parameter limit
+KEYS_PER_QUERY = 900
+
+# Posts compared per bucket at most. Only a text posted over and over fills a
+# bucket this much, and any of its copies is as good a match as the others.
+MAX_POSTS_PER_BUCKET = 200
+
+
+class Fingerprint(NamedTuple):
+    """What a post's content is compared and filed by."""
+    shingles: FrozenSet[str]
+    keys: List[int]
+
+
+class DuplicateMatch(NamedTuple):
+    """The post (or the earlier item of the same batch) a new text is a near-duplicate of."""
+    post_id: Optional[int]
+    position: Optional[int]  # Index within the batch, when post_id is None
+    similarity: float
+
+
+class DuplicatePostError(Exception):
+    """Raised when a post is refused as a near-duplicate (``settings.duplicate_policy == "reject"``)."""
+
+    def __init__(self, match: DuplicateMatch):
+        super().__init__(f"Near-duplicate of post {match.post_id}")
+        self.match = match
+
+
+def fingerprint(content: str) -> Fingerprint:
+    """Shingles and bucket keys of a post's content.
+
+    Content without a word (punctuation, emoji) has no shingles and no keys:
+    it is neither filed nor looked up, so it is never anyone's duplicate.
+    """
+    shingles = frozenset(minhash.shingles(content))
+    if not shingles:
+        return Fingerprint(shingles, [])
+    return Fingerprint(shingles, minhash.band_keys(minhash.signature(shingles)))
+
+
+def add_to_index(db: Session, posts: Iterable[Tuple[int, Fingerprint]]) -> None:
+    """File ``(post id, fingerprint)`` pairs under their buckets, in the caller's transaction."""
+    rows = [{"bucket": key, "post_id": post_id} for post_id, content_print in posts for key in content_print.keys]
+    if rows:
+        db.execute(insert(PostMinhashBucket), rows)
+
+
+def remove_from_index(db: Session, posts: Iterable[Tuple[int, Fingerprint]]) -> None:
+    """Take ``(post id, fingerprint)`` pairs out of their buckets, in the caller's transaction."""
+    rows = [{"key": key, "pid": post_id} for post_id, content_print in posts for key in content_print.keys]
+    if rows:
+        buckets = PostMinhashBucket.__table__
+        db.connection().execute(
+            delete(buckets).where(buckets.c.bucket == bindparam("key"), buckets.c.post_id == bindparam("pid")),
+            rows
+        )
+
+
+def _bucket_contents(db: Session, keys: Iterable[int]) -> Dict[int, List[Tuple[int, FrozenSet[str]]]]:
+    """``(post id, shingles)`` of the posts filed under each of the given bucket keys."""
+    contents: Dict[int, List[Tuple[int, FrozenSet[str]]]] = defaultdict(list)
+    shingles: Dict[int, FrozenSet[str]] = {}
+    keys = sorted(set(keys))
+    for start in range(0, len(keys), KEYS_PER_QUERY):
+        rows = db.execute(
+            select(PostMinhashBucket.bucket, Post.id, Post.content)
+            .join(Post, Post.id == PostMinhashBucket.post_id)
+            .where(PostMinhashBucket.bucket.in_(keys[start:start + KEYS_PER_QUERY]))
+        )
+        for bucket, post_id, content in rows:
+            posts = contents[bucket]
+            if len(posts) < MAX_POSTS_PER_BUCKET:
+                if post_id not in shingles:
+                    shingles[post_id] = frozenset(minhash.shingles(content))
+                posts.append((post_id, shingles[post_id]))
+    return contents
+
+
+def find_duplicates(db: Session, fingerprints: Sequence[Fingerprint]) -> List[Optional[DuplicateMatch]]:
+    """The closest near-duplicate of each fingerprinted text, or None, per ``settings.duplicate_policy``.
+
+    Matches are stored posts at least ``settings.duplicate_min_similarity``
+    alike or, for texts of the same batch, an earlier text of the batch that
+    is not a duplicate itself. Always all None when the policy is ``"off"``.
+    """
+    if settings.duplicate_policy == "off" or not fingerprints:
+        return [None] * len(fingerprints)
+    threshold = settings.duplicate_min_similarity
+    stored = _bucket_contents(db, (key for current in fingerprints for key in current.keys))
+
+    matches: List[Optional[DuplicateMatch]] = []
+    originals: Dict[int, List[int]] = defaultdict(list)  # bucket -> positions of the batch's originals
+    for position, current in enumerate(fingerprints):
+        best: Optional[DuplicateMatch] = None
+        seen = set()
+        for key in current.keys:
+            for post_id, other in stored.get(key, ()):
+                if post_id not in seen:
+                    seen.add(post_id)
+                    score = minhash.jaccard(current.shingles, other)
+                    if score >= threshold and (best is None or score > best.similarity):
+                        best = DuplicateMatch(post_id, None, score)
+            for earlier in originals.get(key, ()):
+                score = minhash.jaccard(current.shingles, fingerprints[earlier].shingles)
+                if score >= threshold and (best is None or score > best.similarity):
+                    best = DuplicateMatch(None, earlier, score)
+        matches.append(best)
+        if best is None:
+            for key in current.keys:
+                originals[key].append(position)
+    return matches
+
+
+def get_near_duplicates(db: Session, post_id: int, limit: int) -> Optional[List[Tuple[int, float]]]:
+    """``(post id, similarity)`` of the other posts at least ``settings.duplicate_min_similarity`` alike.
+
+    Most similar first, then oldest first (the likely original). None if the post does not exist.
+    """
+    content = db.scalar(select(Post.content).where(Post.id == post_id))
+    if content is None:
+        return None
+    current = fingerprint(content)
+    scores = {
+        other_id: minhash.jaccard(current.shingles, other)
+        for posts in _bucket_contents(db, current.keys).values()
+        for other_id, other in posts
+        if other_id != post_id
+    }
+    ranked = sorted(
+        ((other_id, score) for other_id, score in scores.items() if score >= settings.duplicate_min_similarity),
+        key=lambda match: (-match[1], match[0])
+    )
+    return ranked[:limit]
+
+
+def rebuild_duplicate_index(db: Session, batch_size: int = 5000) -> int:
+    """Refile every post under the buckets of its content.
+
+    Returns the number of posts indexed.
+    """
+    db.execute(delete(PostMinhashBucket))
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Post.id, Post.content).where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        add_to_index(db, [(post_id, fingerprint(content)) for post_id, content in batch])
+        indexed += len(batch)
+        last_id = batch[-1].id
+    db.commit()
+    return indexed
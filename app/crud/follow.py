@@ -0,0 +1,89 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Row, tuple_
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from typing import List, Optional, Tuple
+from ..models.follow import Follow
+from ..models.user import User
+from . import timeline as timeline_crud
+from .columns import USER_COLUMNS
+
+
+def _adjust_follow_counts(db: Session, follower_id: int, followee_id: int, delta: int) -> None:
+    """Apply a relative change to both users' stored follow counters (flushed with the caller's transaction)."""
+    db.query(User).filter(User.id == follower_id).update(
+        {User.following_count: User.following_count + delta},
+        synchronize_session=False
+    )
+    db.query(User).filter(User.id == followee_id).update(
+        {User.followers_count: User.followers_count + delta},
+        synchronize_session=False
+    )
+
+
+def follow_user(db: Session, follower_id: int, followee_id: int) -> Optional[Follow]:
+    """Follow a user and add their recent posts to the follower's timeline. Returns None if already following."""
+    try:
+        db_follow = Follow(follower_id=follower_id, followee_id=followee_id)
+        db.add(db_follow)
+        db.flush()
+        _adjust_follow_counts(db, follower_id, followee_id, 1)
+        followers_count = db.query(User.followers_count).filter(User.id == followee_id).scalar()
+        timeline_crud.add_followee_posts(db, follower_id, followee_id, followers_count)
+        db.commit()
+        db.refresh(db_follow)
+    except IntegrityError:
+        db.rollback()
+        return None
+    return db_follow
+
+
+def unfollow_user(db: Session, follower_id: int, followee_id: int) -> bool:
+    """Unfollow a user and drop their posts from the follower's timeline. Returns False if not following."""
+    deleted = db.query(Follow).filter(
+        Follow.follower_id == follower_id,
+        Follow.followee_id == followee_id
+    ).delete(synchronize_session=False)
+    
+    if not deleted:
+        return False
+    
+    _adjust_follow_counts(db, follower_id, followee_id, -1)
+    timeline_crud.remove_followee_posts(db, follower_id, followee_id)
+    db.commit()
+    return True
+
+
+def _follow_page(query, after: Optional[Tuple[datetime, int]], user_id_column, limit: int) -> List[Row]:
+    if after is not None:
+        query = query.filter(tuple_(Follow.created_at, user_id_column) < tuple_(*after))
+    return query.order_by(Follow.created_at.desc(), user_id_column.desc()).limit(limit).all()
+
+
+def get_followers(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """Users following ``user_id``, most recent first, by ``(followed_at, id)`` cursor.
+
+    Returns rows of the ``UserResponse`` columns plus ``followed_at``.
+    """
+    query = db.query(*USER_COLUMNS, Follow.created_at.label("followed_at")).join(Follow, Follow.follower_id == User.id).filter(
+        Follow.followee_id == user_id
+    )
+    return _follow_page(query, after, Follow.follower_id, limit)
+
+
+def get_following(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """Users ``user_id`` follows, most recently followed first, paginated like ``get_followers``."""
+    query = db.query(*USER_COLUMNS, Follow.created_at.label("followed_at")).join(Follow, Follow.followee_id == User.id).filter(
+        Follow.follower_id == user_id
+    )
+    return _follow_page(query, after, Follow.followee_id, limit)
@@ -1,24 +1,42 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import Row, bindparam, case, delete, insert, tuple_, update
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from ..models.like import Like
+from ..models.post import Post
+from .. import events
+from . import trending
+from .columns import LIKE_COLUMNS, POST_COLUMNS
+
+
+def _adjust_likes_count(db: Session, post_id: int, delta: int, hot_delta: float) -> None:
+    """Apply a relative change to a post's stored like counter and hot score (flushed with the caller's transaction)."""
+    db.query(Post).filter(Post.id == post_id).update(
+        {Post.likes_count: Post.likes_count + delta, Post.hot_score: trending.clamped_score(hot_delta)},
+        synchronize_session=False
+    )
 
 
 def create_like(db: Session, user_id: int, post_id: int) -> Optional[Like]:
-    """Create a like. Returns None if already liked."""
+    """Create a like and bump the post's like counter. Returns None if already liked."""
     try:
         db_like = Like(user_id=user_id, post_id=post_id)
         db.add(db_like)
+        db.flush()
+        _adjust_likes_count(db, post_id, 1, trending.like_weight(db_like.created_at, trending.last_decay(db)))
         db.commit()
         db.refresh(db_like)
-        return db_like
     except IntegrityError:
         db.rollback()
         return None
+    events.publish(events.LIKE_CREATED, user_id=user_id, post_id=post_id)
+    return db_like
 
 
 def delete_like(db: Session, user_id: int, post_id: int) -> bool:
-    """Delete a like. Returns True if deleted, False if not found."""
+    """Delete a like and decrement the post's like counter. Returns True if deleted, False if not found."""
     db_like = db.query(Like).filter(
         Like.user_id == user_id,
         Like.post_id == post_id
@@ -28,18 +46,121 @@ def delete_like(db: Session, user_id: int, post_id: int) -> bool:
         return False
     
     db.delete(db_like)
+    _adjust_likes_count(db, post_id, -1, -trending.like_weight(db_like.created_at, trending.last_decay(db)))
     db.commit()
+    events.publish(events.LIKE_DELETED, user_id=user_id, post_id=post_id)
     return True
 
 
-def get_likes_by_post(db: Session, post_id: int) -> List[Like]:
-    """Get all likes for a post."""
-    return db.query(Like).filter(Like.post_id == post_id).all()
+def apply_like_changes(
+    db: Session,
+    changes: Dict[Tuple[int, int], bool]
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Apply many like/unlike intents in one transaction.
+
+    ``changes`` maps ``(user_id, post_id)`` to True (liked) or False (not
+    liked). Intents that already hold, and likes of posts that no longer
+    exist, are skipped; counters move by the rows actually written. Returns
+    the ``(user_id, post_id)`` pairs that were inserted and deleted.
+    """
+    if not changes:
+        return [], []
+
+    pairs = list(changes)
+    post_ids = {post_id for _, post_id in pairs}
+    live_posts = {
+        post_id for (post_id,) in db.query(Post.id).filter(Post.id.in_(post_ids))
+    }
+    existing = {
+        (user_id, post_id): liked_at
+        for user_id, post_id, liked_at in db.query(Like.user_id, Like.post_id, Like.created_at).filter(
+            tuple_(Like.user_id, Like.post_id).in_(pairs)
+        )
+    }
+
+    to_insert = [
+        pair for pair, liked in changes.items()
+        if liked and pair not in existing and pair[1] in live_posts
+    ]
+    to_delete = [pair for pair, liked in changes.items() if not liked and pair in existing]
+
+    deltas: Counter = Counter()
+    hot_deltas: Dict[int, float] = defaultdict(float)
+    decayed_at = trending.last_decay(db)
+    if to_insert:
+        now = datetime.utcnow()
+        db.execute(insert(Like), [
+            {"user_id": user_id, "post_id": post_id, "created_at": now} for user_id, post_id in to_insert
+        ])
+        deltas.update(post_id for _, post_id in to_insert)
+        weight = trending.like_weight(now, decayed_at)
+        for _, post_id in to_insert:
+            hot_deltas[post_id] += weight
+    if to_delete:
+        db.execute(delete(Like).where(tuple_(Like.user_id, Like.post_id).in_(to_delete)))
+        deltas.subtract(post_id for _, post_id in to_delete)
+        for pair in to_delete:
+            hot_deltas[pair[1]] -= trending.like_weight(existing[pair], decayed_at)
+
+    counter_updates = [
+        {"pid": post_id, "delta": deltas[post_id], "hot_delta": hot_delta}
+        for post_id, hot_delta in hot_deltas.items()
+    ]
+    if counter_updates:
+        posts = Post.__table__
+        hot_score = posts.c.hot_score + bindparam("hot_delta")
+        db.connection().execute(
+            update(posts).where(posts.c.id == bindparam("pid")).values(
+                likes_count=posts.c.likes_count + bindparam("delta"),
+                hot_score=case((hot_score > trending.MIN_HOT_SCORE, hot_score), else_=0.0),
+            ),
+            counter_updates
+        )
+    db.commit()
+
+    for user_id, post_id in to_insert:
+        events.publish(events.LIKE_CREATED, user_id=user_id, post_id=post_id)
+    for user_id, post_id in to_delete:
+        events.publish(events.LIKE_DELETED, user_id=user_id, post_id=post_id)
+    return to_insert, to_delete
+
+
+def get_likes_by_post(db: Session, post_id: int) -> List[Row]:
+    """Get all likes for a post, as rows of the ``LikeResponse`` columns."""
+    return db.query(*LIKE_COLUMNS).filter(Like.post_id == post_id).all()
+
+
+def get_liked_posts(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """Get posts liked by a user, most recently liked first, in a single join query.
+
+    Returns rows of the ``PostResponse`` columns plus ``liked_at`` and
+    ``like_id``; ``after`` is the ``(liked_at, like_id)`` of the last row of
+    the previous page.
+    """
+    query = db.query(*POST_COLUMNS, Like.created_at.label("liked_at"), Like.id.label("like_id")).join(
+        Like, Like.post_id == Post.id
+    ).filter(Like.user_id == user_id)
+    if after is not None:
+        query = query.filter(tuple_(Like.created_at, Like.id) < tuple_(*after))
+    return query.order_by(Like.created_at.desc(), Like.id.desc()).limit(limit).all()
 
 
-def get_likes_by_user(db: Session, user_id: int) -> List[Like]:
-    """Get all likes by a user."""
-    return db.query(Like).filter(Like.user_id == user_id).all()
+def get_liked_post_ids(db: Session, user_id: int, post_ids: Iterable[int]) -> Set[int]:
+    """Which of ``post_ids`` the user likes, in one ``IN`` query on the (user_id, post_id) index."""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return set()
+    return {
+        post_id for (post_id,) in db.query(Like.post_id).filter(
+            Like.user_id == user_id,
+            Like.post_id.in_(post_ids)
+        )
+    }
 
 
 def check_user_liked_post(db: Session, user_id: int, post_id: int) -> bool:
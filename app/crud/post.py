@@ -1,12 +1,37 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
+from sqlalchemy import Row, or_, func, insert, select, literal, tuple_
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from ..config import settings
 from ..models.post import Post
+from ..models.like import Like
+from ..models.tag import Tag, PostTag
 from ..schemas.post import PostCreate, PostUpdate
+from ..utils import fts
+from ..utils.tags import normalize_tag
+from .. import events
+from . import duplicate as duplicate_crud
+from . import tag as tag_crud
+from . import timeline as timeline_crud
+from .columns import POST_COLUMNS
+
+# Changing these re-indexes the post's tags and facet counts
+FACET_FIELDS = ("tags", "llm_model")
 
 
 def create_post(db: Session, post: PostCreate, user_id: int) -> Post:
-    """Create a new post."""
+    """Create a new post.
+
+    A near-duplicate of an existing post raises ``DuplicatePostError`` when
+    ``settings.duplicate_policy`` is ``"reject"``; with ``"flag"`` it is
+    created and the returned post carries the match's id as ``duplicate_of``.
+    The caller queues ``crud.timeline.fan_out`` for it once this returns.
+    """
+    content_print = duplicate_crud.fingerprint(post.content)
+    duplicate = duplicate_crud.find_duplicates(db, [content_print])[0]
+    if duplicate is not None and settings.duplicate_policy == "reject":
+        raise duplicate_crud.DuplicatePostError(duplicate)
+    
     db_post = Post(
         title=post.title,
         content=post.content,
@@ -15,37 +40,212 @@ def create_post(db: Session, post: PostCreate, user_id: int) -> Post:
         user_id=user_id
     )
     db.add(db_post)
+    db.flush()
+    created = events.snapshot(db_post)
+    tag_crud.add_post_facets(db, [created])
+    timeline_crud.add_own_posts(db, [created])
+    duplicate_crud.add_to_index(db, [(db_post.id, content_print)])
+    # Detached with the values flushed above, so the commit does not expire it and
+    # reading it afterwards does not take the write connection back (see ``services.jobs``)
+    db.expunge(db_post)
     db.commit()
-    db.refresh(db_post)
+    events.publish(events.POST_CREATED, post=created)
+    if duplicate is not None:
+        db_post.duplicate_of = duplicate.post_id
     return db_post
 
 
+def bulk_create_posts(
+    db: Session, posts: Sequence[PostCreate], user_id: int
+) -> Tuple[List[int], Dict[int, duplicate_crud.DuplicateMatch]]:
+    """Insert many posts in one transaction with batched multi-row INSERT ... RETURNING.
+
+    Publishes ``post_created`` for each of them after the commit; the caller
+    queues ``crud.timeline.fan_out`` for the new ids. Returns the new ids
+    and, when ``settings.duplicate_policy`` is ``"reject"``, the
+    near-duplicates left out, by position in ``posts``.
+    """
+    if not posts:
+        return [], {}
+    content_prints = [duplicate_crud.fingerprint(post.content) for post in posts]
+    rejected: Dict[int, duplicate_crud.DuplicateMatch] = {}
+    if settings.duplicate_policy == "reject":
+        matches = duplicate_crud.find_duplicates(db, content_prints)
+        rejected = {position: match for position, match in enumerate(matches) if match is not None}
+    kept = [position for position in range(len(posts)) if position not in rejected]
+    if not kept:
+        return [], rejected
+    
+    now = datetime.utcnow()
+    created = db.scalars(
+        insert(Post).returning(Post),
+        [
+            {
+                "title": posts[position].title,
+                "content": posts[position].content,
+                "tags": posts[position].tags,
+                "llm_model": posts[position].llm_model,
+                "user_id": user_id,
+                "created_at": now,
+            }
+            for position in kept
+        ],
+    ).all()
+    snapshots = [events.snapshot(post) for post in created]
+    tag_crud.add_post_facets(db, snapshots)
+    timeline_crud.add_own_posts(db, snapshots)
+    duplicate_crud.add_to_index(db, [
+        (snapshot["id"], content_prints[position]) for snapshot, position in zip(snapshots, kept)
+    ])
+    db.commit()
+    for snapshot in snapshots:
+        events.publish(events.POST_CREATED, post=snapshot)
+    return [snapshot["id"] for snapshot in snapshots], rejected
+
+
+def iter_posts(db: Session, user_id: Optional[int] = None, batch_size: int = 1000) -> Iterator[List[Row]]:
+    """Stream all posts (or one user's) in id order, ``batch_size`` rows at a time.
+
+    Rows (of the ``PostResponse`` columns) are fetched from an open cursor with
+    ``yield_per``, so memory stays bounded by one batch however large the
+    table is.
+    """
+    query = select(*POST_COLUMNS).order_by(Post.id).execution_options(yield_per=batch_size)
+    if user_id is not None:
+        query = query.where(Post.user_id == user_id)
+    for partition in db.execute(query).partitions():
+        yield partition
+
+
 def get_post(db: Session, post_id: int) -> Optional[Post]:
     """Get a post by ID."""
     return db.query(Post).filter(Post.id == post_id).first()
 
 
-def get_posts(db: Session, skip: int = 0, limit: int = 100) -> List[Post]:
-    """Get all posts with pagination."""
-    return db.query(Post).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+def get_posts_by_ids(db: Session, post_ids: Sequence[int]) -> List[Row]:
+    """Posts with the given ids in one ``IN`` query, in the order of ``post_ids``; missing ids are skipped.
+
+    Returns rows of the ``PostResponse`` columns.
+    """
+    found = {row.id: row for row in db.query(*POST_COLUMNS).filter(Post.id.in_(post_ids))}
+    return [found[post_id] for post_id in post_ids if post_id in found]
+
+
+def _newest_first(query, after: Optional[Tuple[datetime, int]], created_at=Post.created_at, id_=Post.id):
+    """Order by ``(created_at, id)`` descending, resuming after the keyset cursor if given.
+
+    ``created_at``/``id_`` may name equivalent columns of a joined table
+    (``post_tags``) so the sort is served by that table's index.
+    """
+    if after is not None:
+        query = query.filter(tuple_(created_at, id_) < tuple_(*after))
+    return query.order_by(created_at.desc(), id_.desc())
+
+
+def get_posts(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None,
+    tag: Optional[str] = None,
+    llm_model: Optional[str] = None
+) -> List[Row]:
+    """Get all posts, newest first, paginated by offset and/or ``(created_at, id)`` cursor.
 
+    ``tag`` restricts to posts carrying that tag (matched after normalization)
+    and ``llm_model`` to posts for that exact model; both are index lookups.
+    Returns rows of the ``PostResponse`` columns.
+    """
+    query = db.query(*POST_COLUMNS)
+    if llm_model is not None:
+        query = query.filter(Post.llm_model == llm_model)
+    if tag is not None:
+        tag_id = select(Tag.id).where(Tag.name == normalize_tag(tag)).scalar_subquery()
+        query = query.join(PostTag, PostTag.post_id == Post.id).filter(PostTag.tag_id == tag_id)
+        return _newest_first(query, after, PostTag.created_at, PostTag.post_id).offset(skip).limit(limit).all()
+    return _newest_first(query, after).offset(skip).limit(limit).all()
 
-def get_posts_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Post]:
-    """Get all posts by a specific user."""
-    return db.query(Post).filter(Post.user_id == user_id).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
 
+def get_posts_by_user(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """Get all posts by a specific user, newest first, paginated like ``get_posts``."""
+    query = db.query(*POST_COLUMNS).filter(Post.user_id == user_id)
+    return _newest_first(query, after).offset(skip).limit(limit).all()
 
-def search_posts(db: Session, query: str, skip: int = 0, limit: int = 100) -> List[Post]:
-    """Search posts by query (searches in title, content, tags, and llm_model)."""
+
+def search_posts(
+    db: Session,
+    query: str,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+) -> List[Row]:
+    """Search posts by query (searches in title, content, tags, and llm_model).
+
+    Returns rows of the ``PostResponse`` columns plus ``rank`` and ``snippet``. With the FTS5 index, results are
+    ordered by BM25 relevance (lower rank is better) and every word of the
+    query is matched as a prefix; otherwise this falls back to a substring
+    scan ordered by recency, with no rank or snippet. ``after`` is the
+    ``search_sort_key`` of the last hit of the previous page.
+    """
+    if not fts.is_enabled():
+        return _search_posts_like(db, query=query, skip=skip, limit=limit, after=after)
+
+    match = fts.build_match_query(query)
+    if match is None:
+        return []
+
+    rank = func.bm25(fts.fts_match_column, *fts.BM25_WEIGHTS).label("rank")
+    snippet = func.snippet(
+        fts.fts_match_column, -1,
+        fts.SNIPPET_OPEN, fts.SNIPPET_CLOSE, fts.SNIPPET_ELLIPSIS, fts.SNIPPET_TOKENS
+    ).label("snippet")
+    hits = db.query(*POST_COLUMNS, rank, snippet).join(
+        fts.posts_fts, fts.posts_fts.c.rowid == Post.id
+    ).filter(
+        fts.fts_match_column.op("MATCH")(match)
+    )
+    if after is not None:
+        after_rank, after_id = after
+        hits = hits.filter(or_(rank > after_rank, (rank == after_rank) & (Post.id < after_id)))
+    return hits.order_by(rank, Post.id.desc()).offset(skip).limit(limit).all()
+
+
+def search_cursor_types() -> Tuple[type, type]:
+    """Types of the values in a search cursor: ``(rank, id)`` with FTS5, else ``(created_at, id)``."""
+    return (float, int) if fts.is_enabled() else (datetime, int)
+
+
+def search_sort_key(hit: Row) -> Tuple:
+    """Keyset sort key of a search hit, matching the ordering used by ``search_posts``."""
+    if hit.rank is not None:
+        return (hit.rank, hit.id)
+    return (hit.created_at, hit.id)
+
+
+def _search_posts_like(
+    db: Session,
+    query: str,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """Substring search fallback for databases without FTS5."""
     search_pattern = f"%{query}%"
-    return db.query(Post).filter(
+    hits = db.query(*POST_COLUMNS, literal(None).label("rank"), literal(None).label("snippet")).filter(
         or_(
             Post.title.ilike(search_pattern),
             Post.content.ilike(search_pattern),
             Post.tags.ilike(search_pattern),
             Post.llm_model.ilike(search_pattern)
         )
-    ).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    return _newest_first(hits, after).offset(skip).limit(limit).all()
 
 
 def update_post(db: Session, post_id: int, post_update: PostUpdate) -> Optional[Post]:
@@ -54,12 +254,21 @@ def update_post(db: Session, post_id: int, post_update: PostUpdate) -> Optional[
     if not db_post:
         return None
     
+    previous = events.snapshot(db_post)
     update_data = post_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_post, field, value)
     
+    if db_post.content != previous["content"]:
+        duplicate_crud.remove_from_index(db, [(post_id, duplicate_crud.fingerprint(previous["content"]))])
+        duplicate_crud.add_to_index(db, [(post_id, duplicate_crud.fingerprint(db_post.content))])
+    current = events.snapshot(db_post)
+    if any(current[field] != previous[field] for field in FACET_FIELDS):
+        tag_crud.remove_post_facets(db, [previous])
+        tag_crud.add_post_facets(db, [current])
     db.commit()
     db.refresh(db_post)
+    events.publish(events.POST_UPDATED, post=events.snapshot(db_post), previous=previous)
     return db_post
 
 
@@ -69,6 +278,30 @@ def delete_post(db: Session, post_id: int) -> bool:
     if not db_post:
         return False
     
+    deleted = events.snapshot(db_post)
+    tag_crud.remove_post_facets(db, [deleted])
+    timeline_crud.remove_posts(db, [post_id])
+    duplicate_crud.remove_from_index(db, [(post_id, duplicate_crud.fingerprint(deleted["content"]))])
     db.delete(db_post)
     db.commit()
+    events.publish(events.POST_DELETED, post=deleted)
     return True
+
+
+def reconcile_likes_counts(db: Session) -> int:
+    """Recompute every post's stored like counter from the likes table.
+
+    Returns the number of posts whose counter was out of date.
+    """
+    actual = (
+        select(func.count(Like.id))
+        .where(Like.post_id == Post.id)
+        .correlate(Post)
+        .scalar_subquery()
+    )
+    result = db.query(Post).filter(Post.likes_count != actual).update(
+        {Post.likes_count: actual},
+        synchronize_session=False
+    )
+    db.commit()
+    return result
@@ -0,0 +1,120 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, insert, select, update
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+from ..models.post import Post
+from ..models.tag import Tag, PostTag, LlmModelCount
+from ..utils.tags import parse_tags
+
+# Post data as published in events (``events.snapshot``): needs id, created_at, tags, llm_model.
+PostData = Mapping[str, Any]
+
+
+def _ensure_tags(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Ids of the given tag names, creating the tags that do not exist yet."""
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(db.query(Tag.name, Tag.id).filter(Tag.name.in_(names)))
+    missing = names - ids.keys()
+    if missing:
+        db.execute(insert(Tag), [{"name": name, "posts_count": 0} for name in sorted(missing)])
+        ids.update(db.query(Tag.name, Tag.id).filter(Tag.name.in_(missing)))
+    return ids
+
+
+def _adjust_counts(db: Session, tag_deltas: Mapping[int, int], model_deltas: Mapping[str, int]) -> None:
+    """Apply relative changes to the stored per-tag and per-model post counters."""
+    tag_updates = [{"tid": tag_id, "delta": delta} for tag_id, delta in tag_deltas.items() if delta]
+    if tag_updates:
+        tags = Tag.__table__
+        db.connection().execute(
+            update(tags).where(tags.c.id == bindparam("tid")).values(posts_count=tags.c.posts_count + bindparam("delta")),
+            tag_updates
+        )
+
+    model_updates = [{"model": model, "delta": delta} for model, delta in model_deltas.items() if delta]
+    if model_updates:
+        models = LlmModelCount.__table__
+        names = [row["model"] for row in model_updates]
+        existing = {name for (name,) in db.query(LlmModelCount.llm_model).filter(LlmModelCount.llm_model.in_(names))}
+        missing = [name for name in names if name not in existing]
+        if missing:
+            db.execute(insert(LlmModelCount), [{"llm_model": name, "posts_count": 0} for name in missing])
+        db.connection().execute(
+            update(models).where(models.c.llm_model == bindparam("model")).values(posts_count=models.c.posts_count + bindparam("delta")),
+            model_updates
+        )
+
+
+def add_post_facets(db: Session, posts: Sequence[PostData]) -> None:
+    """Index the tags of new (or re-tagged) posts and count them, in the caller's transaction."""
+    if not posts:
+        return
+    names = {post["id"]: parse_tags(post["tags"]) for post in posts}
+    tag_ids = _ensure_tags(db, (name for post_names in names.values() for name in post_names))
+    rows = [
+        {"post_id": post["id"], "tag_id": tag_ids[name], "created_at": post["created_at"]}
+        for post in posts
+        for name in names[post["id"]]
+    ]
+    if rows:
+        db.execute(insert(PostTag), rows)
+    _adjust_counts(
+        db,
+        Counter(row["tag_id"] for row in rows),
+        Counter(post["llm_model"] for post in posts),
+    )
+
+
+def remove_post_facets(db: Session, posts: Sequence[PostData]) -> None:
+    """Drop the tag index rows of posts being deleted (or re-tagged) and uncount them."""
+    if not posts:
+        return
+    post_ids = [post["id"] for post in posts]
+    tag_deltas = Counter()
+    for (tag_id,) in db.query(PostTag.tag_id).filter(PostTag.post_id.in_(post_ids)):
+        tag_deltas[tag_id] -= 1
+    db.execute(delete(PostTag).where(PostTag.post_id.in_(post_ids)))
+    model_deltas = Counter()
+    for post in posts:
+        model_deltas[post["llm_model"]] -= 1
+    _adjust_counts(db, tag_deltas, model_deltas)
+
+
+def get_facets(db: Session, limit: int = 50) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+    """Most used tags and models with their post counts: ``(tags, llm_models)``."""
+    tags = db.query(Tag.name, Tag.posts_count).filter(
+        Tag.posts_count > 0
+    ).order_by(Tag.posts_count.desc(), Tag.name).limit(limit).all()
+    models = db.query(LlmModelCount.llm_model, LlmModelCount.posts_count).filter(
+        LlmModelCount.posts_count > 0
+    ).order_by(LlmModelCount.posts_count.desc(), LlmModelCount.llm_model).limit(limit).all()
+    return [tuple(row) for row in tags], [tuple(row) for row in models]
+
+
+def rebuild_facets(db: Session, batch_size: int = 5000) -> int:
+    """Rebuild the tag index and facet counters from the posts table.
+
+    Returns the number of posts indexed.
+    """
+    db.execute(delete(PostTag))
+    db.execute(delete(Tag))
+    db.execute(delete(LlmModelCount))
+
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = [
+            row._asdict() for row in db.execute(
+                select(Post.id, Post.created_at, Post.tags, Post.llm_model)
+                .where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+            )
+        ]
+        if not batch:
+            break
+        add_post_facets(db, batch)
+        indexed += len(batch)
+        last_id = batch[-1]["id"]
+    db.commit()
+    return indexed
@@ -0,0 +1,231 @@
+"""Materialized home timelines (fan-out on write).
+
+Each user's home timeline is a capped list of post ids in
+``timeline_entries``, filled when a post is created: the post goes into the
+author's own timeline in the creating transaction, and a background job
+(``fan_out``) then copies it to every follower of the author with one
+``INSERT ... SELECT``, so followers see it a moment later. Reading a page is
+then one index range read, however many users the reader follows.
+
+Authors with more than ``settings.timeline_fanout_max_followers`` followers
+are not fanned out to (one post would write that many rows); their posts are
+merged in when a follower reads the timeline (fan-out on read).
+
+Timelines keep about ``settings.timeline_max_entries`` entries. Trimming is
+amortized: each user counts the entries added to their timeline since it was
+last trimmed (``users.timeline_untrimmed``), and a timeline is trimmed once
+that reaches ``TRIM_AFTER_ENTRIES``, so it never holds more than that many
+entries past the cap, whoever it follows.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, Integer, Row, bindparam, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Tuple
+from ..config import settings
+from ..models.follow import Follow, TimelineEntry
+from ..models.post import Post
+from ..models.user import User
+from .columns import POST_COLUMNS
+
+# Post data as published in events (``events.snapshot``): needs id, user_id, created_at.
+PostData = Mapping[str, Any]
+
+# A timeline is trimmed once this many entries were added to it since its last trim
+TRIM_AFTER_ENTRIES = 50
+
+# Posts of a newly followed user copied into the follower's timeline
+FOLLOW_BACKFILL_POSTS = 50
+
+
+def is_fanned_out(followers_count: int) -> bool:
+    """Whether an author with this many followers has their posts pushed to followers' timelines."""
+    return followers_count <= settings.timeline_fanout_max_followers
+
+
+def add_own_posts(db: Session, posts: Sequence[PostData]) -> None:
+    """Add new posts to their authors' own timelines, in the caller's transaction."""
+    if posts:
+        db.execute(insert(TimelineEntry), [
+            {"user_id": post["user_id"], "post_id": post["id"], "created_at": post["created_at"]}
+            for post in posts
+        ])
+        added = Counter(post["user_id"] for post in posts)
+        _count_added(db, [{"uid": user_id, "added": count} for user_id, count in added.items()])
+        _trim_grown(db, list(added))
+
+
+def fan_out(db: Session, post_ids: Sequence[int]) -> None:
+    """Add new posts to their authors' followers' timelines, in one transaction of its own.
+
+    Runs as a background job after the posts were committed (see
+    ``services.jobs``): posts deleted since then are skipped, entries already
+    there (a follow made meanwhile copies the post too) are kept, and a
+    failed attempt leaves nothing behind, so it is safe to retry.
+    """
+    posts = db.execute(
+        select(Post.id, Post.user_id, Post.created_at, User.followers_count)
+        .join(User, User.id == Post.user_id)
+        .where(Post.id.in_(post_ids))
+    ).all()
+    pushed = [
+        {"author": post.user_id, "pid": post.id, "created_at": post.created_at}
+        for post in posts
+        if post.followers_count and is_fanned_out(post.followers_count)
+    ]
+    if pushed:
+        follows = Follow.__table__
+        db.connection().execute(
+            sqlite_insert(TimelineEntry.__table__).from_select(
+                ["user_id", "post_id", "created_at"],
+                select(
+                    follows.c.follower_id,
+                    bindparam("pid", type_=Integer),
+                    bindparam("created_at", type_=DateTime),
+                ).where(follows.c.followee_id == bindparam("author"))
+            ).on_conflict_do_nothing(),
+            pushed
+        )
+        users = User.__table__
+        db.connection().execute(
+            update(users).where(users.c.id.in_(
+                select(follows.c.follower_id).where(follows.c.followee_id == bindparam("author"))
+            )).values(timeline_untrimmed=users.c.timeline_untrimmed + 1),
+            [{"author": post["author"]} for post in pushed]
+        )
+        authors = {post["author"] for post in pushed}
+        _trim_grown(db, select(Follow.follower_id).where(Follow.followee_id.in_(authors)))
+    db.commit()
+
+
+def remove_posts(db: Session, post_ids: Sequence[int]) -> None:
+    """Drop deleted posts from every timeline."""
+    if post_ids:
+        db.execute(delete(TimelineEntry).where(TimelineEntry.post_id.in_(post_ids)))
+
+
+def add_followee_posts(db: Session, follower_id: int, followee_id: int, followers_count: int) -> None:
+    """Copy the recent posts of a newly followed user into the follower's timeline (skipping those already in it)."""
+    if not is_fanned_out(followers_count):
+        return  # Merged in at read time
+    recent = select(
+        bindparam("follower", follower_id, type_=Integer), Post.id, Post.created_at
+    ).where(Post.user_id == followee_id).order_by(Post.created_at.desc()).limit(FOLLOW_BACKFILL_POSTS)
+    result = db.execute(
+        sqlite_insert(TimelineEntry).from_select(["user_id", "post_id", "created_at"], recent).on_conflict_do_nothing()
+    )
+    _count_added(db, [{"uid": follower_id, "added": result.rowcount}])
+    _trim_grown(db, [follower_id])
+
+
+def remove_followee_posts(db: Session, follower_id: int, followee_id: int) -> None:
+    """Drop an unfollowed user's posts from the follower's timeline."""
+    authored = select(TimelineEntry.post_id).join(Post, Post.id == TimelineEntry.post_id).where(
+        TimelineEntry.user_id == follower_id,
+        Post.user_id == followee_id
+    )
+    db.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == follower_id,
+        TimelineEntry.post_id.in_(authored)
+    ))
+
+
+def _count_added(db: Session, added: Sequence[Mapping[str, int]]) -> None:
+    """Add ``added`` to the untrimmed entry counts of the users ``uid``."""
+    users = User.__table__
+    db.connection().execute(
+        update(users).where(users.c.id == bindparam("uid")).values(
+            timeline_untrimmed=users.c.timeline_untrimmed + bindparam("added")
+        ),
+        added
+    )
+
+
+def _trim_grown(db: Session, user_ids) -> None:
+    """Trim those of the timelines (ids or a SELECT of ids) grown by ``TRIM_AFTER_ENTRIES`` since their last trim."""
+    grown = db.scalars(
+        select(User.id).where(User.id.in_(user_ids), User.timeline_untrimmed >= TRIM_AFTER_ENTRIES)
+    ).all()
+    if grown:
+        trim_timelines(db, grown)
+
+
+def trim_timelines(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """Delete the entries past ``settings.timeline_max_entries`` of the given timelines (all if None).
+
+    ``user_ids`` may also be a SELECT of user ids. Resets their untrimmed entry
+    counts. Returns the number of entries removed.
+    """
+    position = func.row_number().over(
+        partition_by=TimelineEntry.user_id,
+        order_by=(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+    ).label("position")
+    ranked = select(TimelineEntry.user_id, TimelineEntry.post_id, position)
+    if user_ids is not None:
+        ranked = ranked.where(TimelineEntry.user_id.in_(user_ids))
+    ranked = ranked.subquery()
+    overflow = select(ranked.c.user_id, ranked.c.post_id).where(ranked.c.position > settings.timeline_max_entries)
+    result = db.execute(delete(TimelineEntry).where(
+        tuple_(TimelineEntry.user_id, TimelineEntry.post_id).in_(overflow)
+    ))
+    reset = update(User.__table__).values(timeline_untrimmed=0)
+    if user_ids is not None:
+        reset = reset.where(User.__table__.c.id.in_(user_ids))
+    db.execute(reset)
+    return result.rowcount
+
+
+def rebuild_timelines(db: Session) -> int:
+    """Rebuild every timeline from the posts and follows tables. Returns the number of entries kept."""
+    db.execute(delete(TimelineEntry))
+    columns = ["user_id", "post_id", "created_at"]
+    db.execute(insert(TimelineEntry).from_select(columns, select(Post.user_id, Post.id, Post.created_at)))
+    db.execute(insert(TimelineEntry).from_select(
+        columns,
+        select(Follow.follower_id, Post.id, Post.created_at)
+        .join(Post, Post.user_id == Follow.followee_id)
+        .join(User, User.id == Follow.followee_id)
+        .where(User.followers_count <= settings.timeline_fanout_max_followers)
+    ))
+    trim_timelines(db)
+    db.commit()
+    return db.query(func.count()).select_from(TimelineEntry).scalar()
+
+
+def _newest_first(query, after: Optional[Tuple[datetime, int]], created_at, id_):
+    if after is not None:
+        query = query.filter(tuple_(created_at, id_) < tuple_(*after))
+    return query.order_by(created_at.desc(), id_.desc())
+
+
+def get_timeline(
+    db: Session,
+    user_id: int,
+    limit: int = 50,
+    after: Optional[Tuple[datetime, int]] = None
+) -> List[Row]:
+    """A user's home timeline, newest first, paginated by ``(created_at, id)`` cursor.
+
+    Reads the materialized entries and merges in the posts of followed
+    authors too popular to be fanned out to. Returns rows of the
+    ``PostResponse`` columns.
+    """
+    materialized = db.query(*POST_COLUMNS).join(TimelineEntry, TimelineEntry.post_id == Post.id).filter(
+        TimelineEntry.user_id == user_id
+    )
+    posts = _newest_first(materialized, after, TimelineEntry.created_at, TimelineEntry.post_id).limit(limit).all()
+
+    popular = [
+        followee_id for (followee_id,) in db.query(Follow.followee_id).join(User, User.id == Follow.followee_id).filter(
+            Follow.follower_id == user_id,
+            User.followers_count > settings.timeline_fanout_max_followers
+        )
+    ]
+    if popular:
+        pulled = _newest_first(
+            db.query(*POST_COLUMNS).filter(Post.user_id.in_(popular)), after, Post.created_at, Post.id
+        ).limit(limit).all()
+        merged = {post.id: post for post in (*posts, *pulled)}
+        posts = sorted(merged.values(), key=lambda post: (post.created_at, post.id), reverse=True)[:limit]
+    return posts
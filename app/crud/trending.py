@@ -0,0 +1,146 @@
+"""Stored hot scores for the trending feed.
+
+A post's ``hot_score`` is the sum of its likes, each weighted by
+``0.5 ** (age / half_life)``. Rather than recomputing that sum, the score is
+maintained incrementally, relative to the last decay recorded in
+``trending_decay``: a like made at ``liked_at`` contributes
+``like_weight(liked_at, decayed_at)``, its weight as of that decay (more than
+1 for likes made since).
+
+* a like adds its weight and an unlike subtracts it, in the same transaction
+  as the like row (``crud.like``), so an unlike takes back exactly what the
+  like put in, whatever decays ran in between;
+* ``decay_scores`` periodically multiplies every score by the decay factor
+  for the time elapsed since the previous decay and records the new decay
+  time, which rescales every like's weight alike.
+
+Scores are therefore exact as of the last decay, and their order is the
+order of the true current scores. ``rebuild_hot_scores`` recomputes them from
+the likes table, e.g. after changing the half-life.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import Row, bindparam, case, tuple_, update
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from ..config import settings
+from ..models.like import Like
+from ..models.post import Post
+from ..models.trending import TrendingDecay
+from .columns import POST_COLUMNS
+
+# Scores that decay below this are set to zero, which drops them out of the feed
+MIN_HOT_SCORE = 1e-3
+
+_STATE_ID = 1
+
+
+def decay_factor(seconds: float) -> float:
+    """Weight left after ``seconds`` of decay."""
+    return 0.5 ** (max(0.0, seconds) / (settings.trending_half_life_hours * 3600))
+
+
+def last_decay(db: Session) -> Optional[datetime]:
+    """When stored scores were last decayed (None before the first decay)."""
+    return db.query(TrendingDecay.decayed_at).filter(TrendingDecay.id == _STATE_ID).scalar()
+
+
+def like_weight(liked_at: datetime, decayed_at: Optional[datetime]) -> float:
+    """Contribution to its post's stored score of a like made at ``liked_at``.
+
+    Scores are undecayed counts until the first decay (``decayed_at`` None).
+    """
+    if decayed_at is None:
+        return 1.0
+    return 0.5 ** ((decayed_at - liked_at).total_seconds() / (settings.trending_half_life_hours * 3600))
+
+
+def clamped_score(delta):
+    """SQL expression for ``hot_score + delta`` that never goes below zero."""
+    score = Post.hot_score + delta
+    return case((score > MIN_HOT_SCORE, score), else_=0.0)
+
+
+def decay_scores(db: Session, now: Optional[datetime] = None) -> int:
+    """Decay all scores for the time since the previous decay. Returns the number of posts updated.
+
+    Safe to run from several processes: the decay timestamp is advanced with a
+    compare-and-set first, so concurrent runs do not decay twice. The first
+    run turns the undecayed counts into exact scores with ``rebuild_hot_scores``.
+    """
+    now = now or datetime.utcnow()
+    previous = last_decay(db)
+    if previous is None:
+        return rebuild_hot_scores(db, now)
+    if now <= previous:
+        return 0
+
+    claimed = db.query(TrendingDecay).filter(
+        TrendingDecay.id == _STATE_ID,
+        TrendingDecay.decayed_at == previous
+    ).update({TrendingDecay.decayed_at: now}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        return 0
+
+    factor = decay_factor((now - previous).total_seconds())
+    decayed = Post.hot_score * factor
+    updated = db.query(Post).filter(Post.hot_score > 0).update(
+        {Post.hot_score: case((decayed > MIN_HOT_SCORE, decayed), else_=0.0)},
+        synchronize_session=False
+    )
+    db.commit()
+    return updated
+
+
+def rebuild_hot_scores(db: Session, now: Optional[datetime] = None) -> int:
+    """Recompute every score exactly from the likes table. Returns the number of posts with a score."""
+    now = now or datetime.utcnow()
+    scores: Dict[int, float] = defaultdict(float)
+    for post_id, liked_at in db.query(Like.post_id, Like.created_at).yield_per(10000):
+        scores[post_id] += decay_factor((now - liked_at).total_seconds())
+
+    db.query(Post).filter(Post.hot_score != 0).update({Post.hot_score: 0.0}, synchronize_session=False)
+    rows = [{"pid": post_id, "score": score} for post_id, score in scores.items() if score > MIN_HOT_SCORE]
+    if rows:
+        posts = Post.__table__
+        db.connection().execute(
+            update(posts).where(posts.c.id == bindparam("pid")).values(hot_score=bindparam("score")),
+            rows
+        )
+    state = db.get(TrendingDecay, _STATE_ID)
+    if state is None:
+        db.add(TrendingDecay(id=_STATE_ID, decayed_at=now))
+    else:
+        state.decayed_at = now
+    db.commit()
+    return len(rows)
+
+
+class StaleCursor(Exception):
+    """A trending cursor taken before the scores were last decayed or rebuilt."""
+
+
+def get_trending(
+    db: Session,
+    limit: int = 20,
+    after: Optional[Tuple[datetime, float, int]] = None
+) -> Tuple[List[Row], datetime]:
+    """Posts with a positive hot score, hottest first, paginated by ``(scores_at, hot_score, id)`` cursor.
+
+    ``scores_at`` is the decay the scores are relative to (``datetime.min``
+    before the first). Every decay rescales all scores, so a cursor taken
+    before one raises ``StaleCursor`` instead of skipping or repeating posts.
+    Returns rows of the ``PostResponse`` columns plus ``hot_score``, and the
+    current ``scores_at``.
+    """
+    # Read in the same statement as the scores, so that both come from one snapshot
+    decayed_at = db.query(TrendingDecay.decayed_at).filter(TrendingDecay.id == _STATE_ID).scalar_subquery()
+    query = db.query(*POST_COLUMNS, Post.hot_score, decayed_at.label("scores_at")).filter(Post.hot_score > 0)
+    if after is not None:
+        query = query.filter(tuple_(Post.hot_score, Post.id) < tuple_(*after[1:]))
+    rows = query.order_by(Post.hot_score.desc(), Post.id.desc()).limit(limit).all()
+    scores_at = (rows[0].scores_at if rows else last_decay(db)) or datetime.min
+    if after is not None and after[0] != scores_at:
+        raise StaleCursor()
+    return rows, scores_at
@@ -1,8 +1,9 @@
+from sqlalchemy import Row
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional, Sequence
 from ..models.user import User
 from ..schemas.user import UserCreate
-from ..utils.security import get_password_hash
+from .columns import USER_COLUMNS
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
@@ -20,9 +21,17 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.query(User).filter(User.id == user_id).first()
 
 
-def create_user(db: Session, user: UserCreate) -> User:
-    """Create a new user."""
-    hashed_password = get_password_hash(user.password)
+def get_users_by_ids(db: Session, user_ids: Sequence[int]) -> List[Row]:
+    """Users with the given ids in one ``IN`` query, in the order of ``user_ids``; missing ids are skipped.
+
+    Returns rows of the ``UserResponse`` columns.
+    """
+    found = {row.id: row for row in db.query(*USER_COLUMNS).filter(User.id.in_(user_ids))}
+    return [found[user_id] for user_id in user_ids if user_id in found]
+
+
+def create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
+    """Create a new user with an already hashed password (see ``utils.security.get_password_hash``)."""
     db_user = User(
         username=user.username,
         email=user.email,
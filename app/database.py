@@ -1,30 +1,238 @@
-from sqlalchemy import create_engine
+from typing import Any, Callable, Dict, Optional, Set, TypeVar, Union
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from .utils.fts import init_search_index
+from .utils import query_stats
 
-# Create SQLite engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
+
+def _is_sqlite_file(url: str) -> bool:
+    """Whether ``url`` points at an on-disk SQLite database (not ``:memory:``)."""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool) -> None:
+    """Apply the configured SQLite engine profile to a freshly opened connection."""
+    pragmas = [
+        f"PRAGMA journal_mode = {settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _engine_options(url: str, read_only: bool, async_: bool = False) -> Dict[str, Any]:
+    """Pool settings for the write engine (small) or the read-only engine (larger)."""
+    options: Dict[str, Any] = {"connect_args": {"check_same_thread": False}}  # Needed for SQLite
+    if _is_sqlite_file(url):
+        options.update(
+            poolclass=AsyncAdaptedQueuePool if async_ else QueuePool,
+            pool_size=settings.db_read_pool_size if read_only else settings.db_write_pool_size,
+            max_overflow=0,
+            pool_timeout=settings.db_pool_timeout_seconds,
+        )
+    return options
+
+
+def _configure(sync_engine: Engine, url: str, read_only: bool) -> None:
+    """Install the SQLite pragma profile on every new connection of ``sync_engine``."""
+    if not _is_sqlite_file(url):
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+
+def _create_engine(url: str, read_only: bool) -> Engine:
+    db_engine = create_engine(url, **_engine_options(url, read_only))
+    _configure(db_engine, url, read_only)
+    query_stats.instrument(db_engine, "read" if read_only else "write")
+    return db_engine
+
+
+def _create_async_engine(url: str, read_only: bool) -> AsyncEngine:
+    db_engine = create_async_engine(url, **_engine_options(url, read_only, async_=True))
+    _configure(db_engine.sync_engine, url, read_only)
+    query_stats.instrument(db_engine.sync_engine, "read" if read_only else "write")
+    return db_engine
+
+
+# Write engine: a small pool, so writers queue in Python instead of fighting over
+# SQLite's single write lock. With WAL, readers never block on it, and get their
+# own larger, query-only pool. In-memory and non-SQLite databases share one engine.
+engine = _create_engine(settings.database_url, read_only=False)
+read_engine = _create_engine(settings.database_url, read_only=True) if _is_sqlite_file(settings.database_url) else engine
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+def _async_database_url() -> str:
+    """URL for the asyncio engine: explicit setting, or database_url on the aiosqlite driver."""
+    if settings.async_database_url:
+        return settings.async_database_url
+    return settings.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+# Optional asyncio engines: when enabled, request handlers talk to the database
+# through aiosqlite instead of occupying threadpool workers.
+async_engine: Optional[AsyncEngine] = None
+async_read_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+AsyncReadSessionLocal: Optional[async_sessionmaker] = None
+if settings.async_database:
+    _url = _async_database_url()
+    async_engine = _create_async_engine(_url, read_only=False)
+    async_read_engine = _create_async_engine(_url, read_only=True) if _is_sqlite_file(_url) else async_engine
+    # Objects must stay usable after commit: lazy refreshes cannot happen outside run_sync.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+# Session handed to request handlers: sync or async depending on settings.async_database
+DbSession = Union[Session, AsyncSession]
+
+T = TypeVar("T")
 
 # Create Base class for models
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency for getting database session."""
-    db = SessionLocal()
+async def _session_scope(session_factory, async_session_factory):
+    if async_session_factory is not None:
+        async with async_session_factory() as db:
+            yield db
+        return
+
+    db = session_factory()
     try:
         yield db
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+
+
+async def get_db():
+    """Dependency for getting database session (write pool).
+
+    Yields an ``AsyncSession`` when ``settings.async_database`` is enabled and a
+    regular ``Session`` otherwise; pass it to CRUD functions through ``run_db``.
+    """
+    async for db in _session_scope(SessionLocal, AsyncSessionLocal):
+        yield db
+
+
+async def get_read_db():
+    """Dependency for a read-only database session, for routes that never write."""
+    async for db in _session_scope(ReadSessionLocal, AsyncReadSessionLocal):
+        yield db
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a CRUD function (``fn(db, ...)``) without blocking the event loop.
+
+    With an ``AsyncSession`` the function runs via ``run_sync`` so every query
+    is awaited on aiosqlite; with a sync ``Session`` it runs in the threadpool.
+    The CRUD modules are therefore shared by both database paths.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+# Statements filling an added column from existing rows, run in the transaction adding it
+COLUMN_BACKFILLS: Dict[str, str] = {
+    "posts.likes_count": (
+        "UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id)"
+    ),
+}
+
+
+def _add_missing_columns() -> Set[str]:
+    """Add columns declared on the models but missing from existing tables.
+
+    ``create_all`` only creates missing tables, so columns introduced later
+    (e.g. ``posts.likes_count``) are added here. New columns must be nullable
+    or carry a ``server_default``; those derived from other rows are filled
+    by their ``COLUMN_BACKFILLS`` statement before the transaction commits.
+    Returns the added columns as ``"table.column"``.
+    """
+    added: Set[str] = set()
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.exec_driver_sql(ddl)
+                added.add(f"{table.name}.{column.name}")
+        for column in sorted(added.intersection(COLUMN_BACKFILLS)):
+            conn.exec_driver_sql(COLUMN_BACKFILLS[column])
+    return added
+
+
+def _create_missing_indexes():
+    """Create indexes declared on the models but missing from existing tables.
+
+    ``create_all`` only emits indexes together with the tables it creates.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def init_db():
     """Initialize database tables."""
+    added_columns = _add_missing_columns()
+    with engine.connect() as conn:
+        new_tag_index = not inspect(conn).has_table("post_tags")
+        new_timelines = not inspect(conn).has_table("timeline_entries")
+        new_duplicate_index = not inspect(conn).has_table("post_minhash_buckets")
     Base.metadata.create_all(bind=engine)
+    _create_missing_indexes()
+    init_search_index(engine)
+    # Derived data a database from before its introduction has to be backfilled with
+    from .crud.tag import rebuild_facets
+    from .crud.trending import rebuild_hot_scores
+    from .crud.timeline import rebuild_timelines
+    from .crud.duplicate import rebuild_duplicate_index
+    if new_tag_index:
+        _backfill(rebuild_facets)
+    if "posts.hot_score" in added_columns:
+        _backfill(rebuild_hot_scores)
+    if new_timelines:
+        _backfill(rebuild_timelines)
+    if new_duplicate_index:
+        _backfill(rebuild_duplicate_index)
+
+
+def _backfill(rebuild: Callable[[Session], Any]) -> None:
+    db = SessionLocal()
+    try:
+        rebuild(db)
+    finally:
+        db.close()
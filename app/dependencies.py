@@ -1,32 +1,59 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_db
-from .utils.security import decode_access_token
+from typing import Optional
+from .database import DbSession, get_read_db, run_db
+from .utils.security import decode_access_token_claims
 from .crud import user as user_crud
-from .models.user import User
+from .services.auth_cache import UserPrincipal, principal_cache
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+# Same scheme for routes that also serve anonymous callers
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user from JWT token."""
+    db: DbSession = Depends(get_read_db)
+) -> UserPrincipal:
+    """Get the current authenticated user from JWT token.
+
+    Verified tokens are cached (up to their expiry), so repeat requests
+    skip both the signature check and the users lookup.
+    """
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    username = decode_access_token(token)
+    claims = decode_access_token_claims(token)
+    username = claims.get("sub") if claims else None
     if username is None:
         raise credentials_exception
     
-    user = user_crud.get_user_by_username(db, username=username)
+    user = await run_db(db, user_crud.get_user_by_username, username=username)
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = UserPrincipal.from_user(user)
+    principal_cache.set(token, principal, expires_at=claims.get("exp"))
+    return principal
+
+
+async def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: DbSession = Depends(get_read_db)
+) -> Optional[UserPrincipal]:
+    """The authenticated user, or None for requests without a bearer token.
+
+    An invalid token is still rejected with 401 rather than silently
+    treated as anonymous.
+    """
+    if token is None:
+        return None
+    return await get_current_user(token=token, db=db)
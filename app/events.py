@@ -0,0 +1,61 @@
+"""In-process write events.
+
+CRUD functions publish an event after each successful commit; caches and
+derived read models subscribe to keep themselves in sync without the CRUD
+layer having to know about them.
+
+Handlers run synchronously in the publishing thread and must be cheap and
+thread-safe. A failing handler is logged and never breaks the write that
+triggered it.
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Post events carry ``post``: a dict of the post's column values.
+# ``post_updated`` also carries ``previous``: the column values before the update.
+POST_CREATED = "post_created"
+POST_UPDATED = "post_updated"
+POST_DELETED = "post_deleted"
+# Like events carry ``user_id`` and ``post_id``.
+LIKE_CREATED = "like_created"
+LIKE_DELETED = "like_deleted"
+# User events carry ``user_id``; published when a user's account data
+# (username, email, password) changes or the user is removed.
+USER_UPDATED = "user_updated"
+USER_DELETED = "user_deleted"
+
+Handler = Callable[..., None]
+
+_handlers: DefaultDict[str, List[Handler]] = defaultdict(list)
+
+
+def subscribe(*events: str) -> Callable[[Handler], Handler]:
+    """Decorator registering a handler for one or more events."""
+    def decorator(handler: Handler) -> Handler:
+        for event in events:
+            _handlers[event].append(handler)
+        return handler
+    return decorator
+
+
+def unsubscribe(event: str, handler: Handler) -> None:
+    """Remove a previously registered handler."""
+    if handler in _handlers[event]:
+        _handlers[event].remove(handler)
+
+
+def publish(event: str, **payload: Any) -> None:
+    """Call every handler of ``event`` with ``event=event`` plus the payload."""
+    for handler in list(_handlers[event]):
+        try:
+            handler(event=event, **payload)
+        except Exception:
+            logger.exception("Handler %r failed for event %s", handler, event)
+
+
+def snapshot(instance) -> Dict[str, Any]:
+    """Column values of an ORM instance, safe to hand to handlers after the session closes."""
+    return {column.key: getattr(instance, column.key) for column in instance.__table__.columns}
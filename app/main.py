@@ -1,13 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from .database import init_db
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+from .database import async_engine, async_read_engine, init_db
+from .utils.pagination import NEXT_CURSOR_HEADER
 from .api.v1 import auth, users, posts, likes
+from .services.compression import CompressionMiddleware
+from .services.jobs import job_runner
+from .services.password_hasher import PasswordHasherBusy, password_hasher
+from .services.like_buffer import LikeBufferFull, like_buffer
+from .services.trending import trending_decay
+from .services.recent_posts import recent_posts
+from .services.similar_posts import similar_posts
+from .services.suggestions import post_suggestions
+from .services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, metrics
 
 # Create FastAPI app
 app = FastAPI(
     title="AI Prompt Sharing API",
     description="A Twitter-like platform for sharing AI prompts",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -17,7 +31,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_min_size,
+    enabled=settings.compression_enabled,
+)
+# Outermost, so latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
@@ -26,10 +48,77 @@ app.include_router(posts.router, prefix="/api/v1/posts", tags=["Posts"])
 app.include_router(likes.router, prefix="/api/v1", tags=["Likes"])
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """Shed login/registration load instead of queueing it without bound."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(LikeBufferFull)
+async def like_buffer_full_handler(request: Request, exc: LikeBufferFull):
+    """Refuse new likes while buffered ones cannot be written, instead of buffering them without bound."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def check_worker_count() -> None:
+    """Refuse to run the in-memory read models in one of several worker processes.
+
+    They are kept current by this process's write events only, so with
+    ``WEB_CONCURRENCY`` above 1 they would miss the other workers' writes for
+    good. (The response cache is bounded by its TTL instead.)
+    """
+    if settings.web_concurrency <= 1:
+        return
+    per_process = [
+        name for name, service in (
+            ("RECENT_POSTS_ENABLED", recent_posts),
+            ("SIMILAR_POSTS_ENABLED", similar_posts),
+            ("SUGGESTIONS_ENABLED", post_suggestions),
+        )
+        if service.enabled
+    ]
+    if per_process:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={settings.web_concurrency}, but in-memory read models only see their own "
+            f"worker's writes: run a single worker or set {', '.join(f'{name}=false' for name in per_process)}"
+        )
+
+
 @app.on_event("startup")
-def on_startup():
-    """Initialize database on startup."""
-    init_db()
+async def on_startup():
+    """Initialize database and start background workers on startup."""
+    check_worker_count()
+    await run_in_threadpool(init_db)
+    await job_runner.start()
+    await like_buffer.start()
+    await trending_decay.start()
+    await recent_posts.start()
+    await similar_posts.start()
+    await post_suggestions.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Flush buffered likes, drain background jobs, stop the hashing pool and release pooled connections."""
+    await like_buffer.stop()
+    await trending_decay.stop()
+    await job_runner.stop()
+    await recent_posts.stop()
+    await similar_posts.stop()
+    await post_suggestions.stop()
+    password_hasher.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 
 @app.get("/")
@@ -46,3 +135,9 @@ def root():
 def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics: per-route latency and SQL statement counts, plus service stats."""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
@@ -2,5 +2,9 @@
 from .user import User
 from .post import Post
 from .like import Like
+from .tag import Tag, PostTag, LlmModelCount
+from .trending import TrendingDecay
+from .follow import Follow, TimelineEntry
+from .duplicate import PostMinhashBucket
 
-__all__ = ["User", "Post", "Like"]
+__all__ = ["User", "Post", "Like", "Tag", "PostTag", "LlmModelCount", "TrendingDecay", "Follow", "TimelineEntry", "PostMinhashBucket"]
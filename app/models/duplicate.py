@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+from ..database import Base
+
+
+class PostMinhashBucket(Base):
+    """A post filed under one LSH band of its content's MinHash signature (see crud.duplicate)."""
+    
+    __tablename__ = "post_minhash_buckets"
+    
+    bucket = Column(BigInteger, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    
+    # Lookups read whole buckets and removals address (bucket, post_id) pairs,
+    # so the rows are stored clustered by the primary key alone.
+    __table_args__ = {"sqlite_with_rowid": False}
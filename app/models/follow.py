@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from datetime import datetime
+from ..database import Base
+
+
+class Follow(Base):
+    """A user (follower) following another user (followee)."""
+    
+    __tablename__ = "follows"
+    
+    follower_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    followee_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Followers of a user (fan-out, follower lists) and followees of a user, newest first
+    __table_args__ = (
+        Index("ix_follows_followee_id_created_at", "followee_id", "created_at"),
+        Index("ix_follows_follower_id_created_at", "follower_id", "created_at"),
+    )
+
+
+class TimelineEntry(Base):
+    """A post materialized into a user's home timeline (see crud.timeline)."""
+    
+    __tablename__ = "timeline_entries"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    created_at = Column(DateTime, nullable=False)  # Copy of posts.created_at
+    
+    __table_args__ = (
+        Index("ix_timeline_entries_user_id_created_at", "user_id", "created_at", "post_id"),
+        Index("ix_timeline_entries_post_id", "post_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -14,8 +14,11 @@ class Like(Base):
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
-    # Unique constraint: one like per user per post
-    __table_args__ = (UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),)
+    # Unique constraint: one like per user per post; the index serves "my likes" newest first
+    __table_args__ = (
+        UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),
+        Index('ix_likes_user_id_created_at', 'user_id', 'created_at'),
+    )
     
     # Relationships
     user = relationship("User", back_populates="likes")
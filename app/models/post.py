@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -16,12 +16,17 @@ class Post(Base):
     llm_model = Column(String(100), nullable=False)  # e.g., "gpt-4", "claude-3", "gemini-pro"
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    likes_count = Column(Integer, default=0, server_default="0", nullable=False)  # Maintained by crud.like
+    hot_score = Column(Float, default=0.0, server_default="0", nullable=False)  # Time-decayed likes, see crud.trending
+    
+    # Feeds are read newest first, per user, per model and globally; created_at's own
+    # index (which implicitly ends in the rowid) serves the global (created_at, id) keyset.
+    __table_args__ = (
+        Index("ix_posts_user_id_created_at", "user_id", "created_at"),
+        Index("ix_posts_llm_model_created_at", "llm_model", "created_at"),
+        Index("ix_posts_hot_score", "hot_score"),
+    )
     
     # Relationships
     author = relationship("User", back_populates="posts")
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
-    
-    @property
-    def likes_count(self) -> int:
-        """Get the number of likes for this post."""
-        return len(self.likes)
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from ..database import Base
+
+
+class Tag(Base):
+    """A normalized tag parsed from ``Post.tags``."""
+    
+    __tablename__ = "tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), unique=True, index=True, nullable=False)
+    posts_count = Column(Integer, default=0, server_default="0", nullable=False)  # Maintained by crud.tag
+
+
+class PostTag(Base):
+    """Association between a post and each of its tags."""
+    
+    __tablename__ = "post_tags"
+    
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    created_at = Column(DateTime, nullable=False)  # Copy of posts.created_at
+    
+    # A tag's feed, newest first, is a range read of this index
+    __table_args__ = (Index("ix_post_tags_tag_id_created_at", "tag_id", "created_at", "post_id"),)
+
+
+class LlmModelCount(Base):
+    """Number of posts per ``Post.llm_model`` value, for facet counts."""
+    
+    __tablename__ = "llm_model_counts"
+    
+    llm_model = Column(String(100), primary_key=True)
+    posts_count = Column(Integer, default=0, server_default="0", nullable=False)  # Maintained by crud.tag
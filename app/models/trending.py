@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, DateTime
+from ..database import Base
+
+
+class TrendingDecay(Base):
+    """Single-row record of when hot scores were last decayed (see crud.trending)."""
+    
+    __tablename__ = "trending_decay"
+    
+    id = Column(Integer, primary_key=True)
+    decayed_at = Column(DateTime, nullable=False)
@@ -14,6 +14,10 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    followers_count = Column(Integer, default=0, server_default="0", nullable=False)  # Maintained by crud.follow
+    following_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Entries added to the user's home timeline since it was last trimmed (see crud.timeline)
+    timeline_untrimmed = Column(Integer, default=0, server_default="0", nullable=False)
     
     # Relationships
     posts = relationship("Post", back_populates="author", cascade="all, delete-orphan")
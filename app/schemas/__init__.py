@@ -1,12 +1,14 @@
 """Schemas package initialization."""
-from .user import UserCreate, UserResponse, UserLogin
-from .post import PostCreate, PostUpdate, PostResponse
+from .user import UserCreate, UserResponse, UserLogin, UserProfileResponse, UserBatchResponse, FollowResponse
+from .post import PostCreate, PostUpdate, PostResponse, PostSearchResponse, PostSimilarResponse, PostCreatedResponse, PostDuplicateResponse, Suggestion, PostSuggestions, PostBatchResponse, PostImportError, PostImportResult
 from .like import LikeResponse
+from .tag import FacetCount, PostFacets
 from .token import Token, TokenData
 
 __all__ = [
-    "UserCreate", "UserResponse", "UserLogin",
-    "PostCreate", "PostUpdate", "PostResponse",
+    "UserCreate", "UserResponse", "UserLogin", "UserProfileResponse", "UserBatchResponse", "FollowResponse",
+    "PostCreate", "PostUpdate", "PostResponse", "PostSearchResponse", "PostSimilarResponse", "PostCreatedResponse", "PostDuplicateResponse", "Suggestion", "PostSuggestions", "PostBatchResponse", "PostImportError", "PostImportResult",
     "LikeResponse",
+    "FacetCount", "PostFacets",
     "Token", "TokenData"
 ]
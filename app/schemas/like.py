@@ -1,10 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
 
 
 class LikeResponse(BaseModel):
     """Schema for like response."""
-    id: int
+    id: Optional[int] = Field(None, description="Null while the like is still buffered (202 Accepted)")
     user_id: int
     post_id: int
     created_at: datetime
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class PostBase(BaseModel):
@@ -30,6 +30,68 @@ class PostResponse(PostBase):
     user_id: int
     created_at: datetime
     likes_count: int
+    liked_by_me: Optional[bool] = Field(
+        None, description="Whether the authenticated caller likes this post (omitted for anonymous requests)"
+    )
     
     class Config:
         from_attributes = True
+
+
+# Fields that depend on the caller rather than the stored post (see services.liked_flags)
+VIEWER_FIELDS = ("liked_by_me",)
+
+
+class PostSearchResponse(PostResponse):
+    """Schema for a search hit: the post plus its relevance and a highlighted snippet."""
+    rank: Optional[float] = Field(None, description="BM25 relevance, lower is better (null without full-text search)")
+    snippet: Optional[str] = Field(None, description="Matching excerpt as HTML: text escaped, terms wrapped in <mark>...</mark>")
+
+
+class PostSimilarResponse(PostResponse):
+    """Schema for a post similar to another one."""
+    score: float = Field(..., description="Cosine similarity of the posts' TF-IDF vectors, from 0 to 1")
+
+
+class PostCreatedResponse(PostResponse):
+    """Schema for a newly created post."""
+    duplicate_of: Optional[int] = Field(
+        None, description="Existing post this one nearly duplicates (only with DUPLICATE_POLICY=flag)"
+    )
+
+
+class PostDuplicateResponse(PostResponse):
+    """Schema for a near-duplicate of another post."""
+    similarity: float = Field(..., description="Estimated share of word pairs the contents have in common, from 0 to 1")
+
+
+class Suggestion(BaseModel):
+    """A completion of a typed prefix."""
+    text: str
+    weight: int = Field(..., description="Popularity: posts using it (plus their likes, for titles)")
+
+
+class PostSuggestions(BaseModel):
+    """Most popular completions of a prefix, per kind."""
+    titles: List[Suggestion]
+    tags: List[Suggestion]
+    llm_models: List[Suggestion]
+
+
+class PostBatchResponse(BaseModel):
+    """Posts looked up by id, in request order."""
+    posts: List[PostResponse]
+    missing: List[int] = Field(..., description="Requested ids that do not exist")
+
+
+class PostImportError(BaseModel):
+    """A rejected line of an NDJSON import."""
+    line: int = Field(..., description="1-based line number in the uploaded body")
+    error: str
+
+
+class PostImportResult(BaseModel):
+    """Outcome of an NDJSON import."""
+    imported: int
+    failed: int
+    errors: List[PostImportError] = Field(..., description="The first rejected lines (capped)")
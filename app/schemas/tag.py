@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class FacetCount(BaseModel):
+    """A facet value and how many posts have it."""
+    name: str
+    count: int
+
+
+class PostFacets(BaseModel):
+    """Post counts per tag and per LLM model, most used first."""
+    tags: List[FacetCount] = Field(..., description="Normalized tags parsed from each post's tags field")
+    llm_models: List[FacetCount]
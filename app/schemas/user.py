@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from typing import List
 
 
 class UserBase(BaseModel):
@@ -26,3 +27,25 @@ class UserResponse(UserBase):
     
     class Config:
         from_attributes = True
+
+
+class UserProfileResponse(UserResponse):
+    """Schema for a user's public profile, with follow counts."""
+    followers_count: int
+    following_count: int
+
+
+class UserBatchResponse(BaseModel):
+    """Users looked up by id, in request order."""
+    users: List[UserResponse]
+    missing: List[int] = Field(..., description="Requested ids that do not exist")
+
+
+class FollowResponse(BaseModel):
+    """Schema for follow response."""
+    follower_id: int
+    followee_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,69 @@
+"""Cache of verified access tokens and the users they belong to.
+
+``get_current_user`` runs on every authenticated request. Caching the
+principal per token skips both the JWT signature check and the ``users``
+lookup on repeat requests. An entry never outlives the token's own ``exp``
+claim.
+
+A write that changes a user's account data or removes the user publishes
+``user_updated`` or ``user_deleted``; the user's cached tokens are then
+dropped (``invalidate_user``), so the next request verifies the token and
+loads the user again. Follows only touch the follower counters, which a
+principal does not hold, and publish neither.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from .. import events
+from ..config import settings
+from ..utils.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Lightweight, session-independent view of the authenticated user."""
+    __slots__ = ("id", "username", "email", "created_at")
+
+    id: int
+    username: str
+    email: str
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(id=user.id, username=user.username, email=user.email, created_at=user.created_at)
+
+
+class PrincipalCache:
+    """Bounded token -> principal cache with per-user invalidation."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache: TTLCache[UserPrincipal] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, token: str) -> Optional[UserPrincipal]:
+        return self._cache.get(token)
+
+    def set(self, token: str, principal: UserPrincipal, expires_at: Optional[float]) -> None:
+        """Cache a principal for a verified token; ``expires_at`` is the token's ``exp``."""
+        self._cache.set(token, principal, expires_at=expires_at)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Forget every cached token of a user (after the user changes or is deleted)."""
+        return self._cache.discard_where(lambda principal: principal.id == user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.auth_cache_size,
+    ttl=settings.auth_cache_ttl_seconds,
+)
+
+
+@events.subscribe(events.USER_UPDATED, events.USER_DELETED)
+def _on_user_changed(event: str, user_id: int, **_) -> None:
+    principal_cache.invalidate_user(user_id)
@@ -0,0 +1,207 @@
+"""Negotiated gzip/brotli compression of responses.
+
+``CompressionMiddleware`` compresses responses on the fly when the client's
+``Accept-Encoding`` allows it and the body is compressible (JSON, NDJSON,
+text) and at least ``settings.compression_min_size`` bytes. Streamed bodies
+(NDJSON exports) are compressed chunk by chunk, each chunk flushed so the
+client still gets every batch as it is produced. Brotli is offered when the
+optional ``brotli`` package is installed, gzip always.
+
+Cached responses (``services.response_cache``) are compressed once per
+encoding, at a denser level, and the compressed bodies are kept with the
+entry. They reach the middleware already encoded and pass through it.
+"""
+import gzip
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+# In order of preference when the client accepts both equally
+ENCODINGS: Tuple[str, ...] = (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+# (on the fly, dense): dense levels are for bodies compressed once and served many times
+GZIP_LEVELS = (6, 9)
+BROTLI_QUALITIES = (4, 9)
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+UNCOMPRESSED_STATUSES = (204, 304)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """The encoding to answer an ``Accept-Encoding`` header with, or None for the identity."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, dense: bool = False) -> bytes:
+    """``body`` compressed with ``encoding`` (one of ``ENCODINGS``)."""
+    if encoding == BROTLI:
+        return brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITIES[dense])
+    return gzip.compress(body, compresslevel=GZIP_LEVELS[dense], mtime=0)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the ``encoding`` variant of a representation: ``"abc"`` becomes ``"abc-gzip"``."""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def add_vary(headers: MutableHeaders) -> None:
+    """Mark a response as depending on ``Accept-Encoding`` (once)."""
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class _StreamCompressor:
+    """Incremental compressor whose output after each chunk can be decoded on its own."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT, quality=BROTLI_QUALITIES[0])
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVELS[0], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        if self.encoding == BROTLI:
+            return self._brotli.process(data) + (self._brotli.finish() if last else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionStats:
+    """Byte counts of compressed responses, per encoding."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses: Dict[str, int] = dict.fromkeys(ENCODINGS, 0)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cached_variants = 0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.responses[encoding] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                **{f"{encoding}_responses": count for encoding, count in self.responses.items()},
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "cached_variants": self.cached_variants,
+            }
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible responses with the encoding the client prefers."""
+
+    def __init__(self, app, minimum_size: int, enabled: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start: Optional[dict] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+        streamed: List[int] = [0, 0]  # bytes in, bytes out
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                data = compressor.chunk(body, last=not more_body)
+                streamed[0] += len(body)
+                streamed[1] += len(data)
+                if not more_body:
+                    compression_stats.record(encoding, *streamed)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                start["status"] in UNCOMPRESSED_STATUSES
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            add_vary(headers)
+            if encoding is None:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers["Content-Encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag  # Compressed on the fly, so not byte-for-byte the same
+            if more_body:
+                del headers["content-length"]
+                compressor = _StreamCompressor(encoding)
+                data = compressor.chunk(body, last=False)
+                streamed[0] += len(body)
+                streamed[1] += len(data)
+            else:
+                data = compress(body, encoding)
+                headers["Content-Length"] = str(len(data))
+                compression_stats.record(encoding, len(body), len(data))
+            await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
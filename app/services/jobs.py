@@ -0,0 +1,269 @@
+"""In-process queue for deferrable work: derived data a write does not wait for.
+
+Routes (and event handlers) ``submit`` a job after their own transaction has
+committed and return without waiting for it. One worker runs the jobs in a
+dedicated thread, in submission order, so a job never overtakes an earlier one
+about the same data (a post's creation and its deletion, say). A failing job
+is retried in place after ``retry_delay``, doubled on each attempt, and
+dropped (logged and counted) after ``max_attempts``; a job must therefore be
+safe to run again after a failed attempt, e.g. one transaction that reads
+the current rows instead of trusting the values it was given.
+
+``submit`` is thread-safe: CRUD code runs in threadpool workers, so jobs are
+handed to the event loop with ``call_soon_threadsafe``. The queue holds at
+most ``capacity`` jobs; past that, submitters wait for room (backpressure),
+so a full queue slows writes down but neither loses nor reorders jobs. Routes
+wait with ``submit_async``/``submit_db_async``; threads block in ``submit``.
+Code running on the event loop itself (event handlers under
+``ASYNC_DATABASE``) or in a job cannot block, so a synchronous ``submit`` from
+there is rejected when the queue is full: the job is logged and counted as
+``rejected``.
+
+When the runner is not started (the CLI), disabled or stopping, the
+submitter runs the job itself, once. A job given to ``submit_db`` then opens
+its own write session, so the submitter must not hold a write connection
+itself (commit, and do not reload expired instances, before submitting): the
+write pool may have no other.
+
+On shutdown the worker gets ``drain_timeout`` seconds to finish the queue;
+jobs still waiting then, and the one running, are counted as dropped and
+logged.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from ..config import settings
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    args: tuple
+    submitted_at: float
+
+
+class JobRunner:
+    """Bounded FIFO of background jobs run by one worker task."""
+
+    def __init__(
+        self, enabled: bool, capacity: int, max_attempts: int, retry_delay: float, drain_timeout: float
+    ):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.drain_timeout = drain_timeout
+        self._lock = threading.Lock()
+        # Notified (under _lock) whenever a job finishes, for threads waiting for room
+        self._room = threading.Condition(self._lock)
+        # Set on the loop whenever a job finishes, for coroutines waiting for room
+        self._room_event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Threads that cannot wait for room: the loop's, and the worker's own (a job submitting a job)
+        self._loop_thread: Optional[int] = None
+        self._worker_thread: Optional[int] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # One thread of its own, so that submitters blocked in the threadpool cannot starve it
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._accepting = False
+        # Bumped when a stop gives up on the queue: jobs of an older run no longer count
+        self._run_id = 0
+        # Jobs submitted to the worker and not finished yet (queued or running)
+        self.depth = 0
+        self.max_depth = 0
+        self.submitted = 0
+        self.inline = 0
+        self.waits = 0
+        self.rejected = 0
+        self.completed = 0
+        self.retries = 0
+        self.failures = 0
+        self.dropped = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+    def submit(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        """Run ``fn(*args)`` in the background, waiting for room if the queue is full.
+
+        Runs it right away when the runner is not running; rejects it when the
+        queue is full and the caller is the event loop or the worker, which
+        cannot wait.
+        """
+        job = Job(name, fn, args, time.perf_counter())
+        with self._lock:
+            if self._accepting and self.depth >= self.capacity:
+                if threading.get_ident() in (self._loop_thread, self._worker_thread):
+                    self.rejected += 1
+                    logger.error("Background job queue full, job %s rejected", name)
+                    return
+                self.waits += 1
+                self._room.wait_for(lambda: not self._accepting or self.depth < self.capacity)
+            queued = self._accepting and self._enqueue(job)
+            if not queued:
+                self.inline += 1
+        if not queued:
+            self._attempt(job)
+
+    async def submit_async(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        """``submit`` from a coroutine: waits on the loop for room in the queue."""
+        job = Job(name, fn, args, time.perf_counter())
+        waited = False
+        while True:
+            with self._lock:
+                if not self._accepting or self.depth < self.capacity:
+                    queued = self._accepting and self._enqueue(job)
+                    if not queued:
+                        self.inline += 1
+                    break
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self._room_event.clear()
+            await self._room_event.wait()
+        if not queued:
+            self._attempt(job)
+
+    def submit_db(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        """``submit`` a CRUD function (``fn(db, ...)``), run with its own write session."""
+        self.submit(name, _with_session, fn, *args)
+
+    async def submit_db_async(self, name: str, fn: Callable[..., Any], *args: Any) -> None:
+        """``submit_async`` a CRUD function (``fn(db, ...)``), run with its own write session."""
+        await self.submit_async(name, _with_session, fn, *args)
+
+    def _enqueue(self, job: Job) -> bool:
+        """Hand ``job`` to the worker (under ``_lock``). False if the loop is gone."""
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, (self._run_id, job))
+        except RuntimeError:  # The loop is closed
+            return False
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        self.submitted += 1
+        return True
+
+    def _attempt(self, job: Job) -> bool:
+        try:
+            job.fn(*job.args)
+        except Exception:
+            logger.exception("Background job %s failed", job.name)
+            return False
+        return True
+
+    def _execute(self, run_id: int, job: Job) -> None:
+        self._worker_thread = threading.get_ident()
+        started = time.perf_counter()
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self.retries += 1
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            if self._attempt(job):
+                self.completed += 1
+                break
+        else:
+            self.failures += 1
+            logger.error("Background job %s dropped after %d attempts", job.name, self.max_attempts)
+        finished = time.perf_counter()
+        with self._lock:
+            if run_id == self._run_id:  # Otherwise already counted as dropped by ``stop``
+                self.depth -= 1
+            self.last_wait_seconds = started - job.submitted_at
+            self.wait_seconds += started - job.submitted_at
+            self.run_seconds += finished - started
+            self._room.notify_all()
+        try:
+            self._loop.call_soon_threadsafe(self._room_event.set)
+        except RuntimeError:  # The loop is closed
+            pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            await loop.run_in_executor(self._executor, self._execute, *item)
+
+    async def start(self) -> None:
+        """Start the worker task (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._queue = asyncio.Queue()
+        self._room_event = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs")
+        self._task = asyncio.create_task(self._run())
+        with self._lock:
+            self._accepting = True
+
+    async def stop(self) -> None:
+        """Stop taking jobs and wait up to ``drain_timeout`` seconds for the queued ones."""
+        if self._task is None:
+            return
+        with self._lock:
+            self._accepting = False
+            # Queued behind every job already handed to the loop
+            self._loop.call_soon(self._queue.put_nowait, None)
+            # Submitters waiting for room run their jobs themselves
+            self._room.notify_all()
+        self._room_event.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            with self._lock:
+                # The queued jobs and the one still running, which is left to finish uncounted
+                left = self.depth
+                self.dropped += left
+                self.depth = 0
+                self._run_id += 1
+            logger.error("Shutting down with %d background jobs left undone", left)
+        self._executor.shutdown(wait=False)
+        self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "inline": self.inline,
+                "waits": self.waits,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "retries": self.retries,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "wait_seconds": self.wait_seconds,
+                "run_seconds": self.run_seconds,
+                "last_wait_seconds": self.last_wait_seconds,
+            }
+
+
+def _with_session(fn: Callable[..., Any], *args: Any) -> None:
+    db = SessionLocal()
+    try:
+        fn(db, *args)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+job_runner = JobRunner(
+    enabled=settings.jobs_enabled,
+    capacity=settings.job_queue_size,
+    max_attempts=settings.job_max_attempts,
+    retry_delay=settings.job_retry_delay_ms / 1000,
+    drain_timeout=settings.job_drain_timeout_seconds,
+)
@@ -0,0 +1,205 @@
+"""Write-behind buffer for like/unlike requests.
+
+With the buffer enabled, a like or unlike request only records the user's
+intent in memory and returns. A background task applies the accumulated
+intents in one transaction (``crud.like.apply_like_changes``) every
+``like_buffer_flush_interval_ms`` or as soon as ``like_buffer_batch_size``
+intents are pending. Repeated like/unlike toggles by the same user coalesce
+into a single row change.
+
+The API keeps its answers: the current state of a (user, post) pair is the
+pending intent if there is one, else the intent being flushed, else the
+database. "Already liked" is still a 400 and "not liked" is still a 404. The
+database's unique constraint remains the final guard.
+
+Failed flushes keep their intents for the next attempt, so the buffer is
+capped at ``like_buffer_max_pending`` intents: past that (the database has
+been failing for a while), new intents raise ``LikeBufferFull``, which the
+app answers with 503 and ``Retry-After``. Toggling an intent already
+pending is still accepted, as it does not grow the buffer.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import DbSession, SessionLocal, run_db
+from ..crud import like as like_crud
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, int]
+
+
+class LikeBufferFull(Exception):
+    """Raised when too many intents are waiting to be written and the request should be retried later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Like buffer is full")
+        self.retry_after = retry_after
+
+
+class LikeBuffer:
+    """Coalesces like intents in memory and flushes them in bulk transactions."""
+
+    def __init__(self, enabled: bool, flush_interval: float, batch_size: int, max_pending: int):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retry_after = max(1, math.ceil(flush_interval))
+        self._pending: Dict[Key, bool] = {}
+        self._inflight: Dict[Key, bool] = {}
+        # Bumped after every committed flush; readers of the database state retry if it moved.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.flushed_intents = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_flush_seconds = 0.0
+
+    def _overlay(self, key: Key) -> Optional[bool]:
+        state = self._pending.get(key)
+        if state is None:
+            state = self._inflight.get(key)
+        return state
+
+    async def _set(self, db: DbSession, user_id: int, post_id: int, liked: bool) -> bool:
+        key = (user_id, post_id)
+        while True:
+            with self._lock:
+                current = self._overlay(key)
+                generation = self._generation
+            if current is None:
+                current = await run_db(db, like_crud.check_user_liked_post, user_id=user_id, post_id=post_id)
+            with self._lock:
+                if self._generation != generation:
+                    continue  # a flush committed while we read; re-evaluate
+                overlay = self._overlay(key)
+                if overlay is not None:
+                    current = overlay
+                if current == liked:
+                    return False
+                if key not in self._pending and len(self._pending) + len(self._inflight) >= self.max_pending:
+                    self.rejected += 1
+                    raise LikeBufferFull(self.retry_after)
+                self._pending[key] = liked
+                full = len(self._pending) >= self.batch_size
+            if full and self._wakeup is not None:
+                self._wakeup.set()
+            return True
+
+    async def like(self, db: DbSession, user_id: int, post_id: int) -> bool:
+        """Record a like. Returns False if the user already likes the post; raises ``LikeBufferFull``."""
+        return await self._set(db, user_id, post_id, True)
+
+    async def unlike(self, db: DbSession, user_id: int, post_id: int) -> bool:
+        """Record an unlike. Returns False if the user does not like the post; raises ``LikeBufferFull``."""
+        return await self._set(db, user_id, post_id, False)
+
+    async def liked_post_ids(self, db: DbSession, user_id: int, post_ids: Iterable[int]) -> Set[int]:
+        """Which of ``post_ids`` the user likes, counting intents that are not flushed yet."""
+        post_ids = set(post_ids)
+        while True:
+            with self._lock:
+                generation = self._generation
+            liked = await run_db(db, like_crud.get_liked_post_ids, user_id=user_id, post_ids=post_ids)
+            with self._lock:
+                if self._generation != generation:
+                    continue  # a flush committed while we read; re-evaluate
+                for post_id in post_ids:
+                    overlay = self._overlay((user_id, post_id))
+                    if overlay is True:
+                        liked.add(post_id)
+                    elif overlay is False:
+                        liked.discard(post_id)
+            return liked
+
+    def flush(self) -> int:
+        """Write all pending intents in one transaction (blocking). Returns the number of intents flushed."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+                batch = self._inflight
+
+            start = time.perf_counter()
+            db = SessionLocal()
+            try:
+                inserted, deleted = like_crud.apply_like_changes(db, batch)
+            except Exception:
+                db.rollback()
+                self.failures += 1
+                logger.exception("Like buffer flush of %d intents failed; will retry", len(batch))
+                with self._lock:
+                    # Newer intents win over the failed ones.
+                    self._pending = {**batch, **self._pending}
+                    self._inflight = {}
+                return 0
+            finally:
+                db.close()
+
+            with self._lock:
+                self._inflight = {}
+                self._generation += 1
+            self.flushes += 1
+            self.flushed_intents += len(batch)
+            self.rows_written += len(inserted) + len(deleted)
+            self.last_flush_seconds = time.perf_counter() - start
+            return len(batch)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await run_in_threadpool(self.flush)
+
+    async def start(self) -> None:
+        """Start the periodic flush task (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still pending."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "flushes": self.flushes,
+            "flushed_intents": self.flushed_intents,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+
+like_buffer = LikeBuffer(
+    enabled=settings.like_buffer_enabled,
+    flush_interval=settings.like_buffer_flush_interval_ms / 1000,
+    batch_size=settings.like_buffer_batch_size,
+    max_pending=settings.like_buffer_max_pending,
+)
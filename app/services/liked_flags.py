@@ -0,0 +1,59 @@
+"""``liked_by_me`` flags on post responses.
+
+Post bodies are rendered (and cached) once for all callers. For an
+authenticated caller, the flags of a whole page are then computed with one
+``IN`` query against ``likes(user_id, post_id)`` and added to the rendered
+posts, instead of clients asking about each post separately. Anonymous
+responses carry no flag, and every response of these routes varies on
+``Authorization``.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set
+import orjson
+from fastapi.responses import ORJSONResponse
+from ..database import DbSession, run_db
+from ..crud import like as like_crud
+from .auth_cache import UserPrincipal
+from .like_buffer import like_buffer
+from .response_cache import CachedResponse, Personalizer
+
+VARY_HEADERS = {"Vary": "Authorization"}
+
+
+async def liked_post_ids(db: DbSession, user_id: int, post_ids: Sequence[int]) -> Set[int]:
+    """Which of ``post_ids`` the user likes (including buffered, not yet flushed likes)."""
+    if like_buffer.enabled:
+        return await like_buffer.liked_post_ids(db, user_id=user_id, post_ids=post_ids)
+    return await run_db(db, like_crud.get_liked_post_ids, user_id=user_id, post_ids=post_ids)
+
+
+async def add_flags(db: DbSession, viewer: Optional[UserPrincipal], posts: List[Dict[str, Any]]) -> None:
+    """Set ``liked_by_me`` on rendered posts in place (no-op for anonymous callers)."""
+    if viewer is None or not posts:
+        return
+    liked = await liked_post_ids(db, viewer.id, [post["id"] for post in posts])
+    for post in posts:
+        post["liked_by_me"] = post["id"] in liked
+
+
+async def posts_response(
+    db: DbSession,
+    viewer: Optional[UserPrincipal],
+    posts: List[Dict[str, Any]],
+    headers: Optional[Mapping[str, str]] = None
+) -> ORJSONResponse:
+    """List response of rendered posts, flagged for the caller."""
+    await add_flags(db, viewer, posts)
+    return ORJSONResponse(content=posts, headers={**(headers or {}), **VARY_HEADERS})
+
+
+def personalizer(db: DbSession, viewer: Optional[UserPrincipal]) -> Optional[Personalizer]:
+    """``serve_cached`` hook flagging a cached post (or list of posts) for an authenticated caller."""
+    if viewer is None:
+        return None
+
+    async def personalize(entry: CachedResponse) -> CachedResponse:
+        content = orjson.loads(entry.body)
+        await add_flags(db, viewer, content if isinstance(content, list) else [content])
+        return entry.with_body(orjson.dumps(content))
+
+    return personalize
@@ -0,0 +1,339 @@
+"""Request and SQL metrics in Prometheus text format.
+
+``MetricsMiddleware`` times every HTTP request and, through
+``query_stats.track_request``, counts the SQL statements it ran. Results are
+aggregated per route template (``/api/v1/posts/{post_id}``, not the concrete
+path) so label cardinality stays bounded. A request that runs the same
+statement more than ``settings.n_plus_one_threshold`` times is logged and
+counted as a suspected N+1.
+
+``/metrics`` renders these together with the stats of the in-process services
+(password hasher, auth cache, response cache, compression, like buffer,
+trending decay, recent posts, similar posts index, suggestions, background
+jobs) and the engines' process-wide statement totals.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Sequence, Tuple
+from ..config import settings
+from ..utils import query_stats
+from ..utils.query_stats import QueryStats
+from .auth_cache import principal_cache
+from .compression import compression_stats
+from .jobs import job_runner
+from .like_buffer import like_buffer
+from .password_hasher import password_hasher
+from .recent_posts import recent_posts
+from .response_cache import response_cache
+from .similar_posts import similar_posts
+from .suggestions import post_suggestions
+from .trending import trending_decay
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Cumulative-bucket histogram (not thread-safe; guarded by ``Metrics``)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class RouteMetrics:
+    """Everything recorded for one (method, route) pair."""
+
+    def __init__(self):
+        self.statuses: DefaultDict[int, int] = defaultdict(int)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.n_plus_one = 0
+
+
+class Metrics:
+    """Per-route request metrics."""
+
+    def __init__(self, enabled: bool, n_plus_one_threshold: int):
+        self.enabled = enabled
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._routes: DefaultDict[Tuple[str, str], RouteMetrics] = defaultdict(RouteMetrics)
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, queries: QueryStats) -> None:
+        statement, repeats = queries.most_repeated()
+        suspected = repeats > self.n_plus_one_threshold and not queries.batched
+        if suspected:
+            logger.warning(
+                "Possible N+1 on %s %s: one statement ran %d times (%d queries total): %s",
+                method, route, repeats, queries.count, " ".join(statement.split())[:300],
+            )
+        with self._lock:
+            entry = self._routes[(method, route)]
+            entry.statuses[status_code] += 1
+            entry.latency.observe(seconds)
+            entry.queries.observe(queries.count)
+            entry.sql_seconds += queries.seconds
+            if suspected:
+                entry.n_plus_one += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        out = _Writer()
+        with self._lock:
+            routes = sorted(self._routes.items())
+
+            out.family("http_requests_total", "counter", "HTTP requests by route and status.")
+            for (method, route), entry in routes:
+                for status_code, count in sorted(entry.statuses.items()):
+                    out.sample("http_requests_total", count, method=method, route=route, status=str(status_code))
+
+            out.family("http_request_duration_seconds", "histogram", "HTTP request latency.")
+            for (method, route), entry in routes:
+                out.histogram("http_request_duration_seconds", entry.latency, method=method, route=route)
+
+            out.family("http_request_db_queries", "histogram", "SQL statements issued per request.")
+            for (method, route), entry in routes:
+                out.histogram("http_request_db_queries", entry.queries, method=method, route=route)
+
+            out.family("http_request_db_seconds_total", "counter", "Time spent executing SQL, summed over requests.")
+            for (method, route), entry in routes:
+                out.sample("http_request_db_seconds_total", entry.sql_seconds, method=method, route=route)
+
+            out.family(
+                "http_request_n_plus_one_total", "counter",
+                "Requests that repeated one SQL statement more than the N+1 threshold.",
+            )
+            for (method, route), entry in routes:
+                out.sample("http_request_n_plus_one_total", entry.n_plus_one, method=method, route=route)
+
+        totals = query_stats.engine_totals()
+        out.family("db_queries_total", "counter", "SQL statements executed, per engine (including background work).")
+        for name, (count, _) in sorted(totals.items()):
+            out.sample("db_queries_total", count, engine=name)
+        out.family("db_query_seconds_total", "counter", "Time spent executing SQL, per engine.")
+        for name, (_, seconds) in sorted(totals.items()):
+            out.sample("db_query_seconds_total", seconds, engine=name)
+
+        for prefix, stats, described in SERVICE_STATS:
+            for key, value in stats().items():
+                kind, help_text = described[key]
+                name = f"app_{prefix}_{key}"
+                if kind == COUNTER and not name.endswith("_total"):
+                    name += "_total"
+                out.family(name, kind, help_text)
+                out.sample(name, value)
+        return out.text()
+
+
+class _Writer:
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        if labels:
+            rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            name = f"{name}{{{rendered}}}"
+        self._lines.append(f"{name} {float(value):g}" if isinstance(value, float) else f"{name} {value}")
+
+    def histogram(self, name: str, histogram: Histogram, **labels: str) -> None:
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            self.sample(f"{name}_bucket", count, **labels, le=f"{bound:g}")
+        self.sample(f"{name}_bucket", histogram.total, **labels, le="+Inf")
+        self.sample(f"{name}_sum", float(histogram.sum), **labels)
+        self.sample(f"{name}_count", histogram.total, **labels)
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+COUNTER = "counter"
+GAUGE = "gauge"
+
+# Per service stat: (type, help). Counters are exported with a ``_total`` suffix.
+StatDescriptions = Dict[str, Tuple[str, str]]
+
+PASSWORD_HASHER_STATS: StatDescriptions = {
+    "workers": (GAUGE, "Worker processes hashing and verifying passwords."),
+    "capacity": (GAUGE, "Hashing jobs admitted at once (running or queued) before requests are rejected."),
+    "in_flight": (GAUGE, "Hashing jobs running or queued."),
+    "queue_depth": (GAUGE, "Hashing jobs waiting for a free worker."),
+    "peak_in_flight": (GAUGE, "Most hashing jobs running or queued at once since startup."),
+    "completed": (COUNTER, "Password hashes and verifications completed."),
+    "rejected": (COUNTER, "Hashing jobs rejected because the pool was at capacity."),
+    "latency_seconds_total": (COUNTER, "Time spent hashing and verifying passwords, queueing included."),
+    "latency_seconds_max": (GAUGE, "Longest hash or verification since startup, queueing included."),
+    "pool_restarts": (COUNTER, "Process pools replaced after a worker process died."),
+}
+
+AUTH_CACHE_STATS: StatDescriptions = {
+    "size": (GAUGE, "Verified tokens cached."),
+    "maxsize": (GAUGE, "Verified tokens the cache holds at most."),
+    "hits": (COUNTER, "Authenticated requests served a cached principal."),
+    "misses": (COUNTER, "Authenticated requests that verified the token and loaded the user."),
+    "evictions": (COUNTER, "Tokens evicted to make room for newer ones."),
+}
+
+RESPONSE_CACHE_STATS: StatDescriptions = {
+    "size": (GAUGE, "Responses cached."),
+    "maxsize": (GAUGE, "Responses the cache holds at most."),
+    "hits": (COUNTER, "Requests answered from the response cache."),
+    "misses": (COUNTER, "Cacheable requests that rendered their response."),
+    "invalidations": (COUNTER, "Cached responses dropped by writes."),
+    "expirations": (COUNTER, "Cached responses dropped when their TTL ran out."),
+}
+
+COMPRESSION_STATS: StatDescriptions = {
+    "gzip_responses": (COUNTER, "Responses compressed on the fly with gzip."),
+    "br_responses": (COUNTER, "Responses compressed on the fly with brotli."),
+    "bytes_in": (COUNTER, "Response bytes before on-the-fly compression."),
+    "bytes_out": (COUNTER, "Response bytes after on-the-fly compression."),
+    "cached_variants": (COUNTER, "Compressed variants made for cached responses."),
+}
+
+LIKE_BUFFER_STATS: StatDescriptions = {
+    "pending": (GAUGE, "Like and unlike intents waiting for the next flush."),
+    "inflight": (GAUGE, "Like and unlike intents being written by the current flush."),
+    "flushes": (COUNTER, "Batches of buffered likes written."),
+    "flushed_intents": (COUNTER, "Like and unlike intents written."),
+    "rows_written": (COUNTER, "Likes inserted or deleted by flushes."),
+    "failures": (COUNTER, "Flushes that failed and were retried."),
+    "rejected": (COUNTER, "Like and unlike requests answered 503 because the buffer was full."),
+    "last_flush_seconds": (GAUGE, "Duration of the last flush."),
+}
+
+TRENDING_DECAY_STATS: StatDescriptions = {
+    "runs": (COUNTER, "Hot score decay passes run."),
+    "posts_decayed": (COUNTER, "Post hot scores decayed."),
+    "failures": (COUNTER, "Hot score decay passes that failed."),
+}
+
+RECENT_POSTS_STATS: StatDescriptions = {
+    "ready": (GAUGE, "Whether the recent posts read model is loaded (1) or not (0)."),
+    "posts": (GAUGE, "Posts held by the recent posts read model."),
+    "max_posts": (GAUGE, "Posts the recent posts read model holds at most."),
+    "bytes": (GAUGE, "Estimated memory held by the recent posts read model."),
+    "max_bytes": (GAUGE, "Memory the recent posts read model holds at most."),
+    "bytes_per_post": (GAUGE, "Estimated memory per post held by the recent posts read model."),
+    "complete": (GAUGE, "Whether the recent posts read model holds every post (1) or not (0)."),
+    "hits": (COUNTER, "Feed pages read from the recent posts read model."),
+    "misses": (COUNTER, "Feed pages the recent posts read model could not answer."),
+    "evictions": (COUNTER, "Posts evicted from the recent posts read model."),
+    "load_seconds": (GAUGE, "Duration of the last load of the recent posts read model."),
+    "failures": (COUNTER, "Loads of the recent posts read model that failed."),
+}
+
+SIMILAR_POSTS_STATS: StatDescriptions = {
+    "ready": (GAUGE, "Whether the similar posts index is loaded (1) or not (0)."),
+    "posts": (GAUGE, "Posts in the similar posts index."),
+    "terms": (GAUGE, "Distinct terms in the similar posts index."),
+    "postings": (GAUGE, "Term postings in the similar posts index."),
+    "queries": (COUNTER, "Similar posts lookups answered."),
+    "updates": (COUNTER, "Post changes applied to the similar posts index."),
+    "reindexed_on_load": (GAUGE, "Posts re-indexed from their content by the last load."),
+    "load_seconds": (GAUGE, "Duration of the last load of the similar posts index."),
+    "failures": (COUNTER, "Loads of the similar posts index that failed."),
+}
+
+SUGGESTIONS_STATS: StatDescriptions = {
+    "ready": (GAUGE, "Whether the typeahead indexes are loaded (1) or not (0)."),
+    "posts": (GAUGE, "Posts in the typeahead indexes."),
+    "titles": (GAUGE, "Distinct titles in the typeahead index."),
+    "tags": (GAUGE, "Distinct tags in the typeahead index."),
+    "llm_models": (GAUGE, "Distinct LLM models in the typeahead index."),
+    "cached_prefixes": (GAUGE, "Prefixes with cached suggestions."),
+    "queries": (COUNTER, "Typeahead lookups answered."),
+    "updates": (COUNTER, "Post and like changes applied to the typeahead indexes."),
+    "load_seconds": (GAUGE, "Duration of the last load of the typeahead indexes."),
+    "failures": (COUNTER, "Loads of the typeahead indexes that failed."),
+}
+
+JOBS_STATS: StatDescriptions = {
+    "depth": (GAUGE, "Background jobs queued or running."),
+    "max_depth": (GAUGE, "Most background jobs queued or running at once since startup."),
+    "submitted": (COUNTER, "Background jobs queued."),
+    "inline": (COUNTER, "Jobs run by their submitter because the queue was not running."),
+    "waits": (COUNTER, "Job submissions that waited for room in a full queue."),
+    "rejected": (COUNTER, "Jobs rejected because the queue was full and their submitter could not wait."),
+    "completed": (COUNTER, "Background jobs completed."),
+    "retries": (COUNTER, "Background job attempts retried after a failure."),
+    "failures": (COUNTER, "Background jobs dropped after their last attempt failed."),
+    "dropped": (COUNTER, "Background jobs left queued or running when shutdown gave up on them."),
+    "wait_seconds": (COUNTER, "Time background jobs spent queued."),
+    "run_seconds": (COUNTER, "Time spent running background jobs, retries included."),
+    "last_wait_seconds": (GAUGE, "Time the last background job started spent queued."),
+}
+
+SERVICE_STATS: List[Tuple[str, Callable[[], Dict[str, float]], StatDescriptions]] = [
+    ("password_hasher", password_hasher.stats, PASSWORD_HASHER_STATS),
+    ("auth_cache", principal_cache.stats, AUTH_CACHE_STATS),
+    ("response_cache", response_cache.stats, RESPONSE_CACHE_STATS),
+    ("compression", compression_stats.stats, COMPRESSION_STATS),
+    ("like_buffer", like_buffer.stats, LIKE_BUFFER_STATS),
+    ("trending_decay", trending_decay.stats, TRENDING_DECAY_STATS),
+    ("recent_posts", recent_posts.stats, RECENT_POSTS_STATS),
+    ("similar_posts", similar_posts.stats, SIMILAR_POSTS_STATS),
+    ("suggestions", post_suggestions.stats, SUGGESTIONS_STATS),
+    ("jobs", job_runner.stats, JOBS_STATS),
+]
+
+metrics = Metrics(enabled=settings.metrics_enabled, n_plus_one_threshold=settings.n_plus_one_threshold)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL statements of each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        with query_stats.track_request() as queries:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The router stores the matched route in the (shared) scope.
+                route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+                metrics.observe(scope["method"], route, status_code, time.perf_counter() - started, queries)
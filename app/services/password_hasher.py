@@ -0,0 +1,128 @@
+"""Bounded process pool for bcrypt hashing and verification.
+
+bcrypt is deliberately slow and CPU-bound. Running it in the request threadpool
+lets a burst of logins occupy every worker and starve cheap reads, so hashing
+is sent to a dedicated, size-limited process pool instead. Admission control
+caps the number of hash jobs in flight (running plus queued); beyond that,
+callers get ``PasswordHasherBusy`` immediately, which the app turns into a 503
+with ``Retry-After`` rather than letting the queue grow without bound.
+
+A worker process that dies (killed by the OOM killer, say) breaks the whole
+pool. The broken pool is then replaced by a new one and the job retried on it
+once; if that pool breaks too, the caller gets ``PasswordHasherBusy``.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from ..config import settings
+from ..utils.security import get_password_hash, verify_password
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated and the request should be retried later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Runs password hashing on a process pool with a queue-depth limit."""
+
+    def __init__(self, max_workers: int, max_queue: int, retry_after: int = 1):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._pool_restarts = 0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs running or waiting at once."""
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, not fork: the server process is multi-threaded by the time we get here
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken pool, unless a concurrent caller already replaced it."""
+        if self._executor is executor:
+            self._executor = None
+            self._pool_restarts += 1
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._in_flight >= self.capacity:
+            self._rejected += 1
+            raise PasswordHasherBusy(self.retry_after)
+
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            for _ in range(2):
+                executor = self._get_executor()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    self._discard(executor)
+            raise PasswordHasherBusy(self.retry_after)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._in_flight -= 1
+            self._completed += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password (see ``utils.security.get_password_hash``)."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash (see ``utils.security.verify_password``)."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of queue depth and latency counters."""
+        queued = max(0, self._in_flight - self.max_workers)
+        return {
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "queue_depth": queued,
+            "peak_in_flight": self._peak_in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "latency_seconds_total": self._latency_total,
+            "latency_seconds_max": self._latency_max,
+            "pool_restarts": self._pool_restarts,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    retry_after=settings.password_hash_retry_after,
+)
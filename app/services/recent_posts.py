@@ -0,0 +1,264 @@
+"""In-memory read model of the newest posts, serving the first pages of ``GET /posts``.
+
+The model holds the ``max_posts`` most recent posts (by ``created_at``, then
+id, the feed's order) as ``__slots__`` records of exactly the ``PostResponse``
+columns, sorted oldest first next to a parallel list of sort keys. Tags and
+model names are interned, so the few distinct values are stored once. A page
+of the unfiltered feed, by offset or cursor, is read from it with one binary
+search and a slice, without touching the database, whenever it falls inside
+the posts held; deeper pages and filtered feeds still query the database.
+
+The model is loaded in the background at startup and kept current by post
+and like events, applied synchronously so that a write's next feed read sees
+it. The events published while it loads are queued and replayed on top of
+it; like counts of posts liked meanwhile are then re-read.
+
+Memory is bounded by ``max_posts`` and by ``max_bytes``, estimated per post
+as its record, title, content and timestamp objects. The oldest posts are
+evicted when either is exceeded, and the model then only answers for the
+posts it still holds.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from .. import events
+from ..config import settings
+from ..crud.columns import POST_COLUMNS
+from ..database import ReadSessionLocal
+from ..models.post import Post
+from .response_cache import FEED_TAG, post_tag, response_cache
+
+logger = logging.getLogger(__name__)
+
+FIELDS = tuple(column.key for column in POST_COLUMNS)
+
+SortKey = Tuple[datetime, int]
+
+
+class PostRecord:
+    """One post's ``PostResponse`` columns, readable like a row of ``POST_COLUMNS``."""
+
+    __slots__ = FIELDS
+
+    def __init__(self, post: Mapping):
+        for field in FIELDS:
+            setattr(self, field, post[field])
+        self.tags = sys.intern(self.tags)
+        self.llm_model = sys.intern(self.llm_model)
+
+    @property
+    def key(self) -> SortKey:
+        return self.created_at, self.id
+
+    def footprint(self) -> int:
+        """Bytes held for this post alone (interned tags and model are shared)."""
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.title) + sys.getsizeof(self.content)
+            + sys.getsizeof(self.created_at)
+        )
+
+
+class RecentPosts:
+    """Thread-safe window of the newest posts."""
+
+    def __init__(self, enabled: bool, max_posts: int, max_bytes: int):
+        self.enabled = enabled
+        self.max_posts = max_posts
+        self.max_bytes = max_bytes
+        self._keys: List[SortKey] = []  # Oldest first
+        self._records: List[PostRecord] = []
+        self._by_id: Dict[int, PostRecord] = {}
+        self.bytes = 0
+        # Whether the window holds every post, so that no page falls past it
+        self.complete = False
+        self._lock = threading.Lock()
+        # Events received while loading, replayed once loaded (None when not loading)
+        self._backlog: Optional[List[Tuple[str, Mapping]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.failures = 0
+
+    def page(self, skip: int, limit: int, after: Optional[SortKey] = None) -> Optional[List[PostRecord]]:
+        """Posts of a ``crud.post.get_posts`` page (no filters), newest first, or None if not held."""
+        with self._lock:
+            if not self.ready:
+                self.misses += 1
+                return None
+            end = bisect_left(self._keys, after) if after is not None else len(self._keys)
+            end -= skip
+            if end < limit and not self.complete:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._records[max(0, end - limit):max(0, end)][::-1]
+
+    def apply(self, event: str, payload: Mapping) -> None:
+        """Update the window for a post or like event (queued while loading, ignored before ``start``)."""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append((event, payload))
+            elif self.ready:
+                self._apply(event, payload)
+
+    def _apply(self, event: str, payload: Mapping) -> None:
+        if event in (events.LIKE_CREATED, events.LIKE_DELETED):
+            record = self._by_id.get(payload["post_id"])
+            if record is not None:
+                record.likes_count = max(0, record.likes_count + (1 if event == events.LIKE_CREATED else -1))
+        elif event == events.POST_DELETED:
+            self._remove(payload["post"]["id"])
+        else:
+            self._put(payload["post"])
+
+    def _put(self, post: Mapping) -> None:
+        record = PostRecord(post)
+        previous = self._by_id.get(record.id)
+        if previous is not None:
+            # Like events alone keep the count, as the snapshot may predate one of them
+            record.likes_count = previous.likes_count
+            self._remove(record.id)
+        elif not self.complete and self._keys and record.key < self._keys[0]:
+            return  # Older than every post held, so not among the newest
+        position = bisect_left(self._keys, record.key)
+        self._keys.insert(position, record.key)
+        self._records.insert(position, record)
+        self._by_id[record.id] = record
+        self.bytes += record.footprint()
+        self._evict()
+
+    def _remove(self, post_id: int) -> None:
+        record = self._by_id.pop(post_id, None)
+        if record is None:
+            return
+        position = bisect_left(self._keys, record.key)
+        del self._keys[position]
+        del self._records[position]
+        self.bytes -= record.footprint()
+
+    def _evict(self) -> None:
+        while self._records and (len(self._records) > self.max_posts or self.bytes > self.max_bytes):
+            record = self._records.pop(0)
+            del self._keys[0]
+            del self._by_id[record.id]
+            self.bytes -= record.footprint()
+            self.evictions += 1
+            self.complete = False
+
+    def load(self) -> int:
+        """Fill the window from the posts table (blocking). Returns the number of posts held."""
+        started = time.perf_counter()
+        db = ReadSessionLocal()
+        try:
+            rows = db.execute(
+                select(*POST_COLUMNS).order_by(Post.created_at.desc(), Post.id.desc()).limit(self.max_posts)
+            ).all()
+            with self._lock:
+                self._keys, self._records, self._by_id, self.bytes = [], [], {}, 0
+                for row in reversed(rows):
+                    record = PostRecord(row._mapping)
+                    self._keys.append(record.key)
+                    self._records.append(record)
+                    self._by_id[record.id] = record
+                    self.bytes += record.footprint()
+                self.complete = len(rows) < self.max_posts
+                self._evict()
+
+                liked: Set[int] = set()
+                for event, payload in self._backlog or ():
+                    if event in (events.LIKE_CREATED, events.LIKE_DELETED):
+                        liked.add(payload["post_id"])
+                    else:
+                        self._apply(event, payload)
+                # Counting the queued likes could count twice those the SELECT above saw
+                for post_id, likes_count in db.execute(
+                    select(Post.id, Post.likes_count).where(Post.id.in_(liked & self._by_id.keys()))
+                ):
+                    self._by_id[post_id].likes_count = likes_count
+                self._backlog = None
+                self.ready = True
+                held = len(self._records)
+        finally:
+            db.close()
+        self.load_seconds = time.perf_counter() - started
+        logger.info("Recent posts loaded (%d posts, %d bytes) in %.1fs", held, self.bytes, self.load_seconds)
+        return held
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            self.failures += 1
+            with self._lock:
+                self._backlog = None
+            logger.exception("Loading the recent posts read model failed")
+
+    async def start(self) -> None:
+        """Start loading the window in the background (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        with self._lock:
+            self._backlog = []
+        self._task = asyncio.create_task(run_in_threadpool(self._load_in_background))
+
+    async def stop(self) -> None:
+        """Wait for a pending load."""
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            posts = len(self._records)
+            return {
+                "ready": int(self.ready),
+                "posts": posts,
+                "max_posts": self.max_posts,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "bytes_per_post": self.bytes / posts if posts else 0.0,
+                "complete": int(self.complete),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_seconds": self.load_seconds,
+                "failures": self.failures,
+            }
+
+
+recent_posts = RecentPosts(
+    enabled=settings.recent_posts_enabled,
+    max_posts=settings.recent_posts_max_posts,
+    max_bytes=settings.recent_posts_max_mb * 1024 * 1024,
+)
+
+
+# The response cache drops the affected pages in its own handlers, which may
+# run before these: a page read from the window in between would be cached
+# stale, so the pages are invalidated again once the window has changed.
+
+@events.subscribe(events.POST_CREATED, events.POST_UPDATED, events.POST_DELETED)
+def _on_post_changed(event: str, post: dict, **_) -> None:
+    recent_posts.apply(event, {"post": post})
+    if recent_posts.ready:
+        if event == events.POST_UPDATED:
+            response_cache.invalidate(post_tag(post["id"]))
+        else:
+            response_cache.invalidate(FEED_TAG, post_tag(post["id"]))
+
+
+@events.subscribe(events.LIKE_CREATED, events.LIKE_DELETED)
+def _on_like_changed(event: str, post_id: int, **_) -> None:
+    recent_posts.apply(event, {"post_id": post_id})
+    if recent_posts.ready:
+        response_cache.invalidate(post_tag(post_id))
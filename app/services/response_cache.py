@@ -0,0 +1,291 @@
+"""Cache of serialized GET responses with strong ETags.
+
+Entries are keyed by route and query parameters and tagged with what they
+depend on: ``post:<id>`` for each post in the body, and ``feed`` or
+``user_posts:<user_id>`` for the listing whose membership they reflect
+(``facets`` for the facet counts). The write events published by the CRUD
+layer invalidate exactly those tags, so a like only evicts pages that contain
+the liked post.
+
+Each entry also keeps its body compressed with every encoding asked for so
+far (``services.compression``), built once in the threadpool and then reused,
+with an ETag per encoding.
+
+A reader that started before an invalidation must not store what it read, or
+it would put stale data back. Every invalidation bumps ``epoch`` and stamps
+the invalidated tags with it; callers take the epoch before querying and hand
+it to ``store``, which drops the entry if any of its tags was invalidated in
+between.
+
+Invalidation is in-process: another worker's writes never reach this cache.
+Entries therefore also expire ``ttl`` seconds after they were stored, which
+bounds how long a page (or a 304 on its ETag) can lag behind the database.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from fastapi import Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from .. import events
+from ..config import settings
+from . import compression
+
+CACHE_CONTROL = "no-cache"  # clients may store, but must revalidate with If-None-Match
+
+
+@dataclass
+class CachedResponse:
+    """A serialized JSON body with its ETag, extra headers and compressed variants."""
+    body: bytes
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    # Compressed densely, as the entry is served many times (False for per-caller variants)
+    shared: bool = True
+    encoded: Dict[str, bytes] = field(default_factory=dict, repr=False)  # encoding -> body
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an ``If-None-Match`` header value matches this entry's ETag (of any encoding)."""
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(
+            candidate == self.etag
+            or any(candidate == compression.encoded_etag(self.etag, encoding) for encoding in compression.ENCODINGS)
+            for candidate in candidates
+        )
+
+    def with_body(self, body: bytes) -> "CachedResponse":
+        """A (not cached) variant of this entry with another body, e.g. personalized for the caller."""
+        return CachedResponse(body=body, etag=make_etag(body), headers=self.headers, shared=False)
+
+    @property
+    def compressible(self) -> bool:
+        return settings.compression_enabled and len(self.body) >= settings.compression_min_size
+
+    def encoding_for(self, request: Request) -> Optional[str]:
+        """The encoding to send this body to ``request`` with, None for the identity."""
+        if not self.compressible:
+            return None
+        return compression.negotiate(request.headers.get("accept-encoding"))
+
+    def encode(self, encoding: str) -> bytes:
+        """The body compressed with ``encoding``, compressed on first use."""
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compression.compress(self.body, encoding, dense=self.shared)
+            if self.shared:
+                compression.compression_stats.cached_variants += 1
+        return body
+
+    def to_response(self, request: Request) -> Response:
+        """Full 200 response, or an empty 304 if the client already has this version."""
+        encoding = self.encoding_for(request)
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL, **self.headers}
+        if encoding is not None:
+            headers["ETag"] = compression.encoded_etag(self.etag, encoding)
+        if self.matches(request.headers.get("if-none-match")):
+            response = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        elif encoding is None:
+            response = Response(content=self.body, media_type="application/json", headers=headers)
+        else:
+            body = self.encode(encoding)
+            compression.compression_stats.record(encoding, len(self.body), len(body))
+            headers["Content-Encoding"] = encoding
+            response = Response(content=body, media_type="application/json", headers=headers)
+        if self.compressible:
+            compression.add_vary(response.headers)
+        return response
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the body bytes."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def cache_key(request: Request) -> str:
+    """Route plus canonicalized query string."""
+    params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}"
+
+
+class ResponseCache:
+    """Bounded LRU of ``CachedResponse`` entries with tag-based invalidation."""
+
+    def __init__(self, maxsize: int, ttl: float, enabled: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._deadlines: Dict[str, float] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+        self._tag_keys: Dict[str, Set[str]] = {}
+        self._tag_epochs: Dict[str, int] = {}
+        self._floor_epoch = 0
+        self._lock = threading.Lock()
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._deadlines[key] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(
+        self,
+        key: str,
+        body: bytes,
+        tags: Iterable[str],
+        epoch: int,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> CachedResponse:
+        """Build an entry for ``body`` and cache it unless one of its tags was invalidated since ``epoch``."""
+        entry = CachedResponse(body=body, etag=make_etag(body), headers=dict(headers or {}))
+        if not self.enabled:
+            return entry
+        tag_set = set(tags)
+        with self._lock:
+            if epoch < self._floor_epoch or any(self._tag_epochs.get(tag, 0) > epoch for tag in tag_set):
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self._deadlines[key] = self._clock() + self.ttl
+            self._key_tags[key] = tag_set
+            for tag in tag_set:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+        return entry
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``; returns how many were dropped."""
+        with self._lock:
+            self.epoch += 1
+            keys: Set[str] = set()
+            for tag in tags:
+                self._tag_epochs[tag] = self.epoch
+                keys |= self._tag_keys.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+            self._deadlines.clear()
+            self._key_tags.clear()
+            self._tag_keys.clear()
+            # Anything loaded before now is stale; one floor stamp replaces per-tag history.
+            self._tag_epochs = {}
+            self._floor_epoch = self.epoch
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._deadlines.pop(key, None)
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+        }
+
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def user_posts_tag(user_id: int) -> str:
+    return f"user_posts:{user_id}"
+
+
+FEED_TAG = "feed"
+FACETS_TAG = "facets"
+
+response_cache = ResponseCache(
+    maxsize=settings.response_cache_size,
+    ttl=settings.response_cache_ttl_seconds,
+    enabled=settings.response_cache_enabled,
+)
+
+# A loader returns the serialized body, its invalidation tags and extra headers.
+Loader = Callable[[], Awaitable[Tuple[bytes, Iterable[str], Dict[str, str]]]]
+Personalizer = Callable[[CachedResponse], Awaitable[CachedResponse]]
+
+
+async def serve_cached(request: Request, load: Loader, personalize: Optional[Personalizer] = None) -> Response:
+    """Answer from the cache (200 or 304), or run ``load`` and cache its result.
+
+    The cached body is shared by all callers; ``personalize`` derives the
+    caller's variant of it (with its own ETag) on every request. Bodies are
+    compressed for the client's ``Accept-Encoding``, the shared ones only once.
+    """
+    key = cache_key(request)
+    entry = response_cache.get(key)
+    if entry is None:
+        epoch = response_cache.epoch
+        body, tags, headers = await load()
+        entry = response_cache.store(key, body, tags, epoch, headers)
+    if personalize is not None:
+        entry = await personalize(entry)
+    encoding = entry.encoding_for(request)
+    revalidated = entry.matches(request.headers.get("if-none-match"))
+    if encoding is not None and encoding not in entry.encoded and not revalidated:
+        # Compress off the event loop; to_response then finds the result
+        await run_in_threadpool(entry.encode, encoding)
+    return entry.to_response(request)
+
+
+@events.subscribe(events.POST_CREATED)
+def _on_post_created(event: str, post: dict) -> None:
+    response_cache.invalidate(FEED_TAG, FACETS_TAG, user_posts_tag(post["user_id"]))
+
+
+@events.subscribe(events.POST_UPDATED)
+def _on_post_updated(event: str, post: dict, previous: dict) -> None:
+    if post["tags"] != previous["tags"] or post["llm_model"] != previous["llm_model"]:
+        # The post moves between tag/model-filtered feeds
+        response_cache.invalidate(post_tag(post["id"]), FEED_TAG, FACETS_TAG)
+    else:
+        response_cache.invalidate(post_tag(post["id"]))
+
+
+@events.subscribe(events.POST_DELETED)
+def _on_post_deleted(event: str, post: dict) -> None:
+    # Later pages shift too, so the listings it belonged to go as well.
+    response_cache.invalidate(post_tag(post["id"]), FEED_TAG, FACETS_TAG, user_posts_tag(post["user_id"]))
+
+
+@events.subscribe(events.LIKE_CREATED, events.LIKE_DELETED)
+def _on_like_changed(event: str, user_id: int, post_id: int) -> None:
+    response_cache.invalidate(post_tag(post_id))
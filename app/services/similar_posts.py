@@ -0,0 +1,210 @@
+"""In-process TF-IDF index behind ``GET /posts/{post_id}/similar``.
+
+The index (``utils.tfidf``) covers each post's title (counted twice), content
+and tags (as whole ``#tag`` terms). It is loaded in the background at startup:
+from the snapshot file at ``settings.similar_posts_snapshot_path`` when there
+is one, re-indexing only the posts whose text changed since (by checksum), or
+from the posts table otherwise. Post events keep it current afterwards,
+applied by the background job runner (``services.jobs``) so writes do not wait
+for tokenizing; the events published while it loads are queued and replayed
+on top of it.
+
+On shutdown the index is written back to the snapshot file, so the next start
+skips tokenizing the whole corpus.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+import orjson
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from .. import events
+from ..config import settings
+from ..database import ReadSessionLocal
+from ..models.post import Post
+from ..utils import tfidf
+from ..utils.tags import parse_tags
+from .jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 2
+LOAD_BATCH_SIZE = 5000
+
+
+def post_terms(title: str, content: str, tags: str) -> Dict[str, int]:
+    """Bag of terms of a post."""
+    return tfidf.term_counts(
+        (title, TITLE_WEIGHT), (content, 1),
+        extra_terms=tuple(f"#{tag}" for tag in parse_tags(tags)),
+    )
+
+
+def post_checksum(title: str, content: str, tags: str) -> int:
+    return tfidf.checksum(title, content, tags)
+
+
+class SimilarPostsIndex:
+    """Thread-safe owner of the TF-IDF index of all posts."""
+
+    def __init__(self, enabled: bool, snapshot_path: Optional[str]):
+        self.enabled = enabled
+        self.snapshot_path = snapshot_path
+        self._index = tfidf.TfidfIndex()
+        self._lock = threading.Lock()
+        # Events received while loading, replayed once loaded (None when not loading)
+        self._backlog: Optional[List[Tuple[str, Mapping]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.queries = 0
+        self.updates = 0
+        self.reindexed_on_load = 0
+        self.load_seconds = 0.0
+        self.failures = 0
+
+    def similar(self, post_id: int, title: str, content: str, tags: str, limit: int) -> List[Tuple[int, float]]:
+        """``(post id, cosine similarity)`` of the posts most similar to the given one, best first."""
+        counts = post_terms(title, content, tags)
+        with self._lock:
+            self.queries += 1
+            return self._index.most_similar(counts, limit, exclude=post_id)
+
+    def apply(self, event: str, post: Mapping) -> None:
+        """Update the index for a post event (queued while loading, ignored before ``start``)."""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append((event, post))
+            elif self.ready:
+                self._apply(self._index, event, post)
+
+    def _apply(self, index: tfidf.TfidfIndex, event: str, post: Mapping) -> None:
+        if event == events.POST_DELETED:
+            index.remove(post["id"])
+        else:
+            text = (post["title"], post["content"], post["tags"])
+            crc = post_checksum(*text)
+            if index.checksum_of(post["id"]) == crc:
+                return
+            index.add(post["id"], post_terms(*text), crc)
+        self.updates += 1
+        if index.needs_compaction():
+            index.compact()
+
+    def load(self, use_snapshot: bool = True) -> int:
+        """Build the index (blocking): from the snapshot if any, then reconciled with the posts table.
+
+        Returns the number of posts indexed.
+        """
+        started = time.perf_counter()
+        index = (self._read_snapshot() if use_snapshot else None) or tfidf.TfidfIndex()
+        reindexed = 0
+        seen = set()
+        db = ReadSessionLocal()
+        try:
+            rows = db.execute(
+                select(Post.id, Post.title, Post.content, Post.tags).execution_options(yield_per=LOAD_BATCH_SIZE)
+            )
+            for post_id, title, content, tags in rows:
+                seen.add(post_id)
+                crc = post_checksum(title, content, tags)
+                if index.checksum_of(post_id) != crc:
+                    index.add(post_id, post_terms(title, content, tags), crc)
+                    reindexed += 1
+        finally:
+            db.close()
+        for post_id in [post_id for post_id in index.slot_of if post_id not in seen]:
+            index.remove(post_id)
+        if index.dead:
+            index.compact()
+
+        with self._lock:
+            for event, post in self._backlog or ():
+                self._apply(index, event, post)
+            self._backlog = None
+            self._index = index
+            self.ready = True
+        self.reindexed_on_load = reindexed
+        self.load_seconds = time.perf_counter() - started
+        logger.info(
+            "Similar posts index loaded: %d posts (%d re-indexed) in %.1fs", len(index), reindexed, self.load_seconds
+        )
+        return len(index)
+
+    def _read_snapshot(self) -> Optional[tfidf.TfidfIndex]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as snapshot:
+                return tfidf.TfidfIndex.from_snapshot(orjson.loads(snapshot.read()))
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("Ignoring unreadable similar posts snapshot %s", self.snapshot_path, exc_info=True)
+            return None
+
+    def save(self) -> bool:
+        """Write the index to the snapshot file (blocking). Returns False if there is nothing to write."""
+        if not self.snapshot_path or not self.ready:
+            return False
+        with self._lock:
+            data = orjson.dumps(self._index.to_snapshot())
+        partial = f"{self.snapshot_path}.tmp"
+        with open(partial, "wb") as snapshot:
+            snapshot.write(data)
+        os.replace(partial, self.snapshot_path)
+        return True
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            self.failures += 1
+            with self._lock:
+                self._backlog = None
+            logger.exception("Loading the similar posts index failed")
+
+    async def start(self) -> None:
+        """Start loading the index in the background (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        with self._lock:
+            self._backlog = []
+        self._task = asyncio.create_task(run_in_threadpool(self._load_in_background))
+
+    async def stop(self) -> None:
+        """Wait for a pending load and write the snapshot."""
+        if self._task is None:
+            return
+        await self._task
+        self._task = None
+        try:
+            await run_in_threadpool(self.save)
+        except OSError:
+            self.failures += 1
+            logger.exception("Writing the similar posts snapshot failed")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "ready": int(self.ready),
+                "posts": len(self._index),
+                "terms": len(self._index.postings),
+                "postings": self._index.posting_count,
+                "queries": self.queries,
+                "updates": self.updates,
+                "reindexed_on_load": self.reindexed_on_load,
+                "load_seconds": self.load_seconds,
+                "failures": self.failures,
+            }
+
+
+similar_posts = SimilarPostsIndex(
+    enabled=settings.similar_posts_enabled,
+    snapshot_path=settings.similar_posts_snapshot_path,
+)
+
+
+@events.subscribe(events.POST_CREATED, events.POST_UPDATED, events.POST_DELETED)
+def _on_post_changed(event: str, post: dict, **_) -> None:
+    job_runner.submit("similar_posts", similar_posts.apply, event, post)
@@ -0,0 +1,229 @@
+"""In-memory typeahead behind ``GET /posts/suggest``.
+
+Three ``utils.prefix_index`` indexes complete a prefix to post titles, tags
+and LLM models, each weighted by popularity: a tag or model by the number of
+posts using it, a title by the posts with that title plus their likes. They
+are built in the background at startup from one scan of the posts table and
+kept current by post and like events, applied by the background job runner
+(``services.jobs``); the events published while loading are queued and
+replayed on top of it.
+
+The index remembers what it counted for each post, so replaying a post event
+the scan already saw changes nothing. Likes are plain increments: one that
+lands while loading may be counted twice, which only nudges a weight.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from .. import events
+from ..config import settings
+from ..database import ReadSessionLocal
+from ..models.post import Post
+from ..utils.prefix_index import PrefixIndex, normalize, normalize_prefix
+from ..utils.tags import parse_tags
+from .jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+LOAD_BATCH_SIZE = 5000
+
+Suggestion = Tuple[str, int]
+
+
+class _PostTerms(NamedTuple):
+    """What one post contributes to the indexes."""
+    title: str
+    tags: Tuple[str, ...]
+    llm_model: str
+    likes: int
+
+    @classmethod
+    def of(cls, post: Mapping) -> "_PostTerms":
+        return cls(
+            normalize(post["title"]), tuple(parse_tags(post["tags"])), normalize(post["llm_model"]), post["likes_count"]
+        )
+
+
+class _Indexes:
+    """The three prefix indexes plus the terms counted for each post (not thread-safe)."""
+
+    def __init__(self):
+        self.titles = PrefixIndex()
+        self.tags = PrefixIndex()
+        self.llm_models = PrefixIndex()
+        self.posts: Dict[int, _PostTerms] = {}
+
+    def load(self, rows) -> None:
+        """Build from ``(id, title, tags, llm_model, likes_count)`` rows."""
+        titles: Dict[str, List] = {}
+        tags: Dict[str, int] = {}
+        models: Dict[str, List] = {}
+        for post_id, title, raw_tags, llm_model, likes in rows:
+            terms = self.posts[post_id] = _PostTerms(
+                normalize(title), tuple(parse_tags(raw_tags)), normalize(llm_model), likes
+            )
+            titles.setdefault(terms.title, [title.strip(), 0])[1] += 1 + likes
+            for tag in terms.tags:
+                tags[tag] = tags.get(tag, 0) + 1
+            models.setdefault(terms.llm_model, [llm_model.strip(), 0])[1] += 1
+        self.titles.load((key, display, weight) for key, (display, weight) in titles.items())
+        self.tags.load((tag, tag, count) for tag, count in tags.items())
+        self.llm_models.load((key, display, weight) for key, (display, weight) in models.items())
+
+    def put(self, post: Mapping) -> bool:
+        """Count a post's current version instead of what was counted for it. Returns False if unchanged."""
+        terms = _PostTerms.of(post)
+        if self.posts.get(post["id"]) == terms:
+            return False
+        self.remove(post["id"])
+        self.posts[post["id"]] = terms
+        self.titles.add(terms.title, post["title"].strip(), 1 + terms.likes)
+        for tag in terms.tags:
+            self.tags.add(tag, tag, 1)
+        self.llm_models.add(terms.llm_model, post["llm_model"].strip(), 1)
+        return True
+
+    def remove(self, post_id: int) -> bool:
+        terms = self.posts.pop(post_id, None)
+        if terms is None:
+            return False
+        self.titles.add(terms.title, terms.title, -1 - terms.likes)
+        for tag in terms.tags:
+            self.tags.add(tag, tag, -1)
+        self.llm_models.add(terms.llm_model, terms.llm_model, -1)
+        return True
+
+    def like(self, post_id: int, delta: int) -> bool:
+        terms = self.posts.get(post_id)
+        if terms is None:
+            return False
+        self.posts[post_id] = terms._replace(likes=max(0, terms.likes + delta))
+        self.titles.add(terms.title, terms.title, self.posts[post_id].likes - terms.likes)
+        return True
+
+
+class PostSuggestions:
+    """Thread-safe owner of the typeahead indexes."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._indexes = _Indexes()
+        self._lock = threading.Lock()
+        # Events received while loading, replayed once loaded (None when not loading)
+        self._backlog: Optional[List[Tuple[str, Mapping]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.queries = 0
+        self.updates = 0
+        self.load_seconds = 0.0
+        self.failures = 0
+
+    def suggest(self, prefix: str, limit: int) -> Dict[str, List[Suggestion]]:
+        """``(text, weight)`` of the most popular titles, tags and models starting with ``prefix``."""
+        key = normalize_prefix(prefix)
+        with self._lock:
+            self.queries += 1
+            indexes = self._indexes
+            return {
+                "titles": indexes.titles.top(key, limit),
+                "tags": indexes.tags.top(key, limit),
+                "llm_models": indexes.llm_models.top(key, limit),
+            }
+
+    def apply(self, event: str, payload: Mapping) -> None:
+        """Update the indexes for a post or like event (queued while loading, ignored before ``start``)."""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append((event, payload))
+            elif self.ready:
+                self._apply(self._indexes, event, payload)
+
+    def _apply(self, indexes: _Indexes, event: str, payload: Mapping) -> None:
+        if event == events.POST_DELETED:
+            changed = indexes.remove(payload["post"]["id"])
+        elif event in (events.LIKE_CREATED, events.LIKE_DELETED):
+            changed = indexes.like(payload["post_id"], 1 if event == events.LIKE_CREATED else -1)
+        else:
+            changed = indexes.put(payload["post"])
+        self.updates += changed
+
+    def load(self) -> int:
+        """Build the indexes from the posts table (blocking). Returns the number of posts indexed."""
+        started = time.perf_counter()
+        indexes = _Indexes()
+        db = ReadSessionLocal()
+        try:
+            indexes.load(db.execute(
+                select(Post.id, Post.title, Post.tags, Post.llm_model, Post.likes_count)
+                .execution_options(yield_per=LOAD_BATCH_SIZE)
+            ))
+        finally:
+            db.close()
+
+        with self._lock:
+            for event, payload in self._backlog or ():
+                self._apply(indexes, event, payload)
+            self._backlog = None
+            self._indexes = indexes
+            self.ready = True
+        self.load_seconds = time.perf_counter() - started
+        logger.info("Suggestions loaded from %d posts in %.1fs", len(indexes.posts), self.load_seconds)
+        return len(indexes.posts)
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            self.failures += 1
+            with self._lock:
+                self._backlog = None
+            logger.exception("Loading the suggestions index failed")
+
+    async def start(self) -> None:
+        """Start loading the indexes in the background (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        with self._lock:
+            self._backlog = []
+        self._task = asyncio.create_task(run_in_threadpool(self._load_in_background))
+
+    async def stop(self) -> None:
+        """Wait for a pending load."""
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            indexes = self._indexes
+            return {
+                "ready": int(self.ready),
+                "posts": len(indexes.posts),
+                "titles": len(indexes.titles),
+                "tags": len(indexes.tags),
+                "llm_models": len(indexes.llm_models),
+                "cached_prefixes": (
+                    indexes.titles.cached_prefixes + indexes.tags.cached_prefixes + indexes.llm_models.cached_prefixes
+                ),
+                "queries": self.queries,
+                "updates": self.updates,
+                "load_seconds": self.load_seconds,
+                "failures": self.failures,
+            }
+
+
+post_suggestions = PostSuggestions(enabled=settings.suggestions_enabled)
+
+
+@events.subscribe(events.POST_CREATED, events.POST_UPDATED, events.POST_DELETED)
+def _on_post_changed(event: str, post: dict, **_) -> None:
+    job_runner.submit("suggestions", post_suggestions.apply, event, {"post": post})
+
+
+@events.subscribe(events.LIKE_CREATED, events.LIKE_DELETED)
+def _on_like_changed(event: str, post_id: int, **_) -> None:
+    job_runner.submit("suggestions", post_suggestions.apply, event, {"post_id": post_id})
@@ -0,0 +1,70 @@
+"""Periodic decay of stored hot scores (see ``crud.trending``)."""
+import asyncio
+import logging
+from typing import Dict, Optional
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+from ..database import SessionLocal
+from ..crud import trending as trending_crud
+
+logger = logging.getLogger(__name__)
+
+
+class TrendingDecayJob:
+    """Runs ``crud.trending.decay_scores`` every ``interval`` seconds in the background."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self.runs = 0
+        self.posts_decayed = 0
+        self.failures = 0
+
+    def run_once(self) -> int:
+        """Decay scores now (blocking). Returns the number of posts updated."""
+        db = SessionLocal()
+        try:
+            updated = trending_crud.decay_scores(db)
+        except Exception:
+            db.rollback()
+            self.failures += 1
+            logger.exception("Hot score decay failed")
+            return 0
+        finally:
+            db.close()
+        self.runs += 1
+        self.posts_decayed += updated
+        return updated
+
+    async def _run(self) -> None:
+        while True:
+            await run_in_threadpool(self.run_once)
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        """Start the periodic decay task (no-op when the interval is not positive)."""
+        if self.interval <= 0 or self._task is not None:
+            return
+        self._stopped = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopped.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "runs": self.runs,
+            "posts_decayed": self.posts_decayed,
+            "failures": self.failures,
+        }
+
+
+trending_decay = TrendingDecayJob(interval=settings.trending_decay_interval_seconds)
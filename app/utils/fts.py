@@ -0,0 +1,123 @@
+"""SQLite FTS5 full-text index over posts.
+
+The ``posts_fts`` virtual table is an external-content index on ``posts``
+(title, content, tags, llm_model). Triggers keep it in sync with inserts,
+updates and deletes in the same transaction as the post write, so the CRUD
+layer does not have to touch it.
+"""
+import html
+import re
+from typing import Optional
+from sqlalchemy import column, literal_column, table
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+# bm25() weights are positional: title, content, tags, llm_model.
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 4.0)
+
+# snippet() brackets matches with these control characters; ``highlight`` then
+# HTML-escapes the post text around them and turns them into <mark> tags.
+SNIPPET_OPEN = "\x02"
+SNIPPET_CLOSE = "\x03"
+MARK_OPEN = "<mark>"
+MARK_CLOSE = "</mark>"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 16
+
+posts_fts = table("posts_fts", column("rowid"))
+fts_match_column = literal_column("posts_fts")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, tags, llm_model,
+        content='posts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content, tags, llm_model)
+        VALUES (new.id, new.title, new.content, new.tags, new.llm_model);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content, tags, llm_model)
+        VALUES ('delete', old.id, old.title, old.content, old.tags, old.llm_model);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content, tags, llm_model ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content, tags, llm_model)
+        VALUES ('delete', old.id, old.title, old.content, old.tags, old.llm_model);
+        INSERT INTO posts_fts(rowid, title, content, tags, llm_model)
+        VALUES (new.id, new.title, new.content, new.tags, new.llm_model);
+    END
+    """,
+]
+
+_enabled = False
+
+
+def is_enabled() -> bool:
+    """Whether the FTS5 index was successfully set up for this process."""
+    return _enabled
+
+
+def init_search_index(engine: Engine) -> bool:
+    """Create the FTS5 table and sync triggers, backfilling on first creation.
+
+    Returns False (and leaves search on the LIKE fallback) when the database is
+    not SQLite or the SQLite build lacks FTS5.
+    """
+    global _enabled
+    if engine.dialect.name != "sqlite":
+        _enabled = False
+        return False
+
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+        ).first() is not None
+        try:
+            for statement in _DDL:
+                conn.exec_driver_sql(statement)
+        except OperationalError:
+            _enabled = False
+            return False
+        if not exists:
+            conn.exec_driver_sql("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+    _enabled = True
+    return True
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Rebuild the whole FTS5 index from the posts table."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free user input into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term (``"word"*``), and terms are
+    AND-ed together, so ``"chat rev"`` matches "ChatGPT code review".
+    Returns None when the input contains no searchable words.
+    """
+    terms = _TOKEN_RE.findall(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML of an FTS5 snippet: the post text escaped, the matches wrapped in ``<mark>``."""
+    if snippet is None:
+        return None
+    # Stray markers in the post text itself could only ever add a <mark> tag
+    return html.escape(snippet).replace(SNIPPET_OPEN, MARK_OPEN).replace(SNIPPET_CLOSE, MARK_CLOSE)
@@ -0,0 +1,34 @@
+"""Parsing of id lists passed as query parameters (``?ids=3,1,2`` or ``?ids=3&ids=1``)."""
+from typing import List, Sequence
+from fastapi import HTTPException, status
+
+
+def parse_ids(values: Sequence[str], max_ids: int) -> List[int]:
+    """Distinct positive ids in request order, answering 400 if one is invalid or there are too many."""
+    ids: List[int] = []
+    seen = set()
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit() or int(part) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid id: {part!r}"
+                )
+            id_ = int(part)
+            if id_ not in seen:
+                seen.add(id_)
+                ids.append(id_)
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No ids given"
+        )
+    if len(ids) > max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids (at most {max_ids})"
+        )
+    return ids
@@ -0,0 +1,35 @@
+"""Newline-delimited JSON helpers for streamed request bodies."""
+from typing import AsyncIterator, Tuple
+
+MEDIA_TYPE = "application/x-ndjson"
+
+
+class LineTooLong(ValueError):
+    """A line exceeded the allowed size before its terminating newline arrived."""
+
+    def __init__(self, line: int):
+        super().__init__(f"Line {line} is too long")
+        self.line = line
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split a streamed body into ``(line_number, line)`` pairs, skipping blank lines.
+
+    Only the current partial line is buffered, so arbitrarily large bodies are
+    processed in constant memory. Raises ``LineTooLong`` past ``max_line_bytes``.
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if len(line) > max_line_bytes:
+                raise LineTooLong(line_number)
+            if line.strip():
+                yield line_number, line
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(line_number + 1)
+    if buffer.strip():
+        yield line_number + 1, buffer
@@ -0,0 +1,87 @@
+"""Opaque cursor tokens for keyset pagination.
+
+A cursor records the sort key of the last row of a page, e.g.
+``(created_at, id)`` for the post feeds. The next page is then fetched with
+``WHERE (created_at, id) < (:created_at, :id)``, which is an index range
+read no matter how deep the client has scrolled, and is stable under
+concurrent inserts.
+
+Tokens are URL-safe base64 JSON tagged with the listing they belong to, so a
+cursor from one endpoint is rejected by another.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+T = TypeVar("T")
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(kind: str, *values: Any) -> str:
+    """Encode a sort key into an opaque cursor token."""
+    payload = json.dumps([kind, *[_encode_value(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, kind: str, *types: type) -> Tuple[Any, ...]:
+    """Decode a cursor token produced by ``encode_cursor`` for the same ``kind``.
+
+    ``types`` are the expected types of the sort key values. Raises ValueError
+    if the token is malformed, belongs to another listing or has the wrong shape.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(payload, list) or not payload or payload[0] != kind:
+            raise ValueError("Cursor does not belong to this listing")
+        values = tuple(_decode_value(v) for v in payload[1:])
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if len(values) != len(types) or not all(isinstance(v, t) for v, t in zip(values, types)):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_cursor(token: Optional[str], kind: str, *types: type) -> Optional[Tuple[Any, ...]]:
+    """Decode an optional ``cursor`` query parameter, answering 400 if it is invalid."""
+    if token is None:
+        return None
+    try:
+        return decode_cursor(token, kind, *types)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def next_cursor_headers(
+    items: Sequence[T],
+    limit: int,
+    kind: str,
+    key: Callable[[T], Sequence[Any]],
+) -> Dict[str, str]:
+    """Headers carrying the cursor for the page after ``items``.
+
+    Empty when the page is short (or empty), i.e. there is nothing more to fetch.
+    """
+    if not items or len(items) < limit:
+        return {}
+    return {NEXT_CURSOR_HEADER: encode_cursor(kind, *key(items[-1]))}
@@ -0,0 +1,139 @@
+"""Weighted prefix completion over a sorted array of keys.
+
+Keys (normalized strings) are kept in one sorted list, so the keys starting
+with a prefix are a contiguous range found with two binary searches. Small
+ranges (up to ``SCAN_LIMIT`` keys) are ranked on the fly. Large ones, which
+only short prefixes have, get a cached list of their ``CACHED_TOP`` heaviest
+keys, kept current on every weight change instead of being recomputed:
+
+* a key gaining weight enters a prefix's list if it now outweighs the
+  lightest entry (every key outside the list weighs at most that much), and
+  the lightest entry falls out once the list is over ``CACHED_TOP``;
+* a key losing weight stays if it still outweighs the rest of the list and
+  leaves it otherwise; the shorter list is still the exact top of the range.
+
+A list is only recomputed once it has shrunk below the number of results
+asked for. Prefixes longer than ``MAX_CACHED_PREFIX`` are never cached; few
+keys share such a long prefix.
+"""
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+SCAN_LIMIT = 256
+CACHED_TOP = 40
+MAX_CACHED_PREFIX = 24
+
+_LAST_CHAR = "\U0010ffff"
+
+
+def normalize(text: str) -> str:
+    """Key of a text: lowercased, trimmed, with whitespace runs collapsed to one space."""
+    return " ".join(text.lower().split())
+
+
+def normalize_prefix(prefix: str) -> str:
+    """``normalize`` for a typed prefix, keeping one trailing space ("go " must not match "golang")."""
+    normalized = normalize(prefix)
+    return normalized + " " if normalized and prefix[-1:].isspace() else normalized
+
+
+class PrefixIndex:
+    """Top-weighted completions of prefixes (not thread-safe).
+
+    Each key has a display text and an integer weight; keys whose weight
+    drops to zero or below are removed.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._entries: Dict[str, List] = {}  # key -> [display, weight]
+        self._cache: Dict[str, List[str]] = {}  # prefix -> heaviest keys, heaviest first
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def cached_prefixes(self) -> int:
+        return len(self._cache)
+
+    def load(self, entries: Iterable[Tuple[str, str, int]]) -> None:
+        """Replace the contents with ``(key, display, weight)`` triples and precompute the cached prefixes."""
+        self._entries = {key: [display, weight] for key, display, weight in entries if key and weight > 0}
+        self._keys = sorted(self._entries)
+        self._cache = {}
+        self._warm("", 0, len(self._keys))
+
+    def weight(self, key: str) -> int:
+        entry = self._entries.get(key)
+        return entry[1] if entry else 0
+
+    def add(self, key: str, display: str, delta: int) -> None:
+        """Change the weight of a key by ``delta``, inserting or removing it as needed."""
+        if not key or not delta:
+            return
+        entry = self._entries.get(key)
+        old = entry[1] if entry else 0
+        new = old + delta
+        if entry is None:
+            if new <= 0:
+                return
+            entry = self._entries[key] = [display, new]
+            insort(self._keys, key)
+        elif new <= 0:
+            del self._entries[key]
+            del self._keys[bisect_left(self._keys, key)]
+        else:
+            entry[1] = new
+        for end in range(1, min(len(key), MAX_CACHED_PREFIX) + 1):
+            top = self._cache.get(key[:end])
+            if top is not None:
+                self._update_top(top, key, old, new)
+
+    def _update_top(self, top: List[str], key: str, old: int, new: int) -> None:
+        if key in top:
+            top.remove(key)
+            if new <= 0 or (new < old and (not top or new < self._entries[top[-1]][1])):
+                return
+        elif new <= 0 or not top or new <= self._entries[top[-1]][1]:
+            return
+        top.append(key)
+        top.sort(key=self._rank)
+        del top[CACHED_TOP:]
+
+    def _rank(self, key: str) -> Tuple[int, str]:
+        return -self._entries[key][1], key
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self._keys, prefix), bisect_left(self._keys, prefix + _LAST_CHAR)
+
+    def _warm(self, prefix: str, lo: int, hi: int) -> None:
+        """Cache ``prefix`` and, recursively, its extensions whose ranges exceed ``SCAN_LIMIT``."""
+        if prefix:
+            self._cache[prefix] = heapq.nsmallest(CACHED_TOP, self._keys[lo:hi], key=self._rank)
+        if len(prefix) >= MAX_CACHED_PREFIX:
+            return
+        depth = len(prefix)
+        start = lo
+        while start < hi:
+            key = self._keys[start]
+            if len(key) <= depth:
+                start += 1
+                continue
+            child = key[:depth + 1]
+            end = bisect_left(self._keys, child + _LAST_CHAR, start, hi)
+            if end - start > SCAN_LIMIT:
+                self._warm(child, start, end)
+            start = end
+
+    def top(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """``(display, weight)`` of the heaviest keys starting with ``prefix`` (normalized), heaviest first."""
+        lo, hi = self._range(prefix)
+        if hi - lo <= SCAN_LIMIT or len(prefix) > MAX_CACHED_PREFIX:
+            keys = heapq.nsmallest(limit, self._keys[lo:hi], key=self._rank)
+        else:
+            keys = self._cache.get(prefix)
+            if keys is None or len(keys) < min(limit, CACHED_TOP):
+                keys = self._cache[prefix] = heapq.nsmallest(CACHED_TOP, self._keys[lo:hi], key=self._rank)
+            keys = keys[:limit]
+        return [tuple(self._entries[key]) for key in keys]
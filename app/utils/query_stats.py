@@ -0,0 +1,135 @@
+"""Count and time the SQL statements issued by each request.
+
+``instrument(engine, name)`` hooks an engine's cursor events. Every statement
+it runs is recorded in:
+
+* the ``QueryStats`` of the current request, a context variable set by the
+  metrics middleware through ``track_request()``. Threadpool calls and
+  ``AsyncSession.run_sync`` both inherit it, so route code needs no changes;
+* every active ``count_queries()`` block, whichever thread it runs in, which
+  is how tests put a budget on a route's queries::
+
+      with query_budget(3):
+          client.get("/api/v1/posts")
+
+* per-engine process totals (``engine_totals()``), including background work
+  such as like-buffer flushes.
+
+Statements are grouped by their SQL text, which is already parameterized, so
+the same query run for different ids counts as one shape repeated. That is
+what gives N+1 loops away.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    """Statement count, total SQL time and (optionally) repetitions per statement."""
+
+    def __init__(self, track_statements: bool = True):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Optional[Counter] = Counter() if track_statements else None
+        self.batched = False  # set by batch endpoints that repeat statements by design
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += elapsed
+            if self.statements is not None:
+                self.statements[statement] += 1
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        """The SELECT run most often and how many times.
+
+        Writes are left out: a batched import repeating one INSERT per chunk is
+        deliberate, while a read repeated per row is the N+1 signature.
+        """
+        if not self.statements:
+            return None, 0
+        with self._lock:
+            for statement, times in self.statements.most_common():
+                if statement.lstrip()[:6].upper() == "SELECT":
+                    return statement, times
+        return None, 0
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+_collectors: List[QueryStats] = []
+_collectors_lock = threading.Lock()
+_engine_totals: Dict[str, QueryStats] = {}
+
+
+def instrument(engine: Engine, name: str) -> None:
+    """Record every statement run on ``engine`` under the label ``name``."""
+    totals = _engine_totals.setdefault(name, QueryStats(track_statements=False))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        totals.record(statement, elapsed)
+        request_stats = _current.get()
+        if request_stats is not None:
+            request_stats.record(statement, elapsed)
+        if _collectors:
+            with _collectors_lock:
+                collectors = list(_collectors)
+            for stats in collectors:
+                stats.record(statement, elapsed)
+
+
+def engine_totals() -> Dict[str, Tuple[int, float]]:
+    """``{engine name: (statements, seconds)}`` since the process started."""
+    return {name: (stats.count, stats.seconds) for name, stats in _engine_totals.items()}
+
+
+@contextmanager
+def track_request() -> Iterator[QueryStats]:
+    """Collect the statements run in the current context (one request) into a fresh ``QueryStats``."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def mark_batched() -> None:
+    """Exempt the current request from N+1 detection (it repeats statements per chunk on purpose)."""
+    request_stats = _current.get()
+    if request_stats is not None:
+        request_stats.batched = True
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Collect every statement run by any thread while the block is active."""
+    stats = QueryStats()
+    with _collectors_lock:
+        _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        with _collectors_lock:
+            _collectors.remove(stats)
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[QueryStats]:
+    """Like ``count_queries``, but raise AssertionError if more than ``limit`` statements ran."""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        repeated = "\n".join(f"  {times}x {statement}" for statement, times in stats.statements.most_common(5))
+        raise AssertionError(f"Expected at most {limit} queries, {stats.count} ran:\n{repeated}")
@@ -62,11 +62,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[str]:
-    """Decode a JWT access token and return the username."""
+def decode_access_token_claims(token: str) -> Optional[dict]:
+    """Verify a JWT access token and return its claims, or None if invalid or expired."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        return username
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
     except JWTError:
         return None
+
+
+def decode_access_token(token: str) -> Optional[str]:
+    """Decode a JWT access token and return the username."""
+    payload = decode_access_token_claims(token)
+    if payload is None:
+        return None
+    username: str = payload.get("sub")
+    return username
@@ -0,0 +1,26 @@
+"""Parsing of the free-form ``Post.tags`` field into normalized tag names."""
+import re
+from typing import List
+
+MAX_TAG_LENGTH = 50
+
+_SEPARATORS = re.compile(r"[,;#\n]+")
+
+
+def normalize_tag(name: str) -> str:
+    """Lowercase, trim and collapse inner whitespace: ``" Machine  Learning"`` -> ``"machine learning"``."""
+    return " ".join(name.split()).lower()[:MAX_TAG_LENGTH].strip()
+
+
+def parse_tags(raw: str) -> List[str]:
+    """Distinct normalized tags of a post, in the order written.
+
+    Tags are separated by commas, semicolons, ``#`` or newlines, so
+    ``"AI, coding"`` and ``"#ai #coding"`` both give ``["ai", "coding"]``.
+    """
+    tags: List[str] = []
+    for part in _SEPARATORS.split(raw or ""):
+        tag = normalize_tag(part)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
@@ -0,0 +1,243 @@
+"""Sparse TF-IDF vectors with an inverted index, for cosine-similarity lookups.
+
+Documents are bags of terms weighted ``(1 + log tf) * idf`` with
+``idf = log((N + 1) / (df + 1)) + 1``. Every term keeps a postings list of
+(slot, tf weight) pairs in two typed arrays, 8 bytes per posting, and each
+document's vector norm is stored by slot. A query then accumulates dot
+products over the postings of its own terms only, so its cost depends on how
+common those terms are, not on the corpus size:
+
+* only the ``QUERY_TERMS`` heaviest query terms are used;
+* terms occurring in more than ``MAX_DF_RATIO`` of the documents carry almost
+  no signal and are skipped;
+* at most ``MAX_SCANNED_POSTINGS`` postings are visited per query.
+
+Documents are never rewritten in place: removing one marks its slot dead
+(its postings are skipped) and re-adding it takes a new slot. ``compact``
+drops dead postings once they pile up. Norms use the idf at the time the
+document was added, which drifts slowly as the corpus grows; a rebuild makes
+them exact again.
+"""
+import base64
+import heapq
+import math
+import re
+import sys
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+QUERY_TERMS = 32
+MAX_DF_RATIO = 0.05
+MIN_DOCUMENTS_FOR_DF_CUTOFF = 1000
+MAX_SCANNED_POSTINGS = 20_000
+# Compact once this share of the slots is dead
+MAX_DEAD_RATIO = 0.25
+
+SNAPSHOT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+Counts = Mapping[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of at least two characters."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1]
+
+
+def checksum(*texts: str) -> int:
+    """Cheap fingerprint of a document's text, to tell whether it needs re-indexing."""
+    return zlib.crc32("\x1f".join(texts).encode("utf-8"))
+
+
+def _idf(documents: int, df: int) -> float:
+    return math.log((documents + 1) / (df + 1)) + 1.0
+
+
+def _tf(count: int) -> float:
+    return 1.0 + math.log(count)
+
+
+def _encode(values: array) -> str:
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _decode(typecode: str, data: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    return values
+
+
+class TfidfIndex:
+    """Inverted TF-IDF index of documents identified by positive integer ids (not thread-safe)."""
+
+    def __init__(self):
+        self.ids = array("q")  # slot -> document id, 0 once the slot is dead
+        self.checksums = array("L")
+        self.norms = array("d")
+        self.slot_of: Dict[int, int] = {}
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.dead = 0
+        self.posting_count = 0
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self.slot_of
+
+    def checksum_of(self, doc_id: int) -> Optional[int]:
+        slot = self.slot_of.get(doc_id)
+        return None if slot is None else self.checksums[slot]
+
+    def add(self, doc_id: int, counts: Counts, text_checksum: int = 0) -> None:
+        """Index a document (replacing any previous version of it)."""
+        self.remove(doc_id)
+        slot = len(self.ids)
+        documents = len(self.slot_of) + 1
+        squares = 0.0
+        for term, count in counts.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[sys.intern(term)] = (array("i"), array("f"))
+            tf = _tf(count)
+            entry[0].append(slot)
+            entry[1].append(tf)
+            weight = tf * _idf(documents, len(entry[0]))
+            squares += weight * weight
+        self.posting_count += len(counts)
+        self.ids.append(doc_id)
+        self.checksums.append(text_checksum)
+        self.norms.append(math.sqrt(squares) or 1.0)
+        self.slot_of[doc_id] = slot
+
+    def remove(self, doc_id: int) -> bool:
+        """Forget a document. Returns False if it was not indexed."""
+        slot = self.slot_of.pop(doc_id, None)
+        if slot is None:
+            return False
+        self.ids[slot] = 0
+        self.dead += 1
+        return True
+
+    def needs_compaction(self) -> bool:
+        return self.dead > 64 and self.dead > MAX_DEAD_RATIO * len(self.ids)
+
+    def compact(self) -> None:
+        """Drop the postings of removed documents and renumber the slots."""
+        remap: Dict[int, int] = {}
+        ids, checksums, norms = array("q"), array("L"), array("d")
+        for slot, doc_id in enumerate(self.ids):
+            if doc_id:
+                remap[slot] = len(ids)
+                ids.append(doc_id)
+                checksums.append(self.checksums[slot])
+                norms.append(self.norms[slot])
+        postings: Dict[str, Tuple[array, array]] = {}
+        posting_count = 0
+        for term, (slots, tfs) in self.postings.items():
+            kept_slots, kept_tfs = array("i"), array("f")
+            for slot, tf in zip(slots, tfs):
+                new_slot = remap.get(slot)
+                if new_slot is not None:
+                    kept_slots.append(new_slot)
+                    kept_tfs.append(tf)
+            if kept_slots:
+                postings[term] = (kept_slots, kept_tfs)
+                posting_count += len(kept_slots)
+        self.ids, self.checksums, self.norms, self.postings = ids, checksums, norms, postings
+        self.slot_of = {doc_id: slot for slot, doc_id in enumerate(ids)}
+        self.dead = 0
+        self.posting_count = posting_count
+
+    def most_similar(self, counts: Counts, limit: int, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """``(doc id, cosine similarity)`` of the documents closest to a bag of terms, best first."""
+        documents = len(self.slot_of)
+        if not documents or not counts:
+            return []
+        max_df = MAX_DF_RATIO * documents if documents >= MIN_DOCUMENTS_FOR_DF_CUTOFF else math.inf
+
+        query = []
+        squares = 0.0
+        for term, count in counts.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            df = len(entry[0])
+            idf = _idf(documents, df)
+            weight = _tf(count) * idf
+            squares += weight * weight
+            if df <= max_df:
+                query.append((weight, idf, term))
+        if not squares:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        scanned = 0
+        for weight, idf, term in heapq.nlargest(QUERY_TERMS, query):
+            slots, tfs = self.postings[term]
+            if scanned + len(slots) > MAX_SCANNED_POSTINGS:
+                continue
+            scanned += len(slots)
+            factor = weight * idf
+            for slot, tf in zip(slots, tfs):
+                scores[slot] += factor * tf
+
+        ids, norms = self.ids, self.norms
+        excluded = self.slot_of.get(exclude) if exclude is not None else None
+        best = heapq.nlargest(limit, (
+            (score / norms[slot], slot) for slot, score in scores.items()
+            if ids[slot] and slot != excluded
+        ))
+        query_norm = math.sqrt(squares)
+        return [(ids[slot], min(1.0, score / query_norm)) for score, slot in best]
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the index (compacted first)."""
+        if self.dead:
+            self.compact()
+        terms = list(self.postings)
+        return {
+            "version": SNAPSHOT_VERSION,
+            "typecodes": {code: array(code).itemsize for code in "qLdif"},
+            "ids": _encode(self.ids),
+            "checksums": _encode(self.checksums),
+            "norms": _encode(self.norms),
+            "terms": terms,
+            "slots": [_encode(self.postings[term][0]) for term in terms],
+            "tfs": [_encode(self.postings[term][1]) for term in terms],
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Mapping[str, Any]) -> "TfidfIndex":
+        """Rebuild an index from ``to_snapshot`` output. Raises ValueError if it is incompatible."""
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported snapshot version")
+        if data.get("typecodes") != {code: array(code).itemsize for code in "qLdif"}:
+            raise ValueError("Snapshot was written on a platform with other array sizes")
+        index = cls()
+        index.ids = _decode("q", data["ids"])
+        index.checksums = _decode("L", data["checksums"])
+        index.norms = _decode("d", data["norms"])
+        if not len(index.ids) == len(index.checksums) == len(index.norms):
+            raise ValueError("Corrupt snapshot")
+        for term, slots, tfs in zip(data["terms"], data["slots"], data["tfs"]):
+            entry = (_decode("i", slots), _decode("f", tfs))
+            if len(entry[0]) != len(entry[1]):
+                raise ValueError("Corrupt snapshot")
+            index.postings[sys.intern(term)] = entry
+            index.posting_count += len(entry[0])
+        index.slot_of = {doc_id: slot for slot, doc_id in enumerate(index.ids) if doc_id}
+        return index
+
+
+def term_counts(*weighted_texts: Tuple[str, int], extra_terms: Tuple[str, ...] = ()) -> Dict[str, int]:
+    """Bag of terms of several texts, each token counted ``weight`` times, plus whole extra terms."""
+    counts: Counter = Counter()
+    for text, weight in weighted_texts:
+        for token in tokenize(text):
+            counts[token] += weight
+    counts.update(extra_terms)
+    return dict(counts)
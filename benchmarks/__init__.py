@@ -0,0 +1 @@
+"""In-process load and latency benchmarks for the API."""
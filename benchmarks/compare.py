@@ -0,0 +1,102 @@
+"""Compare two benchmark result files.
+
+Usage::
+
+    python -m benchmarks.compare before.json after.json [--fail-over 10]
+
+Prints throughput and latency percentiles side by side with relative change.
+With ``--fail-over PCT`` the exit status is 1 when any scenario's p95 latency
+got worse by more than PCT percent, or it started returning errors.
+"""
+import argparse
+import json
+import sys
+from typing import Optional
+
+METRICS = (
+    ("throughput_rps", "req/s", True),
+    ("p50", "p50 ms", False),
+    ("p95", "p95 ms", False),
+    ("p99", "p99 ms", False),
+)
+
+
+def _value(result: dict, metric: str) -> float:
+    if metric == "throughput_rps":
+        return result["throughput_rps"]
+    return result["latency_ms"][metric]
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def _format_change(change: Optional[float], higher_is_better: bool) -> str:
+    if change is None:
+        return "    n/a"
+    better = change > 0 if higher_is_better else change < 0
+    marker = " " if abs(change) < 1 else ("+" if better else "-")
+    return f"{change:+6.1f}%{marker}"
+
+
+def compare(before: dict, after: dict, fail_over: Optional[float] = None) -> int:
+    """Print the comparison table; returns the process exit status."""
+    for label, report in (("before", before), ("after", after)):
+        meta = report["meta"]
+        print(
+            f"{label:<7} {meta.get('git_revision') or '?':<10} {meta['timestamp']}  "
+            f"dataset {meta['dataset']}  concurrency {meta['concurrency']}"
+        )
+    print()
+
+    header = f"{'scenario':<18}" + "".join(f"{label:>30}" for _, label, _ in METRICS)
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+    names = [name for name in before["scenarios"] if name in after["scenarios"]]
+    for name in names:
+        old, new = before["scenarios"][name], after["scenarios"][name]
+        cells = []
+        for metric, _, higher_is_better in METRICS:
+            a, b = _value(old, metric), _value(new, metric)
+            cells.append(f"{a:>10.2f} → {b:>9.2f} {_format_change(_change(a, b), higher_is_better)}")
+        print(f"{name:<18}" + "".join(f"{cell:>30}" for cell in cells))
+
+        p95_change = _change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        if fail_over is not None and p95_change is not None and p95_change > fail_over:
+            regressions.append(f"{name}: p95 {p95_change:+.1f}%")
+        if new["errors"] > old["errors"]:
+            regressions.append(f"{name}: errors {old['errors']} → {new['errors']}")
+
+    only = sorted(set(before["scenarios"]) ^ set(after["scenarios"]))
+    if only:
+        print(f"\nNot in both runs: {', '.join(only)}")
+
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        if fail_over is not None:
+            return 1
+    return 0
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.splitlines()[0])
+    parser.add_argument("before", help="baseline results (JSON from benchmarks.run)")
+    parser.add_argument("after", help="candidate results")
+    parser.add_argument("--fail-over", type=float, metavar="PCT", help="exit 1 if any p95 regresses by more than PCT%%")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as fh:
+        before = json.load(fh)
+    with open(args.after) as fh:
+        after = json.load(fh)
+    sys.exit(compare(before, after, args.fail_over))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""Drive every API route in-process and report throughput and latency.
+
+The app is served over ``httpx.ASGITransport`` (no sockets, no uvicorn), so
+the numbers measure the application itself: routing, validation, auth,
+caches and the database. A fresh SQLite database of the requested size is
+generated for each run unless ``--db`` points at one to reuse.
+
+Usage::
+
+    python -m benchmarks.run --posts 20000 --concurrency 16 --out before.json
+    python -m benchmarks.run --scenarios posts_feed,posts_search --out after.json
+    python -m benchmarks.compare before.json after.json
+
+App settings are read from the environment as usual, e.g.
+``ASYNC_DATABASE=1 python -m benchmarks.run`` benchmarks the asyncio engine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .seed import PASSWORD, WORDS, SeedInfo, seed_database
+
+API = "/api/v1"
+
+
+@dataclass
+class Context:
+    """Shared state for scenarios: the client, the dataset and logged-in accounts."""
+    client: httpx.AsyncClient
+    db_path: str
+    dataset: SeedInfo
+    rng: random.Random
+    requests: int
+    accounts: List[Dict[str, str]] = field(default_factory=list)  # auth headers, account i is user id i + 1
+    own_posts: List[int] = field(default_factory=list)  # one post per account, for updates
+    doomed_posts: List[int] = field(default_factory=list)  # created up front, deleted by post_delete
+    like_pairs: List[Tuple[int, int]] = field(default_factory=list)  # (account, post_id) liked by like_create
+    deep_cursor: Optional[str] = None
+
+    def account(self, i: int) -> Tuple[int, Dict[str, str]]:
+        index = i % len(self.accounts)
+        return index, self.accounts[index]
+
+    def random_post(self) -> int:
+        return self.rng.randint(1, self.dataset.posts)
+
+    def random_user(self) -> int:
+        return self.rng.randint(1, self.dataset.users)
+
+
+Call = Callable[[Context, int], Awaitable[httpx.Response]]
+Prepare = Callable[[Context], Awaitable[None]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    route: str
+    call: Call
+    ok: Tuple[int, ...] = (200,)
+    prepare: Optional[Prepare] = None
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str, method: str, route: str, ok: Tuple[int, ...] = (200,), prepare: Optional[Prepare] = None):
+    """Register a scenario; they run in registration order."""
+    def decorator(call: Call) -> Call:
+        SCENARIOS[name] = Scenario(name, method, route, call, ok, prepare)
+        return call
+    return decorator
+
+
+def _post_body(ctx: Context, i: int) -> dict:
+    words = [ctx.rng.choice(WORDS) for _ in range(40)]
+    return {
+        "title": f"Benchmark prompt {i}",
+        "content": " ".join(words),
+        "tags": "technology",
+        "llm_model": "gpt-4",
+    }
+
+
+async def _create_posts(ctx: Context, count: int, concurrency: int) -> List[int]:
+    """Create posts round-robin across accounts (untimed setup)."""
+    async def create(i: int) -> int:
+        _, headers = ctx.account(i)
+        response = await ctx.client.post(f"{API}/posts", json=_post_body(ctx, i), headers=headers)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    ids: List[int] = []
+    for start in range(0, count, concurrency):
+        ids += await asyncio.gather(*(create(i) for i in range(start, min(count, start + concurrency))))
+    return ids
+
+
+# --- Authentication -------------------------------------------------------
+
+@scenario("auth_login", "POST", "/auth/login")
+async def auth_login(ctx: Context, i: int) -> httpx.Response:
+    username = ctx.dataset.usernames[i % ctx.dataset.users]
+    return await ctx.client.post(f"{API}/auth/login", data={"username": username, "password": PASSWORD})
+
+
+@scenario("auth_register", "POST", "/auth/register", ok=(201,))
+async def auth_register(ctx: Context, i: int) -> httpx.Response:
+    name = f"reg{os.getpid()}x{i}"
+    return await ctx.client.post(
+        f"{API}/auth/register",
+        json={"username": name, "email": f"{name}@bench.example.com", "password": PASSWORD},
+    )
+
+
+# --- Users ----------------------------------------------------------------
+
+@scenario("users_me", "GET", "/users/me")
+async def users_me(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/users/me", headers=ctx.account(i)[1])
+
+
+@scenario("user_detail", "GET", "/users/{user_id}")
+async def user_detail(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/users/{ctx.random_user()}")
+
+
+@scenario("user_posts", "GET", "/users/{user_id}/posts")
+async def user_posts(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/users/{ctx.random_user()}/posts", params={"limit": 20})
+
+
+# --- Posts ----------------------------------------------------------------
+
+@scenario("posts_feed", "GET", "/posts")
+async def posts_feed(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/posts", params={"limit": 20})
+
+
+async def _find_deep_cursor(ctx: Context) -> None:
+    cursor = None
+    for _ in range(10):
+        params = {"limit": 100, **({"cursor": cursor} if cursor else {})}
+        response = await ctx.client.get(f"{API}/posts", params=params)
+        cursor = response.headers.get("x-next-cursor") or cursor
+    ctx.deep_cursor = cursor
+
+
+@scenario("posts_feed_deep", "GET", "/posts?cursor=...", prepare=_find_deep_cursor)
+async def posts_feed_deep(ctx: Context, i: int) -> httpx.Response:
+    params = {"limit": 20, **({"cursor": ctx.deep_cursor} if ctx.deep_cursor else {})}
+    return await ctx.client.get(f"{API}/posts", params=params)
+
+
+@scenario("post_detail", "GET", "/posts/{post_id}")
+async def post_detail(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/posts/{ctx.random_post()}")
+
+
+@scenario("posts_search", "GET", "/posts/search")
+async def posts_search(ctx: Context, i: int) -> httpx.Response:
+    query = " ".join(ctx.rng.sample(WORDS, ctx.rng.randint(1, 2)))
+    return await ctx.client.get(f"{API}/posts/search", params={"q": query, "limit": 20})
+
+
+@scenario("post_create", "POST", "/posts", ok=(201,))
+async def post_create(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.post(f"{API}/posts", json=_post_body(ctx, i), headers=ctx.account(i)[1])
+
+
+async def _create_own_posts(ctx: Context) -> None:
+    ctx.own_posts = await _create_posts(ctx, len(ctx.accounts), len(ctx.accounts))
+
+
+@scenario("post_update", "PUT", "/posts/{post_id}", prepare=_create_own_posts)
+async def post_update(ctx: Context, i: int) -> httpx.Response:
+    index, headers = ctx.account(i)
+    return await ctx.client.put(
+        f"{API}/posts/{ctx.own_posts[index]}",
+        json={"title": f"Updated benchmark prompt {i}"},
+        headers=headers,
+    )
+
+
+# --- Likes ----------------------------------------------------------------
+
+async def _pick_like_pairs(ctx: Context) -> None:
+    """Choose (account, post) pairs the account has not liked yet."""
+    conn = sqlite3.connect(ctx.db_path)
+    try:
+        liked = set(conn.execute(
+            "SELECT user_id, post_id FROM likes WHERE user_id <= ?", (len(ctx.accounts),)
+        ).fetchall())
+    finally:
+        conn.close()
+    pairs = []
+    for i in range(ctx.requests):
+        index, _ = ctx.account(i)
+        post_id = ctx.random_post()
+        while (index + 1, post_id) in liked:
+            post_id = ctx.random_post()
+        liked.add((index + 1, post_id))
+        pairs.append((index, post_id))
+    ctx.like_pairs = pairs
+
+
+@scenario("like_create", "POST", "/posts/{post_id}/like", ok=(201, 202), prepare=_pick_like_pairs)
+async def like_create(ctx: Context, i: int) -> httpx.Response:
+    index, post_id = ctx.like_pairs[i % len(ctx.like_pairs)]
+    return await ctx.client.post(f"{API}/posts/{post_id}/like", headers=ctx.accounts[index])
+
+
+@scenario("post_likes", "GET", "/posts/{post_id}/likes")
+async def post_likes(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/posts/{ctx.random_post()}/likes")
+
+
+@scenario("my_likes", "GET", "/users/me/likes")
+async def my_likes(ctx: Context, i: int) -> httpx.Response:
+    return await ctx.client.get(f"{API}/users/me/likes", params={"limit": 20}, headers=ctx.account(i)[1])
+
+
+@scenario("like_delete", "DELETE", "/posts/{post_id}/like", ok=(204,))
+async def like_delete(ctx: Context, i: int) -> httpx.Response:
+    index, post_id = ctx.like_pairs[i % len(ctx.like_pairs)]
+    return await ctx.client.delete(f"{API}/posts/{post_id}/like", headers=ctx.accounts[index])
+
+
+async def _create_doomed_posts(ctx: Context) -> None:
+    ctx.doomed_posts = await _create_posts(ctx, ctx.requests, len(ctx.accounts))
+
+
+@scenario("post_delete", "DELETE", "/posts/{post_id}", ok=(204,), prepare=_create_doomed_posts)
+async def post_delete(ctx: Context, i: int) -> httpx.Response:
+    _, headers = ctx.account(i)
+    return await ctx.client.delete(f"{API}/posts/{ctx.doomed_posts[i]}", headers=headers)
+
+
+# --- Runner ---------------------------------------------------------------
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(ctx: Context, spec: Scenario, requests: int, concurrency: int, warmup: int) -> dict:
+    """Issue ``requests`` calls with ``concurrency`` workers and summarize them."""
+    if spec.prepare is not None:
+        await spec.prepare(ctx)
+
+    # Warm-up calls reuse the first indexes so write scenarios are not thrown off.
+    for i in range(min(warmup, requests) if spec.method == "GET" else 0):
+        await spec.call(ctx, i)
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await spec.call(ctx, i)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "method": spec.method,
+        "route": API + spec.route,
+        "requests": len(latencies),
+        "errors": sum(count for code, count in statuses.items() if code not in spec.ok),
+        "status_counts": {str(code): count for code, count in sorted(statuses.items())},
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "p50": round(percentile(ms, 50), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _app_settings() -> dict:
+    from app.config import settings
+    return {k: v for k, v in settings.model_dump().items() if k != "secret_key"}
+
+
+async def benchmark(args: argparse.Namespace, db_path: str, dataset: SeedInfo) -> dict:
+    from app.main import app
+
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            ctx = Context(client=client, db_path=db_path, dataset=dataset, rng=random.Random(args.seed), requests=args.requests)
+            for index in range(min(args.accounts, dataset.users)):
+                response = await client.post(
+                    f"{API}/auth/login",
+                    data={"username": dataset.usernames[index], "password": PASSWORD},
+                )
+                response.raise_for_status()
+                ctx.accounts.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+
+            results = {}
+            for name in names:
+                result = await run_scenario(ctx, SCENARIOS[name], args.requests, args.concurrency, args.warmup)
+                results[name] = result
+                latency = result["latency_ms"]
+                print(
+                    f"{name:<18} {result['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {latency['p50']:>8.2f}  p95 {latency['p95']:>8.2f}  p99 {latency['p99']:>8.2f} ms"
+                    + (f"  errors {result['errors']}" if result["errors"] else ""),
+                    file=sys.stderr,
+                )
+    return results
+
+
+def prepare_database(args: argparse.Namespace) -> Tuple[str, SeedInfo]:
+    """Point the app at the benchmark database, generating it if needed."""
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+    # Settings are read at import time, so the app is only imported from here on.
+    import app.main  # noqa: F401  (registers every model before init_db)
+    from app.database import init_db
+    from app.utils.security import get_password_hash
+
+    init_db()
+    conn = sqlite3.connect(db_path)
+    try:
+        users, posts, likes = (conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("users", "posts", "likes"))
+        usernames = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY id")]
+    finally:
+        conn.close()
+
+    if users:
+        print(f"Reusing {db_path}: {users} users, {posts} posts, {likes} likes", file=sys.stderr)
+        return db_path, SeedInfo(users=users, posts=posts, likes=likes, usernames=usernames)
+
+    started = time.perf_counter()
+    dataset = seed_database(db_path, args.users, args.posts, args.likes, get_password_hash(PASSWORD), seed=args.seed)
+    print(
+        f"Seeded {db_path}: {dataset.users} users, {dataset.posts} posts, {dataset.likes} likes "
+        f"in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr,
+    )
+    return db_path, dataset
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="users to generate")
+    parser.add_argument("--posts", type=int, default=10000, help="posts to generate")
+    parser.add_argument("--likes", type=int, default=50000, help="likes to generate")
+    parser.add_argument("--db", help="database file to reuse (generated if missing); default is a fresh temp file")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent in-flight requests")
+    parser.add_argument("--accounts", type=int, default=16, help="logged-in accounts used by authenticated scenarios")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests before each read scenario")
+    parser.add_argument("--scenarios", help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and request mix")
+    parser.add_argument("--out", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    db_path, dataset = prepare_database(args)
+    try:
+        results = asyncio.run(benchmark(args, db_path, dataset))
+    finally:
+        if not args.db:
+            shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": {"users": dataset.users, "posts": dataset.posts, "likes": dataset.likes},
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "accounts": min(args.accounts, dataset.users),
+            "seed": args.seed,
+            "settings": _app_settings(),
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
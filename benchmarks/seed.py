@@ -0,0 +1,88 @@
+"""Generate a synthetic database for benchmarking.
+
+Rows are written with plain SQL in large transactions after ``init_db`` has
+created the schema, so seeding 100k posts takes seconds rather than minutes.
+Every user shares one bcrypt hash of ``PASSWORD``.
+"""
+import random
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List
+
+PASSWORD = "benchmark-password"
+
+TAGS = ["technology", "mechanics", "engineering", "writing", "marketing", "education", "science", "art"]
+MODELS = ["gpt-4", "gpt-4o", "claude-3", "claude-3.5", "gemini-pro", "llama-3", "mistral-large"]
+WORDS = (
+    "act as a senior engineer review this code explain the concept step by step write a "
+    "summary translate generate ideas for an essay outline debug performance test plan "
+    "marketing copy friendly tone concise detailed examples python javascript sql rust "
+    "physics chemistry history poem story character dialogue product launch email"
+).split()
+
+
+@dataclass
+class SeedInfo:
+    """What was generated, for scenarios to pick ids and credentials from."""
+    users: int
+    posts: int
+    likes: int
+    usernames: List[str]
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def seed_database(db_path: str, users: int, posts: int, likes: int, password_hash: str, seed: int = 42) -> SeedInfo:
+    """Fill an initialized, empty SQLite database with users, posts and likes."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(db_path)
+    try:
+        usernames = [f"bench{i:06d}" for i in range(users)]
+        conn.executemany(
+            "INSERT INTO users (id, username, email, hashed_password, created_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (i + 1, name, f"{name}@bench.example.com", password_hash, now - timedelta(days=365))
+                for i, name in enumerate(usernames)
+            ],
+        )
+
+        conn.executemany(
+            "INSERT INTO posts (id, title, content, tags, llm_model, created_at, user_id, likes_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+            [
+                (
+                    i + 1,
+                    _sentence(rng, 3, 8).capitalize(),
+                    _sentence(rng, 30, 120),
+                    rng.choice(TAGS),
+                    rng.choice(MODELS),
+                    now - timedelta(seconds=(posts - i) * 60),
+                    rng.randint(1, users),
+                )
+                for i in range(posts)
+            ],
+        )
+
+        # Skewed popularity: a few hot posts collect most likes, as on a real feed.
+        pairs = set()
+        while len(pairs) < min(likes, users * posts):
+            if rng.random() < 0.5:
+                post_id = posts + 1 - min(posts, int(rng.paretovariate(1.2)))
+            else:
+                post_id = rng.randint(1, posts)
+            pairs.add((rng.randint(1, users), post_id))
+        conn.executemany(
+            "INSERT INTO likes (user_id, post_id, created_at) VALUES (?, ?, ?)",
+            [(user_id, post_id, now - timedelta(seconds=rng.randint(0, 86400))) for user_id, post_id in pairs],
+        )
+        conn.execute(
+            "UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id)"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return SeedInfo(users=users, posts=posts, likes=len(pairs), usernames=usernames)
@@ -0,0 +1,66 @@
+"""Shared fixtures: one app instance over a temporary SQLite database.
+
+Settings are read when ``app`` is imported, so the environment is set up
+here first. The database is shared by the whole session; tests register
+their own users (``make_user``) and never rely on the rows of others.
+"""
+import itertools
+import os
+import tempfile
+import time
+
+_DB_DIR = tempfile.mkdtemp(prefix="aipromptapp-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["SECRET_KEY"] = "test-secret-key"
+os.environ["DUPLICATE_POLICY"] = "off"
+# A write waiting on the pool fails fast instead of hanging the suite
+os.environ["DB_POOL_TIMEOUT_SECONDS"] = "2"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.jobs import job_runner
+
+API = "/api/v1"
+PASSWORD = "password123"
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client):
+    """Register and log in a new user; returns ``(user_id, auth_headers)``."""
+
+    def make_user():
+        username = f"user{next(_user_numbers)}"
+        response = client.post(
+            f"{API}/auth/register",
+            json={"username": username, "email": f"{username}@example.com", "password": PASSWORD},
+        )
+        assert response.status_code == 201, response.text
+        token = client.post(
+            f"{API}/auth/login", data={"username": username, "password": PASSWORD}
+        ).json()["access_token"]
+        return response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+    return make_user
+
+
+@pytest.fixture
+def wait_for_jobs():
+    """Block until every queued background job has run."""
+
+    def wait_for_jobs(timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        while job_runner.depth:
+            assert time.monotonic() < deadline, "background jobs did not finish"
+            time.sleep(0.01)
+
+    return wait_for_jobs
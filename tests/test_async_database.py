@@ -0,0 +1,59 @@
+"""The request paths over ``AsyncSession`` (``ASYNC_DATABASE``), whatever mode the suite runs in."""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import database
+from app.main import app
+from .conftest import API
+
+
+@pytest.fixture
+def async_sessions(client):
+    """Route every request's database session through aiosqlite; yields the sessions opened."""
+    url = database._async_database_url()
+    write_engine = database._create_async_engine(url, read_only=False)
+    read_engine = database._create_async_engine(url, read_only=True)
+    opened = []
+
+    def scope(engine):
+        factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+        async def get_session():
+            async for db in database._session_scope(None, factory):
+                opened.append(db)
+                yield db
+
+        return get_session
+
+    app.dependency_overrides[database.get_db] = scope(write_engine)
+    app.dependency_overrides[database.get_read_db] = scope(read_engine)
+    try:
+        yield opened
+    finally:
+        app.dependency_overrides.pop(database.get_db)
+        app.dependency_overrides.pop(database.get_read_db)
+        client.portal.call(write_engine.dispose)
+        client.portal.call(read_engine.dispose)
+
+
+def test_writes_and_reads_over_async_sessions(client, make_user, wait_for_jobs, async_sessions):
+    author_id, author = make_user()
+    _, fan = make_user()
+    assert client.post(f"{API}/users/{author_id}/follow", headers=fan).status_code == 201
+    post = {"title": "Awaited", "content": "Written through aiosqlite sessions", "tags": "asyncdb", "llm_model": "gpt-4"}
+    response = client.post(f"{API}/posts", json=post, headers=author)
+    assert response.status_code == 201, response.text
+    post_id = response.json()["id"]
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 201
+    wait_for_jobs()
+
+    assert client.get(f"{API}/posts/{post_id}", headers=fan).json()["liked_by_me"] is True
+    assert client.get(f"{API}/posts/{post_id}").json()["likes_count"] == 1
+    assert post_id in [item["id"] for item in client.get(f"{API}/users/me/timeline", headers=fan).json()]
+    assert post_id in [item["id"] for item in client.get(f"{API}/posts", params={"tag": "asyncdb"}).json()]
+    assert [hit["id"] for hit in client.get(f"{API}/posts/search", params={"q": "aiosqlite"}).json()] == [post_id]
+
+    assert client.delete(f"{API}/posts/{post_id}/like", headers=fan).status_code == 204
+    assert client.delete(f"{API}/posts/{post_id}", headers=author).status_code == 204
+    assert client.get(f"{API}/posts/{post_id}").status_code == 404
+    assert async_sessions and all(isinstance(db, AsyncSession) for db in async_sessions)
@@ -0,0 +1,39 @@
+from app import events
+from app.services.auth_cache import principal_cache
+from app.utils.cache import TTLCache
+from .conftest import API
+
+
+def test_repeat_requests_reuse_the_cached_principal(client, make_user):
+    user_id, headers = make_user()
+    assert client.get(f"{API}/users/me", headers=headers).json()["id"] == user_id
+    hits = principal_cache.stats()["hits"]
+    assert client.get(f"{API}/users/me", headers=headers).json()["id"] == user_id
+    assert principal_cache.stats()["hits"] == hits + 1
+
+
+def test_entries_expire_with_the_token():
+    now = [1000.0]
+    cache = TTLCache(maxsize=10, ttl=300, clock=lambda: now[0])
+    cache.set("token", "principal", expires_at=1010.0)
+    assert cache.get("token") == "principal"
+    now[0] = 1010.0
+    assert cache.get("token") is None
+
+
+def test_user_events_drop_the_cached_principals(client, make_user):
+    user_id, headers = make_user()
+    _, other = make_user()
+    client.get(f"{API}/users/me", headers=headers)
+    client.get(f"{API}/users/me", headers=other)
+    token = headers["Authorization"].split()[1]
+    other_token = other["Authorization"].split()[1]
+    assert principal_cache.get(token) is not None
+
+    events.publish(events.USER_UPDATED, user_id=user_id)
+
+    assert principal_cache.get(token) is None
+    assert principal_cache.get(other_token) is not None
+    assert client.get(f"{API}/users/me", headers=headers).json()["id"] == user_id
+    assert principal_cache.get(token) is not None
+    assert principal_cache.invalidate_user(user_id) == 1
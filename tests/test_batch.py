@@ -0,0 +1,45 @@
+from app.config import settings
+from app.schemas.user import UserResponse
+from .conftest import API
+
+
+def _post(client, headers, title):
+    post = {"title": title, "content": f"{title} looked up in a batch", "tags": "batch", "llm_model": "gpt-4"}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_post_batch_keeps_request_order_and_lists_missing_ids(client, make_user):
+    _, headers = make_user()
+    first, second = _post(client, headers, "First"), _post(client, headers, "Second")
+    missing = second + 100000
+
+    response = client.get(f"{API}/posts/batch", params={"ids": [f"{second},{missing}", str(first), str(second)]})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [post["id"] for post in body["posts"]] == [second, first]
+    assert body["posts"][1] == client.get(f"{API}/posts/{first}").json()
+    assert body["missing"] == [missing]
+
+
+def test_user_batch_returns_public_fields(client, make_user):
+    user_id, _ = make_user()
+
+    body = client.get(f"{API}/users/batch", params={"ids": f"{user_id},999999"}).json()
+
+    assert [user["id"] for user in body["users"]] == [user_id]
+    assert set(body["users"][0]) == set(UserResponse.model_fields)
+    assert body["missing"] == [999999]
+
+
+def test_batch_rejects_bad_and_too_many_ids(client, monkeypatch):
+    monkeypatch.setattr(settings, "batch_lookup_max_ids", 2)
+
+    assert client.get(f"{API}/posts/batch", params={"ids": "1,x"}).status_code == 400
+    assert client.get(f"{API}/posts/batch", params={"ids": "0"}).status_code == 400
+    assert client.get(f"{API}/users/batch", params={"ids": ","}).status_code == 400
+    assert client.get(f"{API}/users/batch", params={"ids": "1,2,3"}).status_code == 400
+    # Repeated ids count once
+    assert client.get(f"{API}/users/batch", params={"ids": "1,2,2,1"}).status_code == 200
@@ -0,0 +1,21 @@
+from .conftest import API
+
+
+def test_cached_feed_is_served_gzipped_with_its_own_etag(client, make_user):
+    _, author = make_user()
+    for number in range(10):
+        post = {"title": f"Compressed {number}", "content": "Long enough to compress " * 10, "tags": "testing", "llm_model": "gpt-4"}
+        assert client.post(f"{API}/posts", json=post, headers=author).status_code == 201
+
+    plain = client.get(f"{API}/posts?limit=10", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get(f"{API}/posts?limit=10", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in gzipped.headers["vary"]
+    assert gzipped.headers["etag"] != plain.headers["etag"]
+    assert gzipped.json() == plain.json()  # Decoded by the client
+    revalidated = client.get(
+        f"{API}/posts?limit=10", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
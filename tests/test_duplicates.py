@@ -0,0 +1,42 @@
+from app.config import settings
+from .conftest import API
+
+TEXT = "Write a limerick about a cat who learns to program in Rust and refuses to use unsafe blocks"
+
+
+def _post(client, headers, content):
+    return client.post(
+        f"{API}/posts", json={"title": "Dup", "content": content, "tags": "testing", "llm_model": "gpt-4"},
+        headers=headers,
+    )
+
+
+def test_near_duplicates_are_flagged_and_listed(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "duplicate_policy", "flag")
+    _, headers = make_user()
+    original = _post(client, headers, TEXT).json()
+    assert original.get("duplicate_of") is None
+
+    copy = _post(client, headers, TEXT.upper() + "!!").json()
+
+    assert copy["duplicate_of"] == original["id"]
+    listed = client.get(f"{API}/posts/{copy['id']}/duplicates").json()
+    assert [(item["id"], item["similarity"]) for item in listed] == [(original["id"], 1.0)]
+
+
+def test_near_duplicates_are_rejected(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "duplicate_policy", "reject")
+    _, headers = make_user()
+    text = "Summarize the attached quarterly report in five bullet points for a busy executive audience"
+    assert _post(client, headers, text).status_code == 201
+    response = _post(client, headers, text + " please")
+    assert response.status_code == 409
+
+
+def test_content_without_words_is_never_a_duplicate(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "duplicate_policy", "reject")
+    _, headers = make_user()
+    for content in ("!!! ???", "🎉🎉🎉", "... --- ..."):
+        response = _post(client, headers, content)
+        assert response.status_code == 201, response.text
+        assert client.get(f"{API}/posts/{response.json()['id']}/duplicates").json() == []
@@ -0,0 +1,43 @@
+import json
+
+from app.config import settings
+from app.utils import ndjson
+from .conftest import API
+
+
+def _line(title, content):
+    return json.dumps({"title": title, "content": content, "tags": "imported", "llm_model": "gpt-4"})
+
+
+def test_import_reports_bad_lines_and_export_streams_the_rest(client, make_user, monkeypatch):
+    user_id, headers = make_user()
+    # Several chunks, so that lines are numbered across transactions
+    monkeypatch.setattr(settings, "bulk_import_chunk_size", 2)
+    body = "\n".join([
+        _line("First import", "Imported in the first chunk"),
+        "{not json",
+        _line("Second import", "Imported after a bad line"),
+        "",
+        json.dumps({"title": "No content"}),
+        _line("Third import", "Imported in the last chunk"),
+    ])
+
+    response = client.post(f"{API}/posts/import", content=body, headers=headers)
+
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["imported"] == 3 and result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [2, 5]
+
+    exported = client.get(f"{API}/posts/export", params={"user_id": user_id}, headers=headers)
+    assert exported.status_code == 200
+    assert exported.headers["content-type"].startswith(ndjson.MEDIA_TYPE)
+    posts = [json.loads(line) for line in exported.text.splitlines()]
+    assert [post["title"] for post in posts] == ["First import", "Second import", "Third import"]
+    assert all(post["user_id"] == user_id for post in posts)
+    assert [post["id"] for post in posts] == sorted(post["id"] for post in posts)
+
+
+def test_import_and_export_need_authentication(client):
+    assert client.post(f"{API}/posts/import", content=_line("Anonymous", "Not allowed")).status_code == 401
+    assert client.get(f"{API}/posts/export").status_code == 401
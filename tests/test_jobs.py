@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+from app.services.jobs import JobRunner, job_runner
+from .conftest import API
+
+
+def _runner(**overrides) -> JobRunner:
+    options = dict(enabled=True, capacity=2, max_attempts=1, retry_delay=0, drain_timeout=5)
+    options.update(overrides)
+    return JobRunner(**options)
+
+
+def test_fan_out_runs_inline_when_runner_is_stopped(client, make_user):
+    author_id, author = make_user()
+    _, follower = make_user()
+    assert client.post(f"{API}/users/{author_id}/follow", headers=follower).status_code == 201
+    # A stopped runner (like the CLI's) makes the route run the fan-out itself
+    client.portal.call(job_runner.stop)
+    try:
+        inline = job_runner.inline
+        started = time.perf_counter()
+        response = client.post(
+            f"{API}/posts",
+            json={"title": "Inline", "content": "Fanned out by the request", "tags": "testing", "llm_model": "gpt-4"},
+            headers=author,
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        client.portal.call(job_runner.start)
+
+    assert response.status_code == 201, response.text
+    assert job_runner.inline > inline
+    # Waiting on the write pool would take the whole DB_POOL_TIMEOUT_SECONDS
+    assert elapsed < 1.5
+    timeline = client.get(f"{API}/users/me/timeline", headers=follower).json()
+    assert response.json()["id"] in [post["id"] for post in timeline]
+
+
+def test_full_queue_makes_submitters_wait_in_order():
+    order = []
+    gate = threading.Event()
+
+    async def scenario():
+        runner = _runner()
+        await runner.start()
+        runner.submit("gate", gate.wait)
+        runner.submit("first", order.append, "first")
+        # The queue is full: a thread and a coroutine both wait for room instead of running inline
+        waiting = threading.Thread(target=runner.submit, args=("second", order.append, "second"))
+        waiting.start()
+        while runner.waits < 1:
+            await asyncio.sleep(0.01)
+        third = asyncio.create_task(runner.submit_async("third", order.append, "third"))
+        await asyncio.sleep(0.05)
+        assert order == [] and not third.done()
+        gate.set()
+        await third
+        await asyncio.get_running_loop().run_in_executor(None, waiting.join)
+        await runner.stop()
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert sorted(order) == ["first", "second", "third"] and order[0] == "first"
+    assert runner.inline == 0 and runner.rejected == 0
+    assert runner.waits == 2 and runner.completed == 4
+
+
+def test_full_queue_rejects_submissions_from_the_loop():
+    gate = threading.Event()
+    ran = []
+
+    async def scenario():
+        runner = _runner()
+        await runner.start()
+        runner.submit("gate", gate.wait)
+        runner.submit("first", ran.append, "first")
+        # The event loop cannot wait for room, and must not run the job ahead of the queue
+        runner.submit("rejected", ran.append, "rejected")
+        assert ran == []
+        gate.set()
+        await runner.stop()
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert ran == ["first"]
+    assert runner.rejected == 1 and runner.inline == 0
+
+
+def test_stop_timeout_drops_queued_and_running_jobs():
+    gate = threading.Event()
+
+    async def scenario():
+        runner = _runner(capacity=10, drain_timeout=0.1)
+        await runner.start()
+        runner.submit("running", gate.wait)
+        runner.submit("queued", lambda: None)
+        runner.submit("queued", lambda: None)
+        await runner.stop()
+        assert runner.dropped == 3 and runner.depth == 0
+        # The running job finishing late is not taken off the depth again
+        gate.set()
+        await asyncio.sleep(0.1)
+        return runner
+
+    runner = asyncio.run(scenario())
+    assert runner.depth == 0 and runner.dropped == 3
@@ -0,0 +1,54 @@
+from app.crud import like as like_crud
+from app.services.like_buffer import like_buffer
+from .conftest import API
+
+
+def test_buffered_toggles_coalesce_into_one_write(client, make_user, monkeypatch):
+    _, author = make_user()
+    _, fan = make_user()
+    post = {"title": "Buffered", "content": "Liked through the buffer", "tags": "testing", "llm_model": "gpt-4"}
+    post_id = client.post(f"{API}/posts", json=post, headers=author).json()["id"]
+    # Enabled without its flush task, so the test decides when intents are written
+    monkeypatch.setattr(like_buffer, "enabled", True)
+    rows_written = like_buffer.rows_written
+
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 202
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 400
+    assert client.delete(f"{API}/posts/{post_id}/like", headers=fan).status_code == 204
+    assert client.delete(f"{API}/posts/{post_id}/like", headers=fan).status_code == 404
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 202
+    assert client.get(f"{API}/posts/{post_id}", headers=fan).json()["liked_by_me"] is True
+
+    assert like_buffer.flush() == 1
+    assert like_buffer.rows_written == rows_written + 1
+    assert client.get(f"{API}/posts/{post_id}").json()["likes_count"] == 1
+
+
+def test_full_buffer_answers_503_until_a_flush_succeeds(client, make_user, monkeypatch):
+    _, author = make_user()
+    fans = [make_user()[1] for _ in range(3)]
+    post = {"title": "Capped", "content": "Liked while flushes fail", "tags": "testing", "llm_model": "gpt-4"}
+    post_id = client.post(f"{API}/posts", json=post, headers=author).json()["id"]
+    monkeypatch.setattr(like_buffer, "enabled", True)
+    monkeypatch.setattr(like_buffer, "max_pending", 2)
+    rejected = like_buffer.rejected
+
+    def failing_apply(db, changes):
+        raise RuntimeError("database unavailable")
+
+    with monkeypatch.context() as broken:
+        broken.setattr(like_crud, "apply_like_changes", failing_apply)
+        assert client.post(f"{API}/posts/{post_id}/like", headers=fans[0]).status_code == 202
+        assert client.post(f"{API}/posts/{post_id}/like", headers=fans[1]).status_code == 202
+        assert like_buffer.flush() == 0
+        response = client.post(f"{API}/posts/{post_id}/like", headers=fans[2])
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        # Changing a pending intent does not grow the buffer
+        assert client.delete(f"{API}/posts/{post_id}/like", headers=fans[1]).status_code == 204
+
+    assert like_buffer.rejected == rejected + 1
+    assert like_buffer.flush() == 2
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fans[2]).status_code == 202
+    assert like_buffer.flush() == 1
+    assert client.get(f"{API}/posts/{post_id}").json()["likes_count"] == 2
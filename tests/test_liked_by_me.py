@@ -0,0 +1,33 @@
+from .conftest import API
+
+
+def test_liked_by_me_is_per_caller_even_on_cached_pages(client, make_user):
+    author_id, author = make_user()
+    _, fan = make_user()
+    post = {"content": "Liked by one caller only", "tags": "flags", "llm_model": "gpt-4"}
+    liked, unliked = (
+        client.post(f"{API}/posts", json={**post, "title": title}, headers=author).json()["id"]
+        for title in ("Liked", "Not liked")
+    )
+    assert client.post(f"{API}/posts/{liked}/like", headers=fan).status_code == 201
+
+    def flags(path, headers=None):
+        response = client.get(f"{API}{path}", headers=headers)
+        assert response.status_code == 200, response.text
+        assert "Authorization" in response.headers["Vary"]
+        body = response.json()
+        items = body["posts"] if "posts" in body else body if isinstance(body, list) else [body]
+        return {item["id"]: item.get("liked_by_me") for item in items if item["id"] in (liked, unliked)}
+
+    both = {liked: True, unliked: False}
+    listings = {
+        "/posts": both,
+        f"/users/{author_id}/posts": both,
+        f"/posts/batch?ids={liked},{unliked}": both,
+        f"/posts/{liked}": {liked: True},
+    }
+    for path, expected in listings.items():
+        # Twice for the fan: the second answer may come from the response cache
+        assert flags(path, fan) == flags(path, fan) == expected
+        assert flags(path, author) == {post_id: False for post_id in expected}
+        assert flags(path) == {post_id: None for post_id in expected}
@@ -0,0 +1,54 @@
+from app.services.metrics import COUNTER, SERVICE_STATS
+from app.utils.query_stats import query_budget
+from .conftest import API
+
+POSTS = 5
+
+
+def _post(client, headers, number):
+    post = {"title": f"Budget {number}", "content": f"Query budget post {number}", "tags": "testing", "llm_model": "gpt-4"}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_liked_posts_take_one_query_however_many(client, make_user, wait_for_jobs):
+    _, headers = make_user()
+    for number in range(POSTS):
+        post_id = _post(client, headers, number)
+        assert client.post(f"{API}/posts/{post_id}/like", headers=headers).status_code == 201
+    wait_for_jobs()
+    client.get(f"{API}/users/me", headers=headers)  # Principal cached
+
+    with query_budget(1):
+        response = client.get(f"{API}/users/me/likes", headers=headers)
+    assert response.status_code == 200
+
+
+def test_home_timeline_query_budget(client, make_user, wait_for_jobs):
+    author_id, author = make_user()
+    _, follower = make_user()
+    assert client.post(f"{API}/users/{author_id}/follow", headers=follower).status_code == 201
+    for number in range(POSTS):
+        _post(client, author, number)
+    wait_for_jobs()
+    client.get(f"{API}/users/me", headers=follower)
+
+    # The page, the followed authors too popular to fan out, and liked_by_me
+    with query_budget(3):
+        response = client.get(f"{API}/users/me/timeline", headers=follower)
+    assert len(response.json()) == POSTS
+
+
+def test_service_stats_are_typed_and_described(client):
+    text = client.get("/metrics").text
+    for prefix, stats, described in SERVICE_STATS:
+        for key in stats():
+            kind, help_text = described[key]
+            name = f"app_{prefix}_{key}"
+            if kind == COUNTER and not name.endswith("_total"):
+                name += "_total"
+            assert f"# TYPE {name} {kind}\n" in text
+            assert f"# HELP {name} {help_text}\n" in text
+    assert "# TYPE app_jobs_completed_total counter\n" in text
+    assert "# TYPE app_jobs_depth gauge\n" in text
@@ -0,0 +1,26 @@
+from sqlalchemy import text
+
+from app.database import engine, init_db
+from .conftest import API
+
+
+def test_added_likes_count_is_backfilled(client, make_user):
+    _, author = make_user()
+    post = {"title": "Liked", "content": "Counted again after the migration", "tags": "testing", "llm_model": "gpt-4"}
+    post_id = client.post(f"{API}/posts", json=post, headers=author).json()["id"]
+    for _ in range(3):
+        _, fan = make_user()
+        assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 201
+
+    # A database from before posts.likes_count
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE posts DROP COLUMN likes_count")
+    init_db()
+
+    with engine.connect() as conn:
+        likes_count = conn.execute(text("SELECT likes_count FROM posts WHERE id = :id"), {"id": post_id}).scalar()
+        stale = conn.execute(text(
+            "SELECT COUNT(*) FROM posts WHERE likes_count != (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id)"
+        )).scalar()
+    assert likes_count == 3
+    assert stale == 0
@@ -0,0 +1,19 @@
+import pytest
+
+from app.utils.pagination import NEXT_CURSOR_HEADER, next_cursor_headers
+from .conftest import API
+
+
+@pytest.mark.parametrize("params", ["limit=0", "limit=101", "skip=-1"])
+def test_user_posts_rejects_out_of_range_paging(client, make_user, params):
+    user_id, _ = make_user()
+    assert client.get(f"{API}/users/{user_id}/posts?{params}").status_code == 422
+
+
+def test_next_cursor_headers_of_an_empty_page():
+    assert next_cursor_headers([], 0, "user_posts", key=lambda item: item) == {}
+
+
+def test_next_cursor_headers_of_a_full_page():
+    headers = next_cursor_headers([(1,), (2,)], 2, "user_posts", key=lambda item: item)
+    assert NEXT_CURSOR_HEADER in headers
@@ -0,0 +1,16 @@
+import time
+
+from app.services.password_hasher import password_hasher
+
+
+def test_register_recovers_after_a_worker_process_dies(make_user):
+    make_user()  # Starts the pool
+    restarts = password_hasher.stats()["pool_restarts"]
+    for process in list(password_hasher._executor._processes.values()):
+        process.kill()
+        process.join()
+    time.sleep(0.2)  # Lets the pool notice it is broken
+
+    make_user()
+
+    assert password_hasher.stats()["pool_restarts"] == restarts + 1
@@ -0,0 +1,38 @@
+import time
+
+from app.crud import post as post_crud
+from app.database import ReadSessionLocal
+from app.services.recent_posts import recent_posts
+from .conftest import API
+
+
+def _wait_until_loaded(timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not recent_posts.ready:
+        assert time.monotonic() < deadline, "recent posts read model did not load"
+        time.sleep(0.01)
+
+
+def test_feed_pages_from_the_read_model_match_the_database(client, make_user):
+    _wait_until_loaded()
+    _, author = make_user()
+    _, fan = make_user()
+    for number in range(3):
+        post = {"title": f"Recent {number}", "content": f"Held in memory {number}", "tags": "testing", "llm_model": "gpt-4"}
+        post_id = client.post(f"{API}/posts", json=post, headers=author).json()["id"]
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 201
+    hits = recent_posts.hits
+
+    page = client.get(f"{API}/posts?skip=1&limit=4").json()
+
+    assert recent_posts.hits > hits
+    db = ReadSessionLocal()
+    try:
+        expected = post_crud.get_posts(db, skip=1, limit=4)
+    finally:
+        db.close()
+    assert [(post["id"], post["likes_count"]) for post in page] == [
+        (post.id, post.likes_count) for post in expected
+    ]
+    newest = client.get(f"{API}/posts?limit=1").json()[0]
+    assert (newest["id"], newest["likes_count"]) == (post_id, 1)
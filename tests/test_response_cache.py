@@ -0,0 +1,57 @@
+import pytest
+
+from app.config import settings
+from app.main import check_worker_count
+from app.services.recent_posts import recent_posts
+from app.services.response_cache import FEED_TAG, ResponseCache
+from app.services.similar_posts import similar_posts
+from app.services.suggestions import post_suggestions
+from .conftest import API
+
+
+def test_post_etag_changes_when_the_post_is_liked(client, make_user):
+    _, author = make_user()
+    _, fan = make_user()
+    post = {"title": "Cached", "content": "Served from the response cache", "tags": "testing", "llm_model": "gpt-4"}
+    post_id = client.post(f"{API}/posts", json=post, headers=author).json()["id"]
+
+    first = client.get(f"{API}/posts/{post_id}")
+    etag = first.headers["etag"]
+    assert client.get(f"{API}/posts/{post_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 201
+    after = client.get(f"{API}/posts/{post_id}", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["etag"] != etag
+    assert after.json()["likes_count"] == first.json()["likes_count"] + 1
+
+
+def test_feed_page_includes_a_new_post(client, make_user):
+    _, author = make_user()
+    feed = client.get(f"{API}/posts?limit=5")
+    etag = feed.headers["etag"]
+    post = {"title": "Fresh", "content": "Invalidates the feed page", "tags": "testing", "llm_model": "gpt-4"}
+    post_id = client.post(f"{API}/posts", json=post, headers=author).json()["id"]
+
+    after = client.get(f"{API}/posts?limit=5", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json()[0]["id"] == post_id
+
+
+def test_entries_expire_after_the_ttl():
+    now = [100.0]
+    cache = ResponseCache(maxsize=10, ttl=30, clock=lambda: now[0])
+    cache.store("/posts?", b"[]", [FEED_TAG], cache.epoch)
+    assert cache.get("/posts?") is not None
+    now[0] = 130.0
+    assert cache.get("/posts?") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_read_models_refuse_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    with pytest.raises(RuntimeError, match="RECENT_POSTS_ENABLED=false"):
+        check_worker_count()
+    for service in (recent_posts, similar_posts, post_suggestions):
+        monkeypatch.setattr(service, "enabled", False)
+    check_worker_count()
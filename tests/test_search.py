@@ -0,0 +1,48 @@
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from .conftest import API
+
+
+def _post(client, headers, title, content):
+    post = {"title": title, "content": content, "tags": "testing", "llm_model": "gpt-4"}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_search_ranks_title_matches_first_and_matches_prefixes(client, make_user):
+    _, headers = make_user()
+    in_content = _post(client, headers, "Unrelated", "All about zanzibarite minerals")
+    in_title = _post(client, headers, "Zanzibarite guide", "Nothing else here")
+
+    hits = client.get(f"{API}/posts/search", params={"q": "zanzib"}).json()
+
+    assert [hit["id"] for hit in hits] == [in_title, in_content]
+    assert "<mark>" in hits[0]["snippet"]
+
+
+def test_search_snippets_escape_post_html(client, make_user):
+    _, headers = make_user()
+    _post(client, headers, "Harmless", 'quokkaword <script>alert(1)</script> <img src=x onerror="alert(2)">')
+
+    snippet = client.get(f"{API}/posts/search", params={"q": "quokkaword"}).json()[0]["snippet"]
+
+    assert "<script>" not in snippet and "<img" not in snippet
+    assert "&lt;script&gt;" in snippet
+    assert snippet.startswith("<mark>quokkaword</mark>")
+
+
+def test_search_cursor_walks_every_hit_once(client, make_user):
+    _, headers = make_user()
+    ids = {_post(client, headers, f"Wombatique {number}", "wombatique " * (number + 1)) for number in range(5)}
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "wombatique", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"{API}/posts/search", params=params)
+        seen += [hit["id"] for hit in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(ids)
+    assert client.get(f"{API}/posts", params={"cursor": response.request.url.params.get("cursor")}).status_code == 400
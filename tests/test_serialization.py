@@ -0,0 +1,23 @@
+from app.schemas.post import PostResponse, VIEWER_FIELDS
+from app.services.recent_posts import recent_posts
+from .conftest import API
+
+POST_KEYS = set(PostResponse.model_fields) - set(VIEWER_FIELDS)
+
+
+def test_list_responses_match_the_single_post_response(client, make_user):
+    user_id, headers = make_user()
+    post = {"title": "Rendered", "content": "Same body in every listing", "tags": "serialization", "llm_model": "gpt-4"}
+    post_id = client.post(f"{API}/posts", json=post, headers=headers).json()["id"]
+    single = client.get(f"{API}/posts/{post_id}").json()
+    assert set(single) == POST_KEYS
+
+    hits = recent_posts.hits
+    from_memory = client.get(f"{API}/posts", params={"limit": 5}).json()
+    assert recent_posts.hits == hits + 1
+    # Filtered feeds are always read from the database
+    from_database = client.get(f"{API}/posts", params={"limit": 5, "llm_model": "gpt-4"}).json()
+    by_user = client.get(f"{API}/users/{user_id}/posts").json()
+
+    for listing in (from_memory, from_database, by_user):
+        assert next(item for item in listing if item["id"] == post_id) == single
@@ -0,0 +1,41 @@
+from app.services.similar_posts import similar_posts
+from .conftest import API
+
+
+def _post(client, headers, title, content, tags):
+    post = {"title": title, "content": content, "tags": tags, "llm_model": "gpt-4"}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_similar_posts_rank_shared_terms_and_follow_deletes(client, make_user, wait_for_jobs):
+    _, headers = make_user()
+    source = _post(client, headers, "Axolotl husbandry", "Keep the axolotl tank water cold and clean", "axolotls")
+    close = _post(client, headers, "Axolotl tank setup", "Cold clean water for an axolotl tank", "axolotls")
+    loose = _post(client, headers, "Axolotl facts", "The axolotl is a salamander", "amphibians")
+    unrelated = _post(client, headers, "Sourdough", "Sourdough starter needs flour twice daily", "baking")
+    wait_for_jobs()
+
+    response = client.get(f"{API}/posts/{source}/similar")
+
+    assert response.status_code == 200, response.text
+    matches = response.json()
+    scores = {match["id"]: match["score"] for match in matches}
+    assert [post_id for post_id in scores if post_id in (source, close, loose, unrelated)] == [close, loose]
+    assert scores[close] > scores[loose] > 0
+
+    assert client.delete(f"{API}/posts/{close}", headers=headers).status_code == 204
+    wait_for_jobs()
+    assert close not in [match["id"] for match in client.get(f"{API}/posts/{source}/similar").json()]
+
+
+def test_similar_posts_of_unknown_post_or_before_the_index_is_loaded(client, make_user, monkeypatch):
+    _, headers = make_user()
+    post_id = _post(client, headers, "Waiting", "Asked before the index is ready", "similar")
+
+    assert client.get(f"{API}/posts/999999/similar").status_code == 404
+    monkeypatch.setattr(similar_posts, "ready", False)
+    response = client.get(f"{API}/posts/{post_id}/similar")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
@@ -0,0 +1,58 @@
+from app.services.suggestions import post_suggestions
+from app.utils.prefix_index import PrefixIndex
+from .conftest import API
+
+
+def _post(client, headers, title, tags, llm_model):
+    post = {"title": title, "content": f"All about {title}", "tags": tags, "llm_model": llm_model}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _suggest(client, prefix):
+    response = client.get(f"{API}/posts/suggest", params={"prefix": prefix})
+    assert response.status_code == 200, response.text
+    return {kind: [(item["text"], item["weight"]) for item in items] for kind, items in response.json().items()}
+
+
+def test_prefix_index_ranks_by_weight_and_drops_keys_without_weight():
+    index = PrefixIndex()
+    for display, weight in (("Go", 5), ("golang", 3), ("Go tips", 4), ("Rust", 9)):
+        index.add(display.lower(), display, weight)
+    index.add("golang", "golang", -3)
+
+    assert index.top("go", 10) == [("Go", 5), ("Go tips", 4)]
+    assert index.top("go ", 10) == [("Go tips", 4)]
+    assert index.top("py", 10) == []
+
+
+def test_suggest_ranks_by_popularity_and_follows_writes(client, make_user, wait_for_jobs):
+    _, headers = make_user()
+    _, fan = make_user()
+    care = [_post(client, headers, "Pangolin care", "pangolins", "pangolin-llm") for _ in range(2)]
+    diet = _post(client, headers, "Pangolin diet", "Pangolins, diets", "pangolin-llm")
+    for liker in (headers, fan):
+        assert client.post(f"{API}/posts/{diet}/like", headers=liker).status_code == 201
+    wait_for_jobs()
+
+    suggestions = _suggest(client, "PANGO")
+
+    # Case-insensitive; a title weighs its posts plus their likes
+    assert suggestions["titles"] == [("Pangolin diet", 3), ("Pangolin care", 2)]
+    assert suggestions["tags"] == [("pangolins", 3)]
+    assert suggestions["llm_models"] == [("pangolin-llm", 3)]
+
+    for post_id in care:
+        assert client.delete(f"{API}/posts/{post_id}", headers=headers).status_code == 204
+    wait_for_jobs()
+    assert _suggest(client, "pangolin c")["titles"] == []
+
+
+def test_suggest_answers_503_until_loaded(client, monkeypatch):
+    monkeypatch.setattr(post_suggestions, "ready", False)
+
+    response = client.get(f"{API}/posts/suggest", params={"prefix": "a"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
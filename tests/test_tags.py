@@ -0,0 +1,49 @@
+from app.utils.tags import parse_tags
+from .conftest import API
+
+
+def _post(client, headers, title, tags, llm_model="gpt-4"):
+    post = {"title": title, "content": f"{title} for the tag index", "tags": tags, "llm_model": llm_model}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _facets(client):
+    facets = client.get(f"{API}/posts/facets", params={"limit": 500}).json()
+    return (
+        {facet["name"]: facet["count"] for facet in facets["tags"]},
+        {facet["name"]: facet["count"] for facet in facets["llm_models"]},
+    )
+
+
+def test_parse_tags_normalizes_and_deduplicates():
+    assert parse_tags(" AI, coding;#ai \n Machine  Learning") == ["ai", "coding", "machine learning"]
+    assert parse_tags("") == []
+
+
+def test_feed_filters_by_normalized_tag_and_model(client, make_user):
+    _, headers = make_user()
+    both = _post(client, headers, "Both", "Tapirology, #okapis", llm_model="tapir-model")
+    tag_only = _post(client, headers, "Tag only", "tapirology")
+    _post(client, headers, "Neither", "okapis")
+
+    by_tag = client.get(f"{API}/posts", params={"tag": "TAPIROLOGY"}).json()
+    by_both = client.get(f"{API}/posts", params={"tag": "tapirology", "llm_model": "tapir-model"}).json()
+
+    assert [post["id"] for post in by_tag] == [tag_only, both]
+    assert [post["id"] for post in by_both] == [both]
+
+
+def test_facets_follow_post_edits_and_deletes(client, make_user):
+    _, headers = make_user()
+    first = _post(client, headers, "Counted", "quaggas, zebroids", llm_model="quagga-model")
+    second = _post(client, headers, "Counted too", "Quaggas", llm_model="quagga-model")
+    tags, models = _facets(client)
+    assert (tags["quaggas"], tags["zebroids"], models["quagga-model"]) == (2, 1, 2)
+
+    assert client.put(f"{API}/posts/{first}", json={"tags": "zebroids"}, headers=headers).status_code == 200
+    assert client.delete(f"{API}/posts/{second}", headers=headers).status_code == 204
+
+    tags, models = _facets(client)
+    assert "quaggas" not in tags and tags["zebroids"] == 1 and models["quagga-model"] == 1
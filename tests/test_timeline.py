@@ -0,0 +1,61 @@
+from app.config import settings
+from app.crud import timeline as timeline_crud
+from app.database import SessionLocal
+from app.models.follow import TimelineEntry
+from .conftest import API
+
+POST = {"title": "Fan-out", "content": "Copied to every follower", "tags": "testing", "llm_model": "gpt-4"}
+
+
+def _timeline_ids(client, headers):
+    return [post["id"] for post in client.get(f"{API}/users/me/timeline", headers=headers).json()]
+
+
+def test_fan_out_skips_entries_a_follow_already_added(client, make_user, wait_for_jobs):
+    author_id, author = make_user()
+    _, early = make_user()
+    _, late = make_user()
+    assert client.post(f"{API}/users/{author_id}/follow", headers=early).status_code == 201
+    post_id = client.post(f"{API}/posts", json=POST, headers=author).json()["id"]
+    wait_for_jobs()
+    # Following copies the post before a (retried or late) fan-out of it runs
+    assert client.post(f"{API}/users/{author_id}/follow", headers=late).status_code == 201
+
+    db = SessionLocal()
+    try:
+        timeline_crud.fan_out(db, [post_id])
+        timeline_crud.add_followee_posts(db, follower_id=author_id, followee_id=author_id, followers_count=2)
+        db.commit()
+    finally:
+        db.close()
+
+    assert _timeline_ids(client, early).count(post_id) == 1
+    assert _timeline_ids(client, late).count(post_id) == 1
+
+
+def _timeline_size(user_id):
+    db = SessionLocal()
+    try:
+        return db.query(TimelineEntry).filter(TimelineEntry.user_id == user_id).count()
+    finally:
+        db.close()
+
+
+def test_timelines_stay_capped_whatever_the_post_ids(client, make_user, wait_for_jobs, monkeypatch):
+    monkeypatch.setattr(settings, "timeline_max_entries", 5)
+    monkeypatch.setattr(timeline_crud, "TRIM_AFTER_ENTRIES", 3)
+    author_id, author = make_user()
+    other_id, other = make_user()
+    follower_id, follower = make_user()
+    for followee_id in (author_id, other_id):
+        assert client.post(f"{API}/users/{followee_id}/follow", headers=follower).status_code == 201
+    for number in range(12):
+        # Authors taking turns, so each one's post ids skip numbers
+        for headers in (author, other):
+            post = {**POST, "content": f"Post {number}"}
+            assert client.post(f"{API}/posts", json=post, headers=headers).status_code == 201
+    wait_for_jobs()
+
+    assert _timeline_size(follower_id) <= 5 + 3
+    assert _timeline_size(author_id) <= 5 + 3
+    assert len(_timeline_ids(client, follower)) <= 5 + 3
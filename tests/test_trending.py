@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+import pytest
+
+from app.crud import trending as trending_crud
+from app.database import SessionLocal
+from app.models.post import Post
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from .conftest import API
+
+
+def _post(client, headers, title):
+    post = {"title": title, "content": f"{title} for the trending feed", "tags": "testing", "llm_model": "gpt-4"}
+    response = client.post(f"{API}/posts", json=post, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _like(client, post_id, *fans):
+    for fan in fans:
+        assert client.post(f"{API}/posts/{post_id}/like", headers=fan).status_code == 201
+
+
+def _hot_score(post_id):
+    with SessionLocal() as db:
+        return db.query(Post.hot_score).filter(Post.id == post_id).scalar()
+
+
+def _decay(hours):
+    """Decay the stored scores as if ``hours`` had passed since the last decay."""
+    with SessionLocal() as db:
+        trending_crud.decay_scores(db, now=trending_crud.last_decay(db) + timedelta(hours=hours))
+
+
+@pytest.fixture
+def rebuilt_scores():
+    """Put the scores back on the real clock after a test decays them into the future."""
+    yield
+    with SessionLocal() as db:
+        trending_crud.rebuild_hot_scores(db)
+
+
+def test_trending_orders_by_likes_and_walks_cursors(client, make_user):
+    _, author = make_user()
+    fans = [make_user()[1] for _ in range(3)]
+    cold, warm, hot = (_post(client, author, title) for title in ("Cold", "Warm", "Hot"))
+    _like(client, cold, *fans[:1])
+    _like(client, warm, *fans[:2])
+    _like(client, hot, *fans)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"{API}/posts/trending", params=params)
+        assert response.status_code == 200, response.text
+        seen += [post["id"] for post in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert [post_id for post_id in seen if post_id in (cold, warm, hot)] == [hot, warm, cold]
+
+
+def test_unlike_after_decays_takes_back_exactly_its_like(client, make_user, rebuilt_scores):
+    _, author = make_user()
+    (_, early), (_, late) = make_user(), make_user()
+    post_id = _post(client, author, "Decaying")
+    _like(client, post_id, early)
+    _decay(6)
+    # Liked six hours "before" that decay: worth 0.5 ** 0.5 of a fresh like as of it
+    _like(client, post_id, late)
+    _decay(6)
+
+    assert client.delete(f"{API}/posts/{post_id}/like", headers=late).status_code == 204
+
+    # Only the early like is left, twelve hours (one half-life) old
+    assert _hot_score(post_id) == pytest.approx(0.5, abs=1e-3)
+
+
+def test_trending_cursor_from_before_a_decay_is_rejected(client, make_user, rebuilt_scores):
+    _, author = make_user()
+    _, fan = make_user()
+    _like(client, _post(client, author, "Paged"), fan)
+    _like(client, _post(client, author, "Paged too"), fan)
+    cursor = client.get(f"{API}/posts/trending", params={"limit": 1}).headers[NEXT_CURSOR_HEADER]
+
+    _decay(1)
+    response = client.get(f"{API}/posts/trending", params={"limit": 1, "cursor": cursor})
+
+    assert response.status_code == 400
+    assert "first page" in response.json()["detail"]